@@ -0,0 +1,139 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def attachment_name(attachment):
+    # Older documents store a plain file path instead of a store reference
+    if isinstance(attachment, dict):
+        return attachment["name"]
+    return Path(attachment).name
+
+
+class AttachmentStore:
+    """Content-addressed blob store shared by all projects.
+
+    Uploads are streamed to disk in chunks and stored under their SHA-256,
+    so identical files are kept once no matter how many projects use them.
+    Each use is recorded as a reference owned by a project; a blob is deleted
+    when its last reference is released.
+    """
+
+    def __init__(self, root="attachment_store"):
+        self.root = Path(root)
+        self.tmp_dir = self.root / "tmp"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = str(self.root / "refs.sqlite3")
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("CREATE TABLE IF NOT EXISTS refs (digest TEXT NOT NULL, owner TEXT NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS refs_digest ON refs (digest)")
+        conn.execute("CREATE INDEX IF NOT EXISTS refs_owner ON refs (owner)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; writes take an explicit IMMEDIATE lock below
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def blob_path(self, digest):
+        return self.root / digest[:2] / digest[2:]
+
+    def put(self, fileobj, name, owner):
+        """Stream fileobj into the store and return an attachment reference."""
+        if hasattr(fileobj, "seek") and fileobj.tell():
+            # Uploads may have been read already; streams (e.g. tar members) can't seek back
+            fileobj.seek(0)
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = fileobj.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    sha.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            digest = sha.hexdigest()
+            path = self.blob_path(digest)
+
+            # Publishing the blob and recording the reference happen under one
+            # lock so a concurrent release can't delete a blob being reused
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if path.exists():
+                    os.unlink(tmp_path)
+                else:
+                    path.parent.mkdir(exist_ok=True)
+                    os.replace(tmp_path, path)
+                conn.execute("INSERT INTO refs (digest, owner) VALUES (?, ?)", (digest, owner))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return {"name": name, "sha256": digest, "size": size}
+
+    def add_ref(self, digest, owner):
+        self._connect().execute("INSERT INTO refs (digest, owner) VALUES (?, ?)", (digest, owner))
+
+    def release(self, digest, owner):
+        self._release("DELETE FROM refs WHERE rowid = (SELECT rowid FROM refs WHERE digest = ? AND owner = ? LIMIT 1)",
+                      (digest, owner), [digest])
+
+    def release_owner(self, owner):
+        digests = [r[0] for r in self._connect().execute("SELECT DISTINCT digest FROM refs WHERE owner = ?", (owner,))]
+        self._release("DELETE FROM refs WHERE owner = ?", (owner,), digests)
+
+    def _release(self, statement, params, digests):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(statement, params)
+            for digest in digests:
+                if conn.execute("SELECT 1 FROM refs WHERE digest = ? LIMIT 1", (digest,)).fetchone() is None:
+                    self.blob_path(digest).unlink(missing_ok=True)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def refcount(self, digest):
+        return self._connect().execute("SELECT COUNT(*) FROM refs WHERE digest = ?", (digest,)).fetchone()[0]
+
+    def blobs(self, since=None):
+        """Yield (digest, path) for every stored blob, only those written after since if given."""
+        for fan_out in sorted(self.root.iterdir()):
+            if len(fan_out.name) != 2 or not fan_out.is_dir():
+                continue
+            for entry in os.scandir(fan_out):
+                if since is None or entry.stat().st_mtime > since:
+                    yield fan_out.name + entry.name, Path(entry.path)
+
+    def missing(self):
+        """Yield the digests that are referenced but have no blob."""
+        for (digest,) in self._connect().execute("SELECT DISTINCT digest FROM refs"):
+            if not self.blob_path(digest).exists():
+                yield digest
+
+    def open(self, attachment):
+        if isinstance(attachment, dict):
+            return open(self.blob_path(attachment["sha256"]), "rb")
+        return open(attachment, "rb")
+
+    def read(self, attachment):
+        with self.open(attachment) as f:
+            return f.read()
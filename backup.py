@@ -0,0 +1,316 @@
+import argparse
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+from project_archive import file_digest, file_reference
+from project_cache import project_cache
+from user_store import UserStore
+from workspaces import create_workspaces
+
+FORMAT = 1
+RECORDS_FILE = "projects.ndjson"
+FILES_FILE = "files.tar"
+COUNTS = ("users", "members", "projects", "archives", "attachments")
+
+# Exports and imports touch every project once, caching more of them only costs memory
+BULK_CACHE_BYTES = 1024 * 1024
+
+# Imported blobs are held by this owner until the projects referencing them are in
+IMPORT_OWNER = "backup-import"
+
+
+def archive_member(owner, project_name):
+    return f"archived/{quote(owner, safe='')}/{quote(project_name, safe='')}.zip"
+
+
+def _add_file(tar, name, path):
+    # Streamed into the tar in chunks; blobs and archives are only ever replaced by rename
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return False
+    with f:
+        stat = os.fstat(f.fileno())
+        info = tarfile.TarInfo(name)
+        info.size = stat.st_size
+        info.mtime = stat.st_mtime
+        tar.addfile(info, f)
+    return True
+
+
+def export_install(workspaces, users, out_dir, since=None):
+    """Write every user, membership and project of an install into out_dir.
+
+    Projects (with their document bodies) become one NDJSON record each in
+    projects.ndjson, attachments and archived projects go into files.tar.
+    Both are written as streams, one project or file at a time. With since,
+    only projects, archives and attachments changed after that time are
+    written, for an incremental backup on top of an earlier one. Returns the
+    counts recorded in the export's final record.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    counts = dict.fromkeys(COUNTS, 0)
+    with open(out_dir / RECORDS_FILE, "w", encoding="utf-8") as out, \
+            tarfile.open(out_dir / FILES_FILE, "w|") as tar, project_cache.limited(BULK_CACHE_BYTES):
+        def write(record):
+            out.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+        write({"type": "header", "format": FORMAT, "created_at": time.time(), "since": since})
+        for username, record in users.records():
+            write({"type": "user", "username": username, "record": record})
+            counts["users"] += 1
+        for member, owner, project_name in workspaces.memberships():
+            write({"type": "member", "member": member, "owner": owner, "project": project_name})
+            counts["members"] += 1
+
+        for owner in workspaces.usernames():
+            storage = workspaces.storage(owner)
+            for name, mtime, data in storage.export_projects(since):
+                for doc in data["documents"]:
+                    attachment = doc.get("attachment")
+                    if attachment and not isinstance(attachment, dict):
+                        # Old plain-path attachments are exported like store blobs, missing ones dropped
+                        doc["attachment"] = file_reference(attachment) if os.path.exists(attachment) else None
+                        if doc["attachment"]:
+                            counts["attachments"] += _add_file(
+                                tar, f"attachments/{doc['attachment']['sha256']}", attachment)
+                write({"type": "project", "owner": owner, "name": name, "mtime": mtime, "data": data})
+                counts["projects"] += 1
+            for manifest in storage.list_archived():
+                if since is None or manifest["archived_at"] > since:
+                    name = manifest["project"]
+                    counts["archives"] += _add_file(tar, archive_member(owner, name),
+                                                    storage.archive.path(name))
+
+        # Blobs are immutable, so the ones written since the last backup are all that is new
+        for digest, path in workspaces.attachments.blobs(since):
+            counts["attachments"] += _add_file(tar, f"attachments/{digest}", path)
+        write({"type": "end", "counts": counts})
+    return counts
+
+
+def read_header(in_dir):
+    with open(Path(in_dir) / RECORDS_FILE, "r", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+    if header.get("type") != "header" or header.get("format") != FORMAT:
+        raise ValueError(f"{in_dir} is not a FocusBoard export")
+    return header
+
+
+def read_trailer(in_dir):
+    """Return the counts of the final record, raising ValueError for an incomplete export."""
+    path = Path(in_dir) / RECORDS_FILE
+    with open(path, "rb") as f:
+        # Only the end of the file is read, the final record is small
+        f.seek(max(0, path.stat().st_size - 4096))
+        lines = f.read().splitlines()
+    try:
+        record = json.loads(lines[-1])
+    except (IndexError, ValueError):
+        record = {}
+    if record.get("type") != "end":
+        raise ValueError(f"{path} is incomplete, the export did not finish")
+    return record["counts"]
+
+
+def validate(record):
+    """Return what is wrong with one NDJSON record, None if it is fine."""
+    kind = record.get("type")
+    if kind == "user":
+        if not isinstance(record.get("username"), str) or not isinstance(record.get("record"), dict) \
+                or "password" not in record["record"] or "created_at" not in record["record"]:
+            return "user record without username, password or created_at"
+    elif kind == "member":
+        if not all(isinstance(record.get(key), str) for key in ("member", "owner", "project")):
+            return "member record without member, owner or project"
+    elif kind == "project":
+        name, data = record.get("name"), record.get("data")
+        if not isinstance(record.get("owner"), str) or not isinstance(name, str) or not name or "/" in name:
+            return f"project record with a bad owner or name: {name!r}"
+        if not isinstance(data, dict) or not isinstance(data.get("todos"), list) \
+                or not isinstance(data.get("documents"), list):
+            return f"project {name} has no todos or documents list"
+        for doc in data["documents"]:
+            attachment = doc.get("attachment") if isinstance(doc, dict) else None
+            if not isinstance(doc, dict) or "id" not in doc or not isinstance(doc.get("content", ""), str):
+                return f"project {name} has a document without id or content"
+            if attachment and not (isinstance(attachment, dict) and "sha256" in attachment):
+                return f"project {name} has an attachment that is not in the export"
+    elif kind not in ("header", "end"):
+        return f"unknown record type {kind!r}"
+    return None
+
+
+def _import_files(workspaces, in_dir, counts, errors):
+    attachments = workspaces.attachments
+    with tarfile.open(Path(in_dir) / FILES_FILE, "r|") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            kind, _, rest = member.name.partition("/")
+            f = tar.extractfile(member)
+            if kind == "attachments":
+                reference = attachments.put(f, rest, IMPORT_OWNER)
+                if reference["sha256"] != rest:
+                    attachments.release(reference["sha256"], IMPORT_OWNER)
+                    errors.append(f"attachment {rest} is corrupt")
+                    continue
+                counts["attachments"] += 1
+            elif kind == "archived" and rest.endswith(".zip"):
+                owner, _, file_name = rest.partition("/")
+                storage = workspaces.storage(unquote(owner))
+                storage.archive.archive_dir.mkdir(parents=True, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=storage.archive.archive_dir, prefix=".import-")
+                try:
+                    with os.fdopen(fd, "wb") as tmp:
+                        shutil.copyfileobj(f, tmp)
+                    storage.archive.add(unquote(file_name[:-len(".zip")]), tmp_path)
+                finally:
+                    os.unlink(tmp_path)
+                counts["archives"] += 1
+            else:
+                errors.append(f"unexpected file {member.name}")
+
+
+def import_install(workspaces, users, in_dir, workers=4):
+    """Load an export written by export_install into an install.
+
+    The export must be complete, and every record is validated before it
+    is written; invalid ones are reported and skipped. Projects replace
+    projects of the same name and are saved by a pool of workers with a
+    bounded number in flight, so memory stays constant. Existing users are
+    kept. Returns (counts, errors).
+    """
+    read_header(in_dir)
+    expected = read_trailer(in_dir)
+    counts = dict.fromkeys(COUNTS, 0)
+    errors = []
+    lock = threading.Lock()
+
+    # Attachments first, so no project is ever saved with a reference to a missing blob
+    _import_files(workspaces, in_dir, counts, errors)
+
+    def import_project(record):
+        try:
+            name, data = record["name"], record["data"]
+            storage, search_index = workspaces.open(record["owner"])
+            storage.import_project(name, data)
+            search_index.index_project(name, data, lambda doc_id: storage.load_document_body(name, doc_id))
+        except Exception as e:
+            with lock:
+                errors.append(f"project {record['owner']}/{record['name']}: {e}")
+            return
+        with lock:
+            counts["projects"] += 1
+
+    in_flight = threading.BoundedSemaphore(workers * 4)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import") as pool, \
+            open(Path(in_dir) / RECORDS_FILE, "r", encoding="utf-8") as f, project_cache.limited(BULK_CACHE_BYTES):
+        for line_number, line in enumerate(f, 1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                errors.append(f"line {line_number}: not JSON")
+                continue
+            problem = validate(record)
+            if problem:
+                errors.append(f"line {line_number}: {problem}")
+            elif record["type"] == "user":
+                counts["users"] += 1
+                users.add(record["username"], record["record"])
+            elif record["type"] == "member":
+                counts["members"] += 1
+                workspaces.share(record["owner"], record["project"], record["member"])
+            elif record["type"] == "project":
+                in_flight.acquire()
+                pool.submit(import_project, record).add_done_callback(lambda _: in_flight.release())
+
+    workspaces.attachments.release_owner(IMPORT_OWNER)
+    for digest in workspaces.attachments.missing():
+        errors.append(f"attachment {digest} is referenced but not in the export")
+    for key in COUNTS:
+        if counts[key] != expected.get(key, 0):
+            errors.append(f"imported {counts[key]} {key}, the export has {expected.get(key, 0)}")
+    return counts, errors
+
+
+def verify_export(in_dir):
+    """Check an export without importing it, returns a list of problems."""
+    errors = []
+    try:
+        read_header(in_dir)
+        expected = read_trailer(in_dir)
+    except (OSError, ValueError) as e:
+        return [str(e)]
+    counts = dict.fromkeys(COUNTS, 0)
+    with open(Path(in_dir) / RECORDS_FILE, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                errors.append(f"line {line_number}: not JSON")
+                continue
+            problem = validate(record)
+            if problem:
+                errors.append(f"line {line_number}: {problem}")
+            elif record["type"] in ("user", "member", "project"):
+                counts[record["type"] + "s"] += 1
+    with tarfile.open(Path(in_dir) / FILES_FILE, "r|") as tar:
+        for member in tar:
+            if member.name.startswith("attachments/"):
+                counts["attachments"] += 1
+                if file_digest(tar.extractfile(member)) != member.name.partition("/")[2]:
+                    errors.append(f"attachment {member.name} is corrupt")
+            elif member.name.startswith("archived/"):
+                counts["archives"] += 1
+    for key in COUNTS:
+        if counts[key] != expected.get(key, 0):
+            errors.append(f"found {counts[key]} {key}, the export has {expected.get(key, 0)}")
+    return errors
+
+
+def parse_since(value):
+    """A Unix timestamp, an ISO date or time, or the directory of an earlier export."""
+    if os.path.isdir(value):
+        return read_header(value)["created_at"]
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Back up and restore a FocusBoard install")
+    parser.add_argument("command", choices=["export", "import", "verify"])
+    parser.add_argument("directory", help="export directory (projects.ndjson and files.tar)")
+    parser.add_argument("--since", help="only export what changed after this time or earlier export")
+    parser.add_argument("--workers", type=int, default=4, help="projects imported in parallel")
+    parser.add_argument("--users-db", default="users/users.sqlite3")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "export":
+        counts = export_install(create_workspaces(), UserStore(args.users_db), args.directory,
+                                parse_since(args.since) if args.since else None)
+        errors = []
+    elif args.command == "import":
+        counts, errors = import_install(create_workspaces(), UserStore(args.users_db), args.directory, args.workers)
+    else:
+        counts, errors = None, verify_export(args.directory)
+    elapsed = time.perf_counter() - start
+    if counts:
+        print(", ".join(f"{value} {key}" for key, value in counts.items()) + f" in {elapsed:.1f} s")
+    for error in errors:
+        print(error)
+    if errors:
+        raise SystemExit(1)
@@ -0,0 +1,4 @@
+"""Benchmarks for FocusBoard. Run them from the repository root, e.g.
+
+    python -m benchmarks.bench_captions
+"""
@@ -0,0 +1,89 @@
+"""Deadline agenda from the due-date index versus loading every project.
+
+Generates --projects projects in one workspace (see workload.py; most
+projects and every fifth task have a due date) and times building the
+overdue / today / this week / later agenda the way it had to be done
+before, by loading each project and working out its due dates, against
+the range queries on the due-date index. Also times a single-day query
+and a save, which keeps the index up to date.
+
+    python -m benchmarks.bench_agenda --projects 5000 --todos 20
+"""
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from dashboard_app import AGENDA_BUCKETS, ProjectDashboard
+from project_journal import apply_operation
+
+from benchmarks.report import timed, write_json
+from benchmarks.workload import add_arguments, generate, make_workspaces, username
+
+
+def legacy_agenda(storage, tasks=True):
+    # Every project is loaded and each due date parsed against the current time
+    agenda = {bucket: [] for bucket in AGENDA_BUCKETS}
+    for name in storage.get_projects():
+        data = storage.load_project(name)
+        due = [(data.get("due_date"), data["name"])]
+        if tasks:
+            due += [(todo.get("due_date"), todo["task"]) for todo in data["todos"] if not todo["completed"]]
+        for due_date, title in due:
+            if not due_date:
+                continue
+            days = (datetime.strptime(due_date, "%Y-%m-%d") - datetime.now()).days
+            bucket = "overdue" if days < -1 else "today" if days < 1 else "this_week" if days < 7 else "later"
+            agenda[bucket].append((due_date, name, title))
+    for items in agenda.values():
+        items.sort()
+    return agenda
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.set_defaults(projects=5000, documents=1, doc_bytes=200)
+    parser.add_argument("--limit", type=int, default=51, help="items per agenda bucket")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="focusboard-agenda-"))
+    print(f"Generating {args.projects} projects in {root}")
+    generate(root, args.projects, args.todos, args.documents, args.doc_bytes, args.users, args.backend,
+             args.rounds, args.seed)
+    storage = make_workspaces(root, args.backend).storage(username(0))
+    dashboard = ProjectDashboard(storage=storage, search_index=object())
+    today = dashboard.today()
+    tomorrow = (today + timedelta(days=1)).isoformat()
+    counts = {bucket: len(items) for bucket, items in dashboard.agenda().items()}
+
+    results = {
+        "legacy_agenda": timed(lambda: legacy_agenda(storage), max(1, args.runs // 10)),
+        "agenda": timed(lambda: dashboard.agenda(limit=args.limit), args.runs),
+        "agenda_projects_only": timed(lambda: dashboard.agenda(tasks=False, limit=args.limit), args.runs),
+        "due_today": timed(lambda: storage.list_due(today.isoformat(), tomorrow), args.runs),
+    }
+    if hasattr(storage, "catalog"):
+        # Sorted again from the catalog entries, as after another process changed the catalog
+        results["agenda_cold"] = timed(lambda: dashboard.agenda(limit=args.limit), args.runs,
+                                       setup=lambda: setattr(storage.catalog, "_due", None))
+
+    name = storage.get_projects()[0]
+    data = storage.load_project(name)
+    def save():
+        operation = {"op": "set_fields", "fields": {"due_date": (today + timedelta(days=3)).isoformat()}}
+        storage.save_project(name, apply_operation(data, operation), operation=operation)
+    results["save_project"] = timed(save, args.runs)
+
+    print(f"{args.projects} projects ({args.backend}); due items per bucket: "
+          + ", ".join(f"{bucket} {count}" for bucket, count in counts.items()))
+    for metric, r in results.items():
+        print(f"  {metric:<22} median {r['median_ms']:9.2f} ms   p95 {r['p95_ms']:9.2f} ms")
+    if args.json:
+        write_json(args.json, vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
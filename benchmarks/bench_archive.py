@@ -0,0 +1,155 @@
+"""Packed archives versus archived project directories.
+
+Writes the same --projects projects (todos, documents and one attachment
+each, every tenth attachment shared) into two storages and archives the
+same --archived fraction of them: the old way, by moving the project
+directory under archived/, and into packed archives with manifests. Then
+compares disk usage and file counts of the two trees, and times listing
+and searching the archived projects and opening one of them.
+
+    python -m benchmarks.bench_archive --projects 2000 --archived 0.8
+"""
+import argparse
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from attachment_store import AttachmentStore
+from project_cache import project_cache
+from project_journal import ProjectJournal
+from project_storage import FileSystemStorage
+
+from benchmarks.bench_captions import WORDS
+from benchmarks.report import timed, write_json
+from benchmarks.workload import make_project
+
+
+class Upload(io.BytesIO):
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def generate(root, projects, todos, documents, doc_bytes, attachment_bytes, seed=0):
+    rng = random.Random(seed)
+    storage = FileSystemStorage(root / "project_data", AttachmentStore(root / "attachment_store"))
+    for i in range(projects):
+        data = make_project(rng, i, todos, documents, doc_bytes)
+        shared = i % 10 == 0
+        words = " ".join(rng.choice(WORDS) for _ in range(attachment_bytes // 6))
+        upload = Upload((f"shared attachment {words}" if shared else f"attachment {i} {words}").encode(),
+                        f"notes-{i}.txt")
+        data["documents"][0]["attachment"] = storage.save_attachment(data["name"], upload)
+        storage.save_project(data["name"], data)
+    return storage
+
+
+def legacy_archive(storage, project_name):
+    # What archive_project did before archives were packed
+    source_dir = storage.data_dir / project_name
+    archive_dir = storage.data_dir / "archived" / project_name
+    archive_dir.parent.mkdir(exist_ok=True)
+    shutil.move(str(source_dir), str(archive_dir))
+    storage.catalog.remove(project_name)
+    storage.cache.invalidate(source_dir / "project_info.json")
+
+
+def legacy_list(storage):
+    # Listing with the fields the archive view shows meant parsing every project
+    archive_dir = storage.data_dir / "archived"
+    entries = []
+    for d in archive_dir.iterdir():
+        if (d / "project_info.json").exists():
+            entries.append(storage.catalog.make_entry(d.name, ProjectJournal(d).load()))
+    return entries
+
+
+def legacy_search(storage, word):
+    found = []
+    for d in (storage.data_dir / "archived").iterdir():
+        if not (d / "project_info.json").exists():
+            continue
+        data = ProjectJournal(d).load()
+        if any(word in todo["task"] for todo in data["todos"]):
+            found.append(d.name)
+    return found
+
+
+def disk_usage(*paths):
+    files = 0
+    blocks = 0
+    for path in paths:
+        for dirpath, dirnames, filenames in os.walk(path):
+            for name in dirnames + filenames:
+                files += 1
+                blocks += os.lstat(os.path.join(dirpath, name)).st_blocks
+    return files, blocks * 512
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=2000)
+    parser.add_argument("--archived", type=float, default=0.8, help="fraction of the projects to archive")
+    parser.add_argument("--todos", type=int, default=20)
+    parser.add_argument("--documents", type=int, default=3)
+    parser.add_argument("--doc-bytes", type=int, default=2000)
+    parser.add_argument("--attachment-bytes", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="focusboard-archive-"))
+    layouts = {}
+    for layout in ("directories", "packed"):
+        print(f"Writing {args.projects} projects for {layout} archives in {root / layout}")
+        layouts[layout] = generate(root / layout, args.projects, args.todos, args.documents, args.doc_bytes,
+                                   args.attachment_bytes)
+    names = layouts["packed"].get_projects()
+    archived = names[:int(len(names) * args.archived)]
+    before = disk_usage(root / "packed" / "project_data", root / "packed" / "attachment_store")
+
+    results = {}
+    for layout, storage in layouts.items():
+        archive = legacy_archive if layout == "directories" else FileSystemStorage.archive_project
+        start = time.perf_counter()
+        for name in archived:
+            archive(storage, name)
+        elapsed = time.perf_counter() - start
+        files, size = disk_usage(storage.data_dir, storage.attachments.root)
+        results[layout] = {"archive_ms_per_project": elapsed * 1000 / len(archived), "files": files, "bytes": size}
+
+    directories, packed = layouts["directories"], layouts["packed"]
+    index_file = packed.archive.index_file
+    word = packed.load_archived_project(archived[0])["todos"][0]["task"].split()[0]
+    results["directories"].update({
+        "list": timed(lambda: legacy_list(directories), args.runs),
+        "search": timed(lambda: legacy_search(directories, word), args.runs),
+        "open": timed(lambda: ProjectJournal(directories.data_dir / "archived" / archived[0]).load(), args.runs),
+    })
+    results["packed"].update({
+        "list_cold": timed(lambda: packed.list_archived(), args.runs,
+                           setup=lambda: project_cache.invalidate(index_file)),
+        "list": timed(lambda: packed.list_archived(), args.runs),
+        "search": timed(lambda: packed.list_archived(word), args.runs),
+        "open": timed(lambda: packed.load_archived_project(archived[0]), args.runs),
+    })
+
+    print(f"{len(archived)} of {args.projects} projects archived; "
+          f"{before[0]} files and {before[1] / 2**20:.1f} MiB before archiving")
+    for layout, metrics in results.items():
+        print(layout)
+        print(f"  {'disk':<12} {metrics['files']:9d} files {metrics['bytes'] / 2**20:9.1f} MiB   "
+              f"archive {metrics['archive_ms_per_project']:.2f} ms per project")
+        for name, r in metrics.items():
+            if isinstance(r, dict):
+                print(f"  {name:<12} median {r['median_ms']:9.2f} ms   p95 {r['p95_ms']:9.2f} ms")
+    if args.json:
+        write_json(args.json, vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
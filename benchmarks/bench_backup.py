@@ -0,0 +1,143 @@
+"""Export and import throughput of backup.py on the synthetic workload.
+
+Generates --projects projects (see workload.py, one in --attachment-every
+with an attachment) and runs a full export, verify, an incremental export
+after --changed projects were edited, and imports into empty installs with
+1 and --workers workers. Every step runs in its own process, so its peak
+RSS is reported alongside the time; memory should not grow with the
+number of projects.
+
+    python -m benchmarks.bench_backup --projects 10000 --owners 20
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+import backup
+from project_journal import apply_operation
+
+from benchmarks.report import write_json
+from benchmarks.workload import add_arguments, generate, make_auth, make_workspaces, username
+
+
+class Upload(io.BytesIO):
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def add_attachments(root, projects, owners, every, size):
+    workspaces = make_workspaces(root)
+    for i in range(0, projects, every):
+        storage = workspaces.storage(username(i % owners))
+        name = f"project-{i:05d}"
+        reference = storage.save_attachment(name, Upload(os.urandom(size), f"scan-{i}.bin"))
+        document = {"id": f"{i}-attachment", "title": "Scan", "content": "", "attachment": reference}
+        operation = {"op": "add_document", "document": document}
+        storage.save_project(name, apply_operation(storage.load_project(name), operation), operation=operation)
+
+
+def touch(root, projects, owners, changed):
+    workspaces = make_workspaces(root)
+    for i in range(0, projects, max(1, projects // changed)):
+        storage = workspaces.storage(username(i % owners))
+        name = f"project-{i:05d}"
+        operation = {"op": "add_todo", "todo": {"id": f"{i}-new", "task": "changed", "completed": False}}
+        storage.save_project(name, apply_operation(storage.load_project(name), operation), operation=operation)
+
+
+def peak_rss_mb():
+    # VmHWM starts over in a new process; on Linux ru_maxrss keeps the parent's peak across exec
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def step(queue, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    queue.put({
+        "seconds": time.perf_counter() - start,
+        "peak_rss_mb": peak_rss_mb(),
+        "result": result,
+    })
+
+
+def in_process(fn, *args):
+    # A fresh interpreter, so nothing of the generated data counts towards its memory
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=step, args=(queue, fn) + args)
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def export(root, out_dir, since=None):
+    return backup.export_install(make_workspaces(root), make_auth(root).store, out_dir, since)
+
+
+def verify(out_dir):
+    return backup.verify_export(out_dir)
+
+
+def restore(root, out_dir, workers):
+    counts, errors = backup.import_install(make_workspaces(root), make_auth(root).store, out_dir, workers)
+    return {"counts": counts, "errors": errors[:5]}
+
+
+def export_bytes(out_dir):
+    return sum(p.stat().st_size for p in Path(out_dir).iterdir())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.set_defaults(projects=10000, owners=20)
+    parser.add_argument("--attachment-every", type=int, default=20)
+    parser.add_argument("--attachment-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--changed", type=int, default=100, help="projects edited before the incremental export")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="focusboard-backup-"))
+    source = root / "source"
+    print(f"Generating {args.projects} projects in {source}")
+    generate(source, args.projects, args.todos, args.documents, args.doc_bytes, args.users, args.backend,
+             args.rounds, args.seed, args.owners)
+    add_attachments(source, args.projects, args.owners, args.attachment_every, args.attachment_bytes)
+
+    results = {"export": in_process(export, source, root / "full")}
+    size = export_bytes(root / "full")
+    results["verify"] = in_process(verify, root / "full")
+    since = backup.read_header(root / "full")["created_at"]
+    touch(source, args.projects, args.owners, args.changed)
+    results["export_incremental"] = in_process(export, source, root / "incremental", since)
+    for workers in sorted({1, args.workers}):
+        results[f"import_{workers}_workers"] = in_process(restore, root / f"target-{workers}", root / "full", workers)
+
+    print(f"Full export: {size / 2**20:.1f} MiB")
+    for name, r in results.items():
+        rate = f"{args.projects / r['seconds']:8.0f} projects/s" if name != "export_incremental" else " " * 19
+        print(f"  {name:<20} {r['seconds']:8.2f} s {rate}   peak RSS {r['peak_rss_mb']:6.0f} MiB")
+        errors = r["result"].get("errors") if isinstance(r["result"], dict) else r["result"]
+        if errors:
+            print(f"    errors: {errors}")
+    if args.json:
+        write_json(args.json, vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
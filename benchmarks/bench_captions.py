@@ -0,0 +1,127 @@
+"""Caption ingestion benchmark on synthetic multi-hour json3 files.
+
+Serves generated json3 payloads from a local HTTP server and compares the
+original approach (bare requests.get, response.json() and += concatenation)
+with CaptionFetcher (pooled session, streaming parse, single join).
+
+    python -m benchmarks.bench_captions --hours 1 5 --runs 5
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from captions import CaptionFetcher
+
+WORDS = ("focus", "project", "deadline", "lecture", "summary", "video", "notes", "today",
+         "important", "chapter", "example", "question", "answer", "because", "therefore")
+
+
+def make_json3(hours, seed=0):
+    """Build a json3 payload shaped like YouTube auto-captions (word-level segments)."""
+    rng = random.Random(seed)
+    events = [{"tStartMs": 0, "dDurationMs": int(hours * 3600 * 1000), "id": 1, "wpWinPosId": 1, "wsWinStyleId": 1}]
+    t = 0
+    end = int(hours * 3600 * 1000)
+    while t < end:
+        words = rng.randint(6, 12)
+        segs = [{"utf8": rng.choice(WORDS)}]
+        segs += [{"utf8": " " + rng.choice(WORDS), "tOffsetMs": i * 280, "acAsrConf": 0} for i in range(1, words)]
+        events.append({"tStartMs": t, "dDurationMs": 4000, "wWinId": 1, "segs": segs})
+        events.append({"tStartMs": t + 3990, "dDurationMs": 10, "wWinId": 1, "aAppend": 1, "segs": [{"utf8": "\n"}]})
+        t += 4000
+    payload = {"wireMagic": "pb3", "pens": [{}], "wsWinStyles": [{}], "wpWinPositions": [{}], "events": events}
+    return json.dumps(payload).encode("utf-8")
+
+
+def serve(payloads):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            body = payloads[self.path.strip("/")]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def original_ingest(url):
+    import requests
+
+    transcription_text = ""
+    response = requests.get(url)
+    if response.status_code == 200:
+        caption_data = response.json()
+        for event in caption_data.get('events', []):
+            if 'segs' in event:
+                for seg in event['segs']:
+                    transcription_text += seg.get('utf8', '') + " "
+    return transcription_text
+
+
+def fetcher_ingest(fetcher, url):
+    # Same text as the original, built with one join instead of repeated concatenation
+    return "".join(text + " " for _, text in fetcher.fetch_segments(url))
+
+
+def measure(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    # Peak memory is measured in a separate run, tracemalloc distorts timings
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"median_s": statistics.median(times), "min_s": min(times), "peak_mb": peak / 1024 / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 5])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    payloads = {f"{h}h": make_json3(h) for h in args.hours}
+    server = serve(payloads)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    fetcher = CaptionFetcher()
+
+    results = []
+    for hours in args.hours:
+        url = f"{base}/{hours}h"
+        assert original_ingest(url) == fetcher_ingest(fetcher, url)
+        original = measure(lambda: original_ingest(url), args.runs)
+        streamed = measure(lambda: fetcher_ingest(fetcher, url), args.runs)
+        size_mb = len(payloads[f"{hours}h"]) / 1024 / 1024
+        results.append({"hours": hours, "payload_mb": size_mb, "original": original, "fetcher": streamed})
+        print(f"{hours:g}h captions ({size_mb:.1f} MB json3)")
+        for name, r in (("original", original), ("fetcher", streamed)):
+            print(f"  {name:<9} median {r['median_s'] * 1000:8.1f} ms   min {r['min_s'] * 1000:8.1f} ms"
+                  f"   peak {r['peak_mb']:7.1f} MB")
+
+    server.shutdown()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""End-to-end FocusBoard benchmark on a synthetic workload.
+
+Generates workspaces/ and users/ (see benchmarks.workload), times the
+storage, search and UserAuth operations behind ProjectDashboard, then drives
+full reruns of dashboard_app.main() headlessly with Streamlit's AppTest,
+with Gemini and yt-dlp replaced by local stubs. Results can be written as
+JSON and compared with a saved baseline; the exit code is 1 if any metric
+got slower than --threshold allows.
+
+    python -m benchmarks.bench_dashboard --projects 500 --json baseline.json
+    python -m benchmarks.bench_dashboard --projects 500 --baseline baseline.json
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import workload
+from benchmarks.bench_captions import make_json3, serve
+from benchmarks.report import compare, timed, write_json
+from benchmarks.stubs import install_stubs
+
+APP_PATH = Path(__file__).resolve().parent.parent / "dashboard_app.py"
+
+# 1x1 transparent PNG, main() reads focus.png for the page icon
+ICON = bytes.fromhex("89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+                     "0000000d4944415478da63f8ffff3f0005fe02fea7d6a4b80000000049454e44ae426082")
+
+
+def bench_storage(args, root, names, results):
+    from project_cache import project_cache
+    from search_index import SearchIndex
+
+    storage = workload.make_storage(root, args.backend)
+    rng = random.Random(1)
+    pick = lambda: rng.choice(names)
+
+    results["get_projects"] = timed(lambda: storage.get_projects(), args.runs)
+    results["get_projects_category"] = timed(lambda: storage.get_projects("Work"), args.runs)
+    results["get_project_summary"] = timed(lambda: storage.get_project_summary(pick()), args.runs)
+    results["list_summaries_page"] = timed(lambda: storage.list_summaries(sort="due_date", limit=25), args.runs)
+    results["load_project_cold"] = timed(lambda: storage.load_project(pick()), args.runs, setup=project_cache.clear)
+    name = pick()
+    results["load_project_warm"] = timed(lambda: storage.load_project(name), args.runs)
+
+    data = storage.load_project(name)
+    results["save_project_full"] = timed(lambda: storage.save_project(name, data), args.runs)
+    counter = iter(range(10 ** 9))
+
+    def add_todo():
+        todo = {"id": f"bench-{next(counter)}", "task": "benchmark task", "completed": False}
+        data["todos"].append(todo)
+        storage.save_project(name, data, operation={"op": "add_todo", "todo": todo})
+
+    results["save_project_add_todo"] = timed(add_todo, args.runs)
+
+    index = SearchIndex(root / "search_index.sqlite3")
+    start = time.perf_counter()
+    index.rebuild(storage)
+    print(f"  search index built in {time.perf_counter() - start:.1f} s")
+    results["search"] = timed(lambda: index.search("lecture summ"), args.runs)
+    results["search_category"] = timed(lambda: index.search("deadline", "Work"), args.runs)
+
+
+def bench_auth(args, root, results):
+    auth = workload.make_auth(root, args.rounds)
+    counter = iter(range(10 ** 9))
+    results["user_register"] = timed(lambda: auth.register_user(f"bench-{next(counter)}", "password"), args.runs)
+    results["user_login"] = timed(lambda: auth.login_user("user-0000", workload.PASSWORD), args.runs)
+    token = auth.issue_session("user-0000")
+    results["user_resume_session"] = timed(lambda: auth.resume_session(token), args.runs)
+
+
+def app_test(**session):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(APP_PATH), default_timeout=120)
+    at.secrets["GOOGLE_API_KEY"] = "stub"
+    for key, value in session.items():
+        at.session_state[key] = value
+    at.run()
+    if at.exception:
+        raise SystemExit(f"dashboard_app raised: {at.exception[0].value}")
+    return at
+
+
+def text_input(at, label):
+    return next(t for t in at.text_input if t.label == label)
+
+
+def button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+
+def bench_app(args, names, results):
+    runs = args.app_runs
+    logged_in = {"logged_in": True, "username": "user-0000"}
+
+    results["app_login_page"] = timed(app_test().run, runs)
+    results["app_project_page"] = timed(app_test(selected_project=names[0], **logged_in).run, runs)
+    results["app_manage_page"] = timed(app_test(show_manage_page=True, **logged_in).run, runs)
+
+    at = app_test(selected_project=names[0], **logged_in)
+    text_input(at, "Search tasks and notes").input("lecture")
+    results["app_search"] = timed(at.run, runs)
+
+    at = app_test(selected_project=names[1], **logged_in)
+    counter = iter(range(10 ** 9))
+
+    def type_task():
+        text_input(at, "New Task").input(f"benchmark task {next(counter)}")
+        button(at, "Add Task").click()
+
+    results["app_add_task"] = timed(at.run, runs, setup=type_task)
+
+    # Video Notes end to end: submit through the form, wait for the worker to save the document
+    at = app_test(selected_project=names[2], **logged_in)
+    jobs = sqlite3.connect("video_jobs.sqlite3", timeout=30)
+
+    def submit():
+        text_input(at, "Enter YouTube URL").input(f"https://www.youtube.com/watch?v=bench{next(counter):05d}")
+        button(at, "Generate Notes").click()
+
+    def generate_notes():
+        at.run()
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            row = jobs.execute("SELECT status, error FROM jobs ORDER BY created_at DESC LIMIT 1").fetchone()
+            if row and row[0] == "done":
+                return
+            if row and row[0] == "failed":
+                raise SystemExit(f"video job failed: {row[1]}")
+            time.sleep(0.01)
+        raise SystemExit("video job did not finish")
+
+    results["app_video_notes"] = timed(generate_notes, min(runs, 5), setup=submit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    workload.add_arguments(parser)
+    parser.add_argument("--runs", type=int, default=20, help="repetitions of each storage/auth operation")
+    parser.add_argument("--app-runs", type=int, default=5, help="reruns of each dashboard scenario")
+    parser.add_argument("--skip-app", action="store_true", help="skip the Streamlit reruns")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare with results from an earlier --json run")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before failing")
+    parser.add_argument("--min-delta-ms", type=float, default=0.1, help="ignore smaller absolute slowdowns")
+    args = parser.parse_args()
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    if args.baseline:
+        args.baseline = os.path.abspath(args.baseline)
+
+    root = Path(tempfile.mkdtemp(prefix="focusboard-bench-"))
+    print(f"Generating {args.projects} projects x {args.todos} todos x {args.documents} documents "
+          f"in {root} ({args.backend})")
+    info = workload.generate(root, args.projects, args.todos, args.documents, args.doc_bytes, args.users,
+                             args.backend, args.rounds, args.seed, args.owners)
+    # user-0000 owns every owners-th project
+    names = [f"project-{i:05d}" for i in range(0, args.projects, args.owners)]
+
+    # The app and all stores use paths relative to the working directory
+    os.chdir(root)
+    (root / "focus.png").write_bytes(ICON)
+    os.environ["FOCUSBOARD_STORAGE"] = args.backend
+    os.environ["FOCUSBOARD_BCRYPT_ROUNDS"] = str(args.rounds)
+    # The stub model has no quota, don't let the request pacing dominate the timings
+    os.environ["FOCUSBOARD_GEMINI_RPM"] = "1000000"
+
+    results = {}
+    bench_storage(args, root, names, results)
+    bench_auth(args, root, results)
+    if not args.skip_app:
+        server = serve({"captions": make_json3(0.25)})
+        install_stubs(f"http://127.0.0.1:{server.server_address[1]}/captions")
+        bench_app(args, names, results)
+        server.shutdown()
+
+    for name, r in results.items():
+        print(f"  {name:<28} median {r['median_ms']:9.2f} ms   p95 {r['p95_ms']:9.2f} ms")
+
+    params = {key: value for key, value in vars(args).items() if key not in ("json", "baseline")}
+    params["generate_s"] = info["generate_s"]
+    if args.json:
+        write_json(args.json, params, results)
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} metrics regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Login latency under a burst of concurrent logins.
+
+N threads (standing in for Streamlit script threads) log in at the same
+time, either hashing inline as UserAuth used to or through UserAuth's
+bounded bcrypt pool. Meanwhile a probe thread repeatedly runs a small piece
+of Python work, standing in for page rendering, to show how much the burst
+slows down everyone else.
+
+    python -m benchmarks.bench_login --concurrency 16 --rounds 10 12
+"""
+import argparse
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import bcrypt
+
+from session_tokens import SessionTokens
+from user_auth import UserAuth
+from user_store import UserStore
+
+
+def percentiles(values):
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {"p50_ms": pick(0.5) * 1000, "p95_ms": pick(0.95) * 1000, "p99_ms": pick(0.99) * 1000,
+            "max_ms": values[-1] * 1000}
+
+
+def inline_login(store, username, password):
+    user = store.get(username)
+    return bcrypt.checkpw(password.encode("utf-8"), user["password"].encode("utf-8"))
+
+
+def burst(login, concurrency):
+    barrier = threading.Barrier(concurrency + 1)
+    latencies = []
+    lock = threading.Lock()
+
+    def run(i):
+        barrier.wait()
+        start = time.perf_counter()
+        assert login(f"user-{i}", "password")
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    stop = threading.Event()
+    render = []
+
+    def probe():
+        while not stop.is_set():
+            start = time.perf_counter()
+            sum(i * i for i in range(20000))
+            render.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(concurrency)]
+    prober = threading.Thread(target=probe)
+    for thread in threads:
+        thread.start()
+    prober.start()
+    start = time.perf_counter()
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    total = time.perf_counter() - start
+    stop.set()
+    prober.join()
+    return {"total_s": total, "login": percentiles(latencies), "render": percentiles(render)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for rounds in args.rounds:
+        workdir = Path(tempfile.mkdtemp())
+        store = UserStore(workdir / "users.sqlite3")
+        tokens = SessionTokens(workdir / "sessions.sqlite3", secret=b"benchmark")
+        auth = UserAuth(store, tokens, rounds=rounds, max_workers=args.workers)
+        for i in range(args.concurrency):
+            assert auth.register_user(f"user-{i}", "password")[0]
+
+        modes = (("inline", lambda u, p: inline_login(store, u, p)),
+                 (f"pool({args.workers})", lambda u, p: auth.login_user(u, p)[0]))
+        print(f"{args.concurrency} concurrent logins, cost {rounds}")
+        for name, login in modes:
+            result = burst(login, args.concurrency)
+            results.append({"rounds": rounds, "mode": name, **result})
+            login_p, render_p = result["login"], result["render"]
+            print(f"  {name:<8} login p50 {login_p['p50_ms']:7.1f} ms  p95 {login_p['p95_ms']:7.1f} ms"
+                  f"  p99 {login_p['p99_ms']:7.1f} ms   render p50 {render_p['p50_ms']:6.1f} ms"
+                  f"  p95 {render_p['p95_ms']:6.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
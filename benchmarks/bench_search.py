@@ -0,0 +1,93 @@
+"""Search index benchmark at 10k projects.
+
+Indexes synthetic projects (todos plus documents with bodies), then reports
+query latency for plain, prefix, multi-word and category-filtered queries,
+and the cost of re-indexing a project after a single todo changed.
+
+    python -m benchmarks.bench_search --projects 10000
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from search_index import SearchIndex
+
+from benchmarks.bench_captions import WORDS
+
+CATEGORIES = ("Personal", "Work", "Education", "Health", "Finance", "Other")
+RARE = ("invoice", "dentist", "thesis", "marathon", "mortgage", "kubernetes")
+
+
+def make_project(rng, i):
+    words = lambda n: " ".join(rng.choice(WORDS) for _ in range(n))
+    todos = [{"id": f"{i}-{t}", "task": f"{words(5)} {rng.choice(RARE)}", "completed": False}
+             for t in range(rng.randint(5, 15))]
+    documents = [{"id": f"{i}-d{d}", "title": f"Notes {words(2)}", "content": words(rng.randint(100, 400))}
+                 for d in range(rng.randint(1, 3))]
+    return {"name": f"project-{i}", "category": rng.choice(CATEGORIES), "todos": todos, "documents": documents}
+
+
+def timed(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {"p50_ms": statistics.median(times) * 1000, "p95_ms": times[int(0.95 * (len(times) - 1))] * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    index = SearchIndex(Path(tempfile.mkdtemp()) / "search_index.sqlite3")
+    start = time.perf_counter()
+    projects = []
+    for i in range(args.projects):
+        data = make_project(rng, i)
+        index.index_project(data["name"], data, None)
+        projects.append(data)
+    build = time.perf_counter() - start
+    print(f"indexed {args.projects} projects in {build:.1f} s")
+
+    results = {"projects": args.projects, "build_s": build, "queries": {}}
+    queries = (("word", "dentist", None), ("prefix", "mortg", None), ("two words", "lecture marathon", None),
+               ("category", "thesis", "Education"), ("common word", "focus", None))
+    for label, query, category in queries:
+        matches = len(index.search(query, category))
+        r = timed(lambda: index.search(query, category), args.runs)
+        results["queries"][label] = r
+        print(f"  {label:<12} {query!r:<20} {matches:>3} results  p50 {r['p50_ms']:6.2f} ms  p95 {r['p95_ms']:6.2f} ms")
+
+    data = projects[len(projects) // 2]
+
+    def edit_one_todo():
+        data["todos"][0]["task"] = f"{rng.choice(WORDS)} {rng.choice(RARE)}"
+        assert index.index_project(data["name"], data, None) == 1
+
+    def reindex_all():
+        index.remove_project(data["name"])
+        index.index_project(data["name"], data, None)
+
+    results["update_one_todo"] = timed(edit_one_todo, args.runs)
+    results["reindex_project"] = timed(reindex_all, args.runs)
+    for label in ("update_one_todo", "reindex_project"):
+        r = results[label]
+        print(f"  {label:<16} p50 {r['p50_ms']:6.2f} ms  p95 {r['p95_ms']:6.2f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Cold start and rerun time budget for dashboard_app.
+
+Imports dashboard_app in fresh interpreters to measure cold import time and
+to check that google.generativeai and yt_dlp are not loaded at startup, then
+times the first run and reruns of the login and project pages with AppTest.
+Exits with status 1 if a budget is exceeded or a heavy SDK was imported.
+
+    python -m benchmarks.bench_startup --import-budget-ms 1000 --rerun-budget-ms 250
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import workload
+from benchmarks.bench_dashboard import ICON, app_test
+from benchmarks.report import timed, write_json
+
+REPO = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("google.generativeai", "yt_dlp", "requests")
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import dashboard_app
+elapsed = time.perf_counter() - start
+print(json.dumps({"import_ms": elapsed * 1000, "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def measure_import(runs):
+    times = []
+    loaded = set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", IMPORT_PROBE % (HEAVY_MODULES,)], cwd=REPO,
+                             capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        times.append(result["import_ms"])
+        loaded.update(result["loaded"])
+    times.sort()
+    return {"runs": runs, "median_ms": times[len(times) // 2], "min_ms": times[0],
+            "p95_ms": times[int(0.95 * (len(times) - 1))]}, sorted(loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=1000)
+    parser.add_argument("--rerun-budget-ms", type=float, default=250)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    results = {}
+    failures = []
+    results["import_dashboard_app"], loaded = measure_import(args.runs)
+    if loaded:
+        failures.append(f"heavy modules imported at startup: {', '.join(loaded)}")
+
+    root = Path(tempfile.mkdtemp(prefix="focusboard-startup-"))
+    workload.generate(root, projects=20, todos=20, documents=3, users=1)
+    os.chdir(root)
+    (root / "focus.png").write_bytes(ICON)
+
+    start = time.perf_counter()
+    at = app_test()
+    results["app_first_run"] = {"runs": 1, "median_ms": (time.perf_counter() - start) * 1000}
+    results["app_login_rerun"] = timed(at.run, args.runs)
+    at = app_test(logged_in=True, username="user-0000", selected_project="project-00000")
+    results["app_project_rerun"] = timed(at.run, args.runs)
+    loaded = [m for m in HEAVY_MODULES[:2] if m in sys.modules]
+    if loaded:
+        failures.append(f"project page imported {', '.join(loaded)} before Video Notes was used")
+
+    budgets = {"import_dashboard_app": args.import_budget_ms, "app_login_rerun": args.rerun_budget_ms,
+               "app_project_rerun": args.rerun_budget_ms}
+    for name, r in results.items():
+        budget = budgets.get(name)
+        status = ""
+        if budget is not None:
+            status = f"  budget {budget:.0f} ms " + ("ok" if r["median_ms"] <= budget else "EXCEEDED")
+            if r["median_ms"] > budget:
+                failures.append(f"{name} took {r['median_ms']:.0f} ms")
+        print(f"  {name:<22} median {r['median_ms']:8.1f} ms{status}")
+
+    if args.json:
+        write_json(args.json, vars(args), results)
+    if failures:
+        print("\n" + "\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Summarization benchmark for long transcripts against a stub model.
+
+Each model call sleeps for --latency seconds, so the wall-clock time shows
+how the number of chunks and the number of concurrent calls interact. Worker
+count 1 corresponds to summarizing the chunks one after another.
+
+    python -m benchmarks.bench_summarizer --hours 1 3 --workers 1 4 8
+"""
+import argparse
+import json
+import random
+import time
+
+from summarizer import MapReduceSummarizer, chunk_segments
+
+from benchmarks.bench_captions import WORDS
+from benchmarks.stubs import StubModel
+
+
+def make_segments(hours, seed=0):
+    rng = random.Random(seed)
+    return [(t, " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 12))))
+            for t in range(0, int(hours * 3600 * 1000), 4000)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 3])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--chunk-tokens", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for hours in args.hours:
+        segments = make_segments(hours)
+        chunks = len(chunk_segments(segments, args.chunk_tokens, 200))
+        print(f"{hours:g}h transcript, {chunks} chunks of <= {args.chunk_tokens} tokens")
+        for workers in args.workers:
+            model = StubModel(args.latency)
+            summarizer = MapReduceSummarizer(model, max_chunk_tokens=args.chunk_tokens, max_workers=workers)
+            start = time.perf_counter()
+            summarizer.summarize(segments)
+            elapsed = time.perf_counter() - start
+            results.append({"hours": hours, "chunks": chunks, "workers": workers, "seconds": elapsed,
+                            "calls": model.calls, "peak_concurrency": model.peak_active})
+            print(f"  {workers:>2} workers  {elapsed:6.2f} s  {model.calls:>3} calls"
+                  f"  peak concurrency {model.peak_active}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Per-user workspaces versus the old flat project_data/ at a large total project count.
+
+Writes the same --projects projects twice: into one flat FileSystemStorage
+(the layout before workspaces, where every user listed every project) and
+into the workspaces of --users owners. Each user also gets --shared
+projects of other users shared with them. Then times what a sidebar and
+Manage page render needs for one user in both layouts: opening the storage
+cold, listing projects, one page of sorted summaries and a directory scan.
+
+    python -m benchmarks.bench_workspaces --projects 50000 --users 500
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from attachment_store import AttachmentStore
+from project_storage import FileSystemStorage
+from workspaces import Workspaces
+
+from benchmarks.report import timed, write_json
+from benchmarks.workload import make_project, username
+
+
+def generate(root, projects, users, shared, todos, seed=0):
+    rng = random.Random(seed)
+    attachments = AttachmentStore(root / "attachment_store")
+    flat = FileSystemStorage(root / "project_data", attachments)
+    workspaces = Workspaces(root / "workspaces", "filesystem", attachments, max_open=users)
+    for i in range(projects):
+        data = make_project(rng, i, todos, 0, 0)
+        flat.save_project(data["name"], data)
+        workspaces.storage(username(i % users)).save_project(data["name"], data)
+        if (i + 1) % 5000 == 0:
+            print(f"  {i + 1} projects")
+    for u in range(users):
+        for _ in range(shared):
+            i = rng.randrange(projects)
+            if i % users != u:
+                workspaces.share(username(i % users), f"project-{i:05d}", username(u))
+    return attachments
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--shared", type=int, default=5, help="projects shared with each user")
+    parser.add_argument("--todos", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    from dashboard_app import ProjectDashboard
+
+    root = Path(tempfile.mkdtemp(prefix="focusboard-workspaces-"))
+    print(f"Writing {args.projects} projects for {args.users} users twice (flat and workspaces) in {root}")
+    start = time.perf_counter()
+    attachments = generate(root, args.projects, args.users, args.shared, args.todos)
+    print(f"  generated in {time.perf_counter() - start:.1f} s")
+
+    rng = random.Random(1)
+    pick = lambda: username(rng.randrange(args.users))
+    state = {}
+
+    def open_flat():
+        state["storage"] = FileSystemStorage(root / "project_data", attachments)
+
+    def open_workspaces():
+        state["workspaces"] = Workspaces(root / "workspaces", "filesystem", attachments)
+        state["user"] = pick()
+
+    def dashboard():
+        return ProjectDashboard(username=state["user"], workspaces=state["workspaces"])
+
+    results = {
+        "flat": {
+            "get_projects_cold": timed(lambda: state["storage"].get_projects(), args.runs, setup=open_flat),
+            "get_projects_warm": timed(lambda: state["storage"].get_projects(), args.runs),
+            "list_summaries_page": timed(
+                lambda: state["storage"].list_summaries(sort="due_date", limit=25), args.runs),
+            "listdir": timed(lambda: os.listdir(root / "project_data"), args.runs),
+        },
+        "workspaces": {
+            "get_projects_cold": timed(lambda: dashboard().get_projects(), args.runs, setup=open_workspaces),
+            "get_projects_warm": timed(lambda: dashboard().get_projects(), args.runs),
+            "list_summaries_page": timed(
+                lambda: dashboard().list_project_summaries(sort="due_date", limit=25), args.runs),
+            "listdir": timed(lambda: os.listdir(state["workspaces"].path(state["user"]) / "project_data"),
+                             args.runs),
+        },
+    }
+
+    for layout, metrics in results.items():
+        print(layout)
+        for name, r in metrics.items():
+            print(f"  {name:<22} median {r['median_ms']:9.2f} ms   p95 {r['p95_ms']:9.2f} ms")
+    if args.json:
+        write_json(args.json, vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Timing, JSON output and baseline comparison shared by the benchmark scripts."""
+import json
+import math
+import platform
+import statistics
+import time
+
+
+def timed(fn, runs, setup=None):
+    """Run fn runs times (setup before each, untimed) and summarize the timings in ms."""
+    times = []
+    for _ in range(runs):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {
+        "runs": runs,
+        "median_ms": statistics.median(times) * 1000,
+        "p95_ms": times[max(0, math.ceil(0.95 * len(times)) - 1)] * 1000,
+        "min_ms": times[0] * 1000,
+    }
+
+
+def write_json(path, params, results):
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": params,
+        },
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4)
+
+
+def compare(results, baseline_path, threshold, min_delta_ms=0.1):
+    """Print each metric against the baseline, return the names that got slower than threshold allows.
+
+    Differences below min_delta_ms are treated as noise, which matters for
+    operations that only take microseconds.
+    """
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    print(f"\nCompared with {baseline_path} (threshold +{threshold:.0%})")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"  {name:<28} {result['median_ms']:9.2f} ms   (new)")
+            continue
+        ratio = result["median_ms"] / max(before["median_ms"], 1e-6)
+        flag = ""
+        delta = result["median_ms"] - before["median_ms"]
+        if ratio > 1 + threshold and delta > min_delta_ms:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"  {name:<28} {before['median_ms']:9.2f} -> {result['median_ms']:9.2f} ms  ({ratio:5.2f}x){flag}")
+    return regressions
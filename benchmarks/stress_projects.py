@@ -0,0 +1,196 @@
+"""Concurrency stress test for simultaneous edits to one project.
+
+Several processes, each with a few threads acting as Streamlit sessions,
+edit the same project at once: they add and complete todos, add documents
+and change the due date, each working from a copy loaded a few edits
+earlier, the way a session keeps its copy between reruns. Operations must
+merge and stale full saves must be refused; at the end every todo,
+completion and document must be there. A small journal compaction
+threshold makes compactions run under contention as well. For comparison,
+--legacy runs the same edits as plain read-modify-write of project_info.json.
+
+    python -m benchmarks.stress_projects --processes 4 --threads 2 --edits 100
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import project_journal
+from attachment_store import AttachmentStore
+from project_journal import VersionConflict, apply_operation
+from project_storage import FileSystemStorage, SQLiteStorage
+
+PROJECT = "shared"
+
+
+def make_storage(root, backend):
+    attachments = AttachmentStore(root / "attachment_store")
+    if backend == "sqlite":
+        return SQLiteStorage(root / "project_data.sqlite3", attachments)
+    return FileSystemStorage(root / "project_data", attachments)
+
+
+def session(storage, seed, edits, expected, counters):
+    rng = random.Random(seed)
+    data = storage.load_project(PROJECT)
+    mine = []
+    for i in range(edits):
+        if i % 5 == 0:
+            # A rerun: the session picks up what others saved
+            data = storage.load_project(PROJECT)
+        roll = rng.random()
+        if roll < 0.45 or not mine:
+            todo = {"id": uuid.uuid4().hex, "task": f"task {seed}-{i}", "completed": False}
+            op = {"op": "add_todo", "todo": todo}
+            mine.append(todo["id"])
+            expected["todos"][todo["id"]] = False
+        elif roll < 0.7:
+            todo_id = rng.choice(mine)
+            op = {"op": "set_todo", "id": todo_id, "completed": True}
+            expected["todos"][todo_id] = True
+        elif roll < 0.9:
+            doc = {"id": uuid.uuid4().hex, "title": f"doc {seed}-{i}", "content": f"body {seed}-{i}"}
+            op = {"op": "add_document", "document": doc}
+            expected["documents"][doc["id"]] = doc["content"]
+        else:
+            # A stale full save must be refused, the session reloads instead
+            data["notes"] = f"{seed}-{i}"
+            try:
+                storage.save_project(PROJECT, data)
+                counters["full_saves"] += 1
+            except VersionConflict:
+                counters["conflicts"] += 1
+                data = storage.load_project(PROJECT)
+            continue
+        version = data["version"]
+        storage.save_project(PROJECT, apply_operation(data, op), operation=op)
+        if data["version"] != version + 1:
+            counters["merges"] += 1
+
+
+def legacy_session(root, seed, edits, expected, counters):
+    # What save_project used to amount to: load the whole project, change it, rewrite it
+    path = root / "legacy" / "project_info.json"
+    rng = random.Random(seed)
+    mine = []
+    for i in range(edits):
+        with open(path) as f:
+            data = json.load(f)
+        if rng.random() < 0.6 or not mine:
+            todo = {"id": uuid.uuid4().hex, "task": f"task {seed}-{i}", "completed": False}
+            data["todos"].append(todo)
+            mine.append(todo["id"])
+            expected["todos"][todo["id"]] = False
+        else:
+            todo_id = rng.choice(mine)
+            for todo in data["todos"]:
+                if todo["id"] == todo_id:
+                    todo["completed"] = True
+            expected["todos"][todo_id] = True
+        tmp = path.with_name(f".{seed}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        tmp.replace(path)
+
+
+def worker(root, backend, process_index, threads, edits, compact_bytes):
+    project_journal.COMPACT_THRESHOLD_BYTES = compact_bytes
+    storage = make_storage(root, backend) if backend != "legacy" else None
+    results = []
+    pool = []
+    for t in range(threads):
+        expected = {"todos": {}, "documents": {}}
+        counters = {"merges": 0, "conflicts": 0, "full_saves": 0}
+        results.append({"expected": expected, "counters": counters})
+        seed = process_index * 1000 + t
+        if backend == "legacy":
+            target, args = legacy_session, (root, seed, edits, expected, counters)
+        else:
+            target, args = session, (storage, seed, edits, expected, counters)
+        pool.append(threading.Thread(target=target, args=args))
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    with open(root / f"results-{process_index}.json", "w") as f:
+        json.dump(results, f)
+
+
+def run(backend, processes, threads, edits, compact_bytes):
+    root = Path(tempfile.mkdtemp(prefix=f"focusboard-stress-{backend}-"))
+    if backend == "legacy":
+        (root / "legacy").mkdir()
+        (root / "legacy" / "project_info.json").write_text(json.dumps({"name": PROJECT, "todos": [], "documents": []}))
+    else:
+        make_storage(root, backend).save_project(PROJECT, {"name": PROJECT, "todos": [], "documents": []})
+
+    start = time.perf_counter()
+    pool = [multiprocessing.Process(target=worker, args=(root, backend, p, threads, edits, compact_bytes))
+            for p in range(processes)]
+    for process in pool:
+        process.start()
+    for process in pool:
+        process.join()
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for process in pool if process.exitcode != 0)
+
+    expected = {"todos": {}, "documents": {}}
+    counters = {"merges": 0, "conflicts": 0, "full_saves": 0}
+    for p in range(processes):
+        path = root / f"results-{p}.json"
+        if not path.exists():
+            continue
+        for result in json.loads(path.read_text()):
+            for kind in expected:
+                expected[kind].update(result["expected"][kind])
+            for key, value in result["counters"].items():
+                counters[key] += value
+
+    if backend == "legacy":
+        final = json.loads((root / "legacy" / "project_info.json").read_text())
+        storage = None
+    else:
+        # A fresh storage, so nothing is served from this process's cache
+        storage = make_storage(root, backend)
+        final = storage.load_project(PROJECT)
+    todos = {t["id"]: t["completed"] for t in final["todos"]}
+    documents = {d["id"] for d in final["documents"]}
+    lost = sum(1 for todo_id in expected["todos"] if todo_id not in todos)
+    lost += sum(1 for todo_id, done in expected["todos"].items() if done and todos.get(todo_id) is False)
+    lost += sum(1 for doc_id in expected["documents"] if doc_id not in documents)
+    if storage is not None:
+        lost += sum(1 for doc_id, body in expected["documents"].items()
+                    if doc_id in documents and storage.load_document_body(PROJECT, doc_id) != body)
+    total = len(expected["todos"]) + len(expected["documents"])
+    print(f"{backend}: {lost} of {total} updates lost, {failed} failed processes, version {final.get('version')}, "
+          f"{counters['merges']} merges, {counters['conflicts']} refused stale saves, "
+          f"{processes * threads * edits / elapsed:.0f} edits/s")
+    return lost == 0 and failed == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=2)
+    parser.add_argument("--edits", type=int, default=100, help="edits per session")
+    parser.add_argument("--backend", choices=["filesystem", "sqlite", "both"], default="both")
+    parser.add_argument("--compact-bytes", type=int, default=4096, help="journal compaction threshold")
+    parser.add_argument("--legacy", action="store_true", help="also run the old read-modify-write scheme")
+    args = parser.parse_args()
+
+    backends = ["filesystem", "sqlite"] if args.backend == "both" else [args.backend]
+    ok = all([run(backend, args.processes, args.threads, args.edits, args.compact_bytes) for backend in backends])
+    if args.legacy:
+        run("legacy", args.processes, args.threads, args.edits, args.compact_bytes)
+    if not ok:
+        raise SystemExit("project storage lost updates")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Concurrency stress test for the user store.
+
+Several processes, each with a few threads, register distinct users against
+the same database at once, and every account must survive. For comparison,
+--legacy runs the same workload against the old read-modify-write
+users.json scheme. Passwords are hashed once up front, since bcrypt cost is
+not what is being tested.
+
+    python -m benchmarks.stress_user_store --processes 4 --threads 4 --users 250
+"""
+import argparse
+import json
+import multiprocessing
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import bcrypt
+
+from user_store import UserStore
+
+PASSWORD_HASH = bcrypt.hashpw(b"password", bcrypt.gensalt(4)).decode("utf-8")
+
+
+def register_store(db_path, prefix, count):
+    store = UserStore(db_path)
+    for i in range(count):
+        assert store.add(f"{prefix}-{i}", {"password": PASSWORD_HASH, "created_at": "now"})
+
+
+def register_legacy(json_path, prefix, count):
+    # What UserAuth used to do: load the whole file, add one user, rewrite it
+    for i in range(count):
+        try:
+            with open(json_path) as f:
+                users = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            users = {}
+        users[f"{prefix}-{i}"] = {"password": PASSWORD_HASH, "created_at": "now"}
+        with open(json_path, "w") as f:
+            json.dump(users, f)
+
+
+def worker(target, path, process_index, threads, count):
+    pool = [threading.Thread(target=target, args=(path, f"p{process_index}t{t}", count)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+
+def count_legacy(json_path):
+    try:
+        with open(json_path) as f:
+            return len(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return 0
+
+
+def run(target, path, processes, threads, count):
+    start = time.perf_counter()
+    pool = [multiprocessing.Process(target=worker, args=(target, path, p, threads, count)) for p in range(processes)]
+    for process in pool:
+        process.start()
+    for process in pool:
+        process.join()
+    failed = sum(1 for process in pool if process.exitcode != 0)
+    return time.perf_counter() - start, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--users", type=int, default=250, help="registrations per thread")
+    parser.add_argument("--legacy", action="store_true", help="also run against a plain users.json")
+    args = parser.parse_args()
+
+    expected = args.processes * args.threads * args.users
+    workdir = Path(tempfile.mkdtemp())
+
+    # Seed a users.json so the one-time migration runs under contention as well
+    legacy_seed = {f"legacy-{i}": {"password": PASSWORD_HASH, "created_at": "then"} for i in range(100)}
+    (workdir / "users.json").write_text(json.dumps(legacy_seed))
+    db_path = workdir / "users.sqlite3"
+    elapsed, failed = run(register_store, db_path, args.processes, args.threads, args.users)
+    store = UserStore(db_path)
+    stored = store.count()
+    print(f"user store: {stored}/{expected + len(legacy_seed)} accounts, {failed} failed processes, "
+          f"{expected / elapsed:.0f} registrations/s")
+
+    start = time.perf_counter()
+    for i in range(1000):
+        store.get(f"p0t0-{i % args.users}")
+    print(f"  lookup: {(time.perf_counter() - start) * 1000:.3f} ms per 1000 with {stored} users")
+
+    ok = stored == expected + len(legacy_seed) and failed == 0
+    if args.legacy:
+        json_path = workdir / "legacy.json"
+        elapsed, failed = run(register_legacy, json_path, args.processes, args.threads, args.users)
+        print(f"users.json: {count_legacy(json_path)}/{expected} accounts, {failed} failed processes, "
+              f"{expected / elapsed:.0f} registrations/s")
+
+    if not ok:
+        raise SystemExit("user store lost accounts")
+
+
+if __name__ == "__main__":
+    main()
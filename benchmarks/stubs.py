@@ -0,0 +1,80 @@
+"""Deterministic stand-ins for external services used by the benchmarks."""
+import hashlib
+import importlib.util
+import sys
+import threading
+import time
+import types
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Mimics GenerativeModel.generate_content with a fixed latency per call.
+
+    The response is derived from the prompt, so runs are reproducible, and
+    calls and peak concurrency are counted.
+    """
+
+    model_name = "stub"
+
+    def __init__(self, latency=0.5):
+        self.latency = latency
+        self.calls = 0
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            time.sleep(self.latency)
+            digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:12]
+            return StubResponse(f"Summary {digest} of {len(prompt)} characters.")
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class StubYoutubeDL:
+    """Stands in for yt_dlp.YoutubeDL, every video has one English json3 track at caption_url."""
+
+    caption_url = None
+
+    def __init__(self, params=None):
+        self.params = params
+
+    def extract_info(self, url, download=False):
+        return {
+            "title": f"Stub video {url.rsplit('=', 1)[-1]}",
+            "subtitles": {"en": [{"ext": "json3", "url": self.caption_url}]},
+        }
+
+
+def install_stubs(caption_url=None, model_latency=0.0):
+    """Replace google.generativeai and yt_dlp in sys.modules with local stubs.
+
+    Must run before dashboard_app is imported (for AppTest, before the first
+    run). Nothing is sent to YouTube or Gemini afterwards.
+    """
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = lambda **kwargs: None
+    genai.GenerativeModel = lambda model_name=None, **kwargs: StubModel(model_latency)
+    if importlib.util.find_spec("google") is None:
+        google = types.ModuleType("google")
+        google.__path__ = []
+        sys.modules["google"] = google
+    sys.modules["google.generativeai"] = genai
+    if "google" in sys.modules:
+        sys.modules["google"].generativeai = genai
+
+    StubYoutubeDL.caption_url = caption_url
+    yt_dlp = types.ModuleType("yt_dlp")
+    yt_dlp.YoutubeDL = StubYoutubeDL
+    sys.modules["yt_dlp"] = yt_dlp
@@ -0,0 +1,134 @@
+"""Synthetic FocusBoard data for benchmarks.
+
+Writes N projects x M todos x K documents (of a given size) through the
+regular storage classes into the workspaces of the first --owners users
+(round-robin), plus a users/ tree with registered accounts, so the result
+looks exactly like a real installation.
+
+    python -m benchmarks.workload --out /tmp/focusboard --projects 1000 --todos 50
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from attachment_store import AttachmentStore
+from session_tokens import SessionTokens
+from user_auth import UserAuth
+from user_store import UserStore
+from workspaces import Workspaces
+
+from benchmarks.bench_captions import WORDS
+
+CATEGORIES = ("Personal", "Work", "Education", "Health", "Finance", "Other")
+PASSWORD = "benchmark-password"
+
+
+def make_workspaces(root, backend="filesystem"):
+    root = Path(root)
+    return Workspaces(root / "workspaces", backend, AttachmentStore(root / "attachment_store"))
+
+
+def make_storage(root, backend="filesystem", username="user-0000"):
+    return make_workspaces(root, backend).storage(username)
+
+
+def username(index):
+    return f"user-{index:04d}"
+
+
+def make_auth(root, rounds=4):
+    root = Path(root)
+    return UserAuth(UserStore(root / "users" / "users.sqlite3"),
+                    SessionTokens(root / "users" / "sessions.sqlite3"), rounds=rounds)
+
+
+def make_project(rng, index, todos, documents, doc_bytes):
+    words = lambda n: " ".join(rng.choice(WORDS) for _ in range(n))
+    today = date.today()
+    due = today + timedelta(days=rng.randint(-10, 90)) if rng.random() < 0.7 else None
+    return {
+        "name": f"project-{index:05d}",
+        "category": rng.choice(CATEGORIES),
+        "created_date": (today - timedelta(days=rng.randint(0, 365))).strftime("%Y-%m-%d"),
+        "due_date": due.strftime("%Y-%m-%d") if due else None,
+        "todos": [{
+            "id": f"{index}-{t}",
+            "task": words(rng.randint(3, 10)),
+            "completed": rng.random() < 0.4,
+            "date_added": today.strftime("%Y-%m-%d"),
+            # Every fifth task has a due date; not drawn from rng, so the rest of the data stays the same
+            "due_date": (today + timedelta(days=(index * 7 + t * 13) % 100 - 10)).strftime("%Y-%m-%d")
+                        if t % 5 == 0 else None,
+        } for t in range(todos)],
+        "documents": [{
+            "id": f"{index}-d{d}",
+            "title": f"Notes on {words(2)}",
+            "content": (words(doc_bytes // 6 + 1) + " ")[:doc_bytes],
+            "date_created": today.strftime("%Y-%m-%d"),
+            "type": "markdown",
+        } for d in range(documents)],
+        "archived": False,
+    }
+
+
+def generate(root, projects=100, todos=20, documents=5, doc_bytes=2000, users=20, backend="filesystem",
+             rounds=4, seed=0, owners=1):
+    """Create the tree under root and return a dict describing it.
+
+    Project i belongs to user i % owners.
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    workspaces = make_workspaces(root, backend)
+    start = time.perf_counter()
+    for i in range(projects):
+        data = make_project(rng, i, todos, documents, doc_bytes)
+        workspaces.storage(username(i % owners)).save_project(data["name"], data)
+    # Saved past ProjectDashboard, so the search indexes are filled in one pass afterwards
+    for owner in range(min(owners, projects)):
+        storage, index = workspaces.open(username(owner))
+        index.rebuild(storage)
+    auth = make_auth(root, rounds)
+    for i in range(users):
+        auth.register_user(username(i), PASSWORD)
+    return {
+        "root": str(root),
+        "backend": backend,
+        "projects": projects,
+        "todos": todos,
+        "documents": documents,
+        "doc_bytes": doc_bytes,
+        "users": users,
+        "owners": owners,
+        "generate_s": time.perf_counter() - start,
+    }
+
+
+def add_arguments(parser):
+    parser.add_argument("--projects", type=int, default=100)
+    parser.add_argument("--todos", type=int, default=20)
+    parser.add_argument("--documents", type=int, default=5)
+    parser.add_argument("--doc-bytes", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--owners", type=int, default=1, help="users the projects are spread over")
+    parser.add_argument("--backend", choices=["filesystem", "sqlite"], default="filesystem")
+    parser.add_argument("--rounds", type=int, default=4, help="bcrypt cost for the generated accounts")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True)
+    add_arguments(parser)
+    args = parser.parse_args()
+    info = generate(args.out, args.projects, args.todos, args.documents, args.doc_bytes, args.users,
+                    args.backend, args.rounds, args.seed, args.owners)
+    print(f"Generated {info['projects']} projects and {info['users']} users in {info['generate_s']:.1f} s "
+          f"under {info['root']}")
+
+
+if __name__ == "__main__":
+    main()
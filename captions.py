@@ -0,0 +1,177 @@
+import codecs
+import json
+import re
+import threading
+
+import tracing
+
+CHUNK_SIZE = 64 * 1024
+PREFERRED_LANGUAGES = ("en", "en-US", "en-GB")
+
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def iter_json3_events(chunks):
+    """Yield the events of a json3 caption payload as they arrive.
+
+    chunks is any iterable of bytes (e.g. response.iter_content()). Only the
+    event currently being decoded is held in memory, not the whole payload.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        try:
+            data = next(chunks)
+        except StopIteration:
+            eof = True
+            data = b""
+        # Drop what was already consumed so the buffer stays small
+        buf = buf[pos:] + utf8.decode(data, final=eof)
+        pos = 0
+
+    # Skip ahead to the start of the "events" array
+    while True:
+        start = buf.find('"events"')
+        if start != -1:
+            bracket = buf.find("[", start)
+            if bracket != -1:
+                pos = bracket + 1
+                break
+        if eof:
+            return
+        fill()
+
+    skip = _SEPARATORS.match
+    while True:
+        pos = skip(buf, pos).end()
+        if pos >= len(buf):
+            if eof:
+                return
+            fill()
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            event, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        pos = end
+        yield event
+
+
+def iter_json3_segments(chunks):
+    """Yield (start_ms, text) for every caption segment in a json3 payload."""
+    for event in iter_json3_events(chunks):
+        segs = event.get("segs")
+        if not segs:
+            continue
+        start = event.get("tStartMs", 0)
+        for seg in segs:
+            text = seg.get("utf8")
+            if text:
+                yield start + seg.get("tOffsetMs", 0), text
+
+
+def _counted(chunks, span):
+    for chunk in chunks:
+        span.add("bytes_read", len(chunk))
+        yield chunk
+
+
+def choose_track(info, languages=PREFERRED_LANGUAGES):
+    """Pick one json3 caption track, preferring manual subtitles and the given languages.
+
+    Returns (language, track) or (None, None) if the video has no usable captions.
+    """
+    for source in ("subtitles", "automatic_captions"):
+        tracks = info.get(source) or {}
+        candidates = list(languages) + sorted(lang for lang in tracks if lang.split("-")[0] == languages[0])
+        for lang in candidates:
+            for track in tracks.get(lang, []):
+                if track.get("ext") == "json3" and track.get("url"):
+                    return lang, track
+    return None, None
+
+
+class CaptionFetcher:
+    """Fetches video titles and caption segments with long-lived clients.
+
+    A single requests session (with a connection pool) is shared by all
+    threads, and each worker thread keeps its own YoutubeDL instance, since
+    YoutubeDL is not thread-safe. Implements the extractor interface used by
+    VideoJobQueue.
+    """
+
+    ydl_opts = {
+        'writesubtitles': True,
+        'writeautomaticsub': True,
+        'subtitlesformat': 'json3',
+        'skip_download': True,
+        'quiet': True,
+        'no_warnings': True
+    }
+
+    def __init__(self, session=None, languages=PREFERRED_LANGUAGES, pool_size=8, timeout=30):
+        self.languages = languages
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = session
+        self._session_lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def _ydl(self):
+        ydl = getattr(self._local, "ydl", None)
+        if ydl is None:
+            from yt_dlp import YoutubeDL
+
+            ydl = YoutubeDL(self.ydl_opts)
+            self._local.ydl = ydl
+        return ydl
+
+    def fetch_segments(self, caption_url):
+        with tracing.span("captions.download") as span:
+            with self.session.get(caption_url, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                chunks = response.iter_content(CHUNK_SIZE)
+                if tracing.ENABLED:
+                    chunks = _counted(chunks, span)
+                return list(iter_json3_segments(chunks))
+
+    def fetch(self, url):
+        with tracing.span("youtube.extract_info"):
+            info = self._ydl().extract_info(url, download=False)
+        language, track = choose_track(info, self.languages)
+        if track is None:
+            raise Exception("Could not extract captions from the video.")
+        segments = self.fetch_segments(track["url"])
+        if not any(text.strip() for _, text in segments):
+            raise Exception("Could not extract captions from the video.")
+        return {
+            "title": info.get("title", "Untitled Video"),
+            "language": language,
+            "segments": segments,
+        }
@@ -1,85 +1,252 @@
 import streamlit as st
 import os
-import json
 import markdown
-from datetime import datetime
-from pathlib import Path
-import shutil
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import base64
-from yt_dlp import YoutubeDL
-import google.generativeai as genai  # Add this import
-import time  # Add this import
+import threading
+import uuid
 from user_auth import UserAuth
+from project_catalog import summary_sort_key
+from project_journal import VersionConflict, apply_operation
+from workspaces import auto_archive_policy, create_workspaces, qualified_name, split_name, start_auto_archive
+from attachment_store import attachment_name
+from video_jobs import VideoJobQueue, ACTIVE_STATUSES
+from captions import CaptionFetcher
+from summarizer import MapReduceSummarizer
+from video_cache import VideoCache
+import tracing
 
-# Add Gemini setup
-genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])  # Replace this with your Gemini API key
+class GeminiModel:
+    """Gemini client that imports and configures google.generativeai on first use.
+
+    The SDK takes about a second to import, so it is only loaded once a video
+    is actually summarized instead of on every cold start.
+    """
+
+    def __init__(self, model_name, api_key):
+        # Same name the SDK reports, so summaries cached under it stay valid
+        self.model_name = model_name if model_name.startswith("models/") else f"models/{model_name}"
+        self.api_key = api_key
+        self._model = None
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    with tracing.span("gemini.import_sdk"):
+                        import google.generativeai as genai
+                        genai.configure(api_key=self.api_key)
+                        self._model = genai.GenerativeModel(self.model_name)
+        return self._model.generate_content(prompt)
+
+AGENDA_BUCKETS = {"overdue": "Overdue", "today": "Today", "this_week": "This week", "later": "Later"}
 
 class ProjectDashboard:
-    def __init__(self):
-        self.data_dir = Path("project_data")
-        self.data_dir.mkdir(exist_ok=True)
-        
-    def save_project(self, project_name, data):
-        # Add IDs to todos if they don't have one
+    def __init__(self, storage=None, search_index=None, username=None, workspaces=None, timezone=None):
+        # Scoped to one user's namespace when given workspaces, see workspaces.py
+        self.username = username
+        self.workspaces = workspaces
+        # Day boundaries are in the user's timezone, None for the server's local time
+        self.timezone = timezone
+        self._today = None
+        if storage is None:
+            # The app always opens the user's workspace, explicit storage is for tools and benchmarks
+            storage, search_index = workspaces.open(username)
+        self.storage = storage
+        self.search_index = search_index
+    
+    def _resolve(self, project_name):
+        """Return (owner, storage, search_index, name) for an own or a shared project."""
+        if self.workspaces is not None and "/" in project_name:
+            owner, name = split_name(project_name)
+            if self.workspaces.is_member(self.username, owner, name):
+                return (owner,) + self.workspaces.open(owner) + (name,)
+        return self.username, self.storage, self.search_index, project_name
+    
+    def _shared_by_owner(self):
+        shared = {}
+        for owner, name in self.workspaces.shared_with(self.username) if self.workspaces else []:
+            shared.setdefault(owner, []).append(name)
+        return shared
+    
+    def _shared_summaries(self, category=None):
+        if self.workspaces is None:
+            return []
+        summaries = []
+        for owner, name in self.workspaces.shared_with(self.username):
+            summary = self.workspaces.storage(owner).get_project_summary(name)
+            if summary and (category is None or summary.get("category") == category):
+                summaries.append(dict(summary, name=qualified_name(owner, name), owner=owner))
+        return summaries
+    
+    def job_key(self, project_name):
+        # Video jobs outlive the session, so they name the owning namespace
+        owner, _, _, name = self._resolve(project_name)
+        return qualified_name(owner, name) if owner else name
+    
+    def share_project(self, project_name, member):
+        self.workspaces.share(self.username, project_name, member)
+    
+    def unshare_project(self, project_name, member):
+        self.workspaces.unshare(self.username, project_name, member)
+    
+    def project_members(self, project_name):
+        return self.workspaces.members(self.username, project_name)
+    
+    def save_project(self, project_name, data, operation=None):
+        owner, storage, search_index, project_name = self._resolve(project_name)
+        # Add IDs to todos and documents if they don't have one
         for todo in data["todos"]:
             if "id" not in todo:
-                todo["id"] = str(datetime.now().timestamp())
+                todo["id"] = uuid.uuid4().hex
+        for doc in data["documents"]:
+            if "id" not in doc:
+                doc["id"] = uuid.uuid4().hex
         
-        project_dir = self.data_dir / project_name
-        project_dir.mkdir(exist_ok=True)
-        
-        # Create attachments directory if it doesn't exist
-        attachments_dir = project_dir / "attachments"
-        attachments_dir.mkdir(exist_ok=True)
-        
-        with open(project_dir / "project_info.json", "w") as f:
-            json.dump(data, f, indent=4)
+        with tracing.span("storage.save_project", op=operation["op"] if operation else "full"):
+            storage.save_project(project_name, data, operation)
+        # Only the todos and documents that changed are re-indexed
+        with tracing.span("search.index_project") as span:
+            span.add("entries_indexed", search_index.index_project(
+                project_name, data, lambda doc_id: storage.load_document_body(project_name, doc_id)))
+    
+    def search(self, query, category=None, limit=20):
+        with tracing.span("search.query"):
+            results = self.search_index.search(query, category, limit)
+            shared = self._shared_by_owner()
+            if not shared:
+                return results
+            for owner, names in shared.items():
+                for result in self.workspaces.search_index(owner).search(query, category, limit, names):
+                    result["project"] = qualified_name(owner, result["project"])
+                    results.append(result)
+            # bm25 scores of different indexes are not exactly comparable, but close enough to merge
+            results.sort(key=lambda result: result["score"], reverse=True)
+            return results[:limit]
+    
+    def load_document_body(self, project_name, doc):
+        # Documents that have not been saved yet still carry their content
+        if "content" in doc:
+            return doc["content"] or ""
+        _, storage, _, project_name = self._resolve(project_name)
+        with tracing.span("storage.load_document_body"):
+            return storage.load_document_body(project_name, doc["id"])
     
     def save_attachment(self, project_name, file):
-        project_dir = self.data_dir / project_name / "attachments"
-        file_path = project_dir / file.name
-        with open(file_path, "wb") as f:
-            f.write(file.getvalue())
-        return str(file_path)
+        _, storage, _, project_name = self._resolve(project_name)
+        return storage.save_attachment(project_name, file)
     
     def get_attachment(self, file_path):
-        with open(file_path, "rb") as f:
-            return f.read()
+        return self.storage.get_attachment(file_path)
     
     def archive_project(self, project_name):
-        source_dir = self.data_dir / project_name
-        archive_dir = self.data_dir / "archived" / project_name
-        archive_dir.parent.mkdir(exist_ok=True)
-        shutil.move(str(source_dir), str(archive_dir))
+        owner, storage, search_index, project_name = self._resolve(project_name)
+        if owner != self.username:
+            # Members leave a shared project instead of archiving it for everyone
+            self.workspaces.unshare(owner, project_name, self.username)
+            return None
+        manifest = storage.archive_project(project_name)
+        search_index.remove_project(project_name)
+        if self.workspaces is not None:
+            self.workspaces.unshare_all(owner, project_name)
+        return manifest
+    
+    def list_archived(self, query=None):
+        # Only this user's own archive; shared projects are archived by their owner
+        with tracing.span("storage.list_archived"):
+            return self.storage.list_archived(query)
+    
+    def load_archived_project(self, project_name):
+        with tracing.span("storage.load_archived_project"):
+            return self.storage.load_archived_project(project_name)
+    
+    def load_archived_document_body(self, project_name, doc):
+        return self.storage.load_document_body(project_name, doc["id"], archived=True)
+    
+    def get_archived_attachment(self, project_name, attachment):
+        return self.storage.get_archived_attachment(project_name, attachment)
+    
+    def restore_project(self, project_name):
+        with tracing.span("storage.restore_project"):
+            data = self.storage.restore_project(project_name)
+        if data is not None:
+            self.search_index.index_project(
+                project_name, data, lambda doc_id: self.storage.load_document_body(project_name, doc_id))
+        return data
+    
+    def delete_project(self, project_name):
+        owner, storage, search_index, project_name = self._resolve(project_name)
+        if owner != self.username:
+            self.workspaces.unshare(owner, project_name, self.username)
+            return True
+        search_index.remove_project(project_name)
+        if self.workspaces is not None:
+            self.workspaces.unshare_all(owner, project_name)
+        return storage.delete_project(project_name)
     
     def load_project(self, project_name):
-        project_dir = self.data_dir / project_name
-        project_file = project_dir / "project_info.json"
-        
-        if not project_file.exists():
-            return None
-        
-        try:
-            with open(project_file, "r") as f:
-                return json.load(f)
-        except:
-            return None
+        _, storage, _, project_name = self._resolve(project_name)
+        with tracing.span("storage.load_project"):
+            return storage.load_project(project_name)
     
-    def get_projects(self):
-        # Only return projects that have valid project_info.json files
-        projects = []
-        for d in self.data_dir.iterdir():
-            if d.is_dir() and d.name != "archived":
-                if (d / "project_info.json").exists():
-                    projects.append(d.name)
-        return projects
+    def get_projects(self, category=None):
+        with tracing.span("storage.get_projects"):
+            return list(self.storage.get_projects(category)) + [s["name"] for s in self._shared_summaries(category)]
+    
+    def get_project_summary(self, project_name):
+        _, storage, _, project_name = self._resolve(project_name)
+        return storage.get_project_summary(project_name)
+    
+    def list_project_summaries(self, category=None, sort="name", offset=0, limit=None):
+        with tracing.span("storage.list_summaries"):
+            shared = self._shared_summaries(category)
+            if not shared:
+                return self.storage.list_summaries(category, sort, offset, limit)
+            # Shared projects are merged in here; both lists only hold this user's projects
+            total, own = self.storage.list_summaries(category, sort)
+            entries = sorted(own + shared, key=summary_sort_key(sort))
+            return total + len(shared), entries[offset:None if limit is None else offset + limit]
+    
+    def today(self):
+        """The user's current date, taken once so that a whole rerun agrees on it."""
+        if self._today is None:
+            self._today = datetime.now(self.timezone).date()
+        return self._today
     
     def calculate_days_until_due(self, due_date):
         if not due_date:
             return None
-        due = datetime.strptime(due_date, "%Y-%m-%d")
-        days = (due - datetime.now()).days
-        return days
+        return (date.fromisoformat(due_date) - self.today()).days
+    
+    def agenda(self, tasks=True, limit=None):
+        """Due dates of the user's own and shared projects, grouped into AGENDA_BUCKETS.
+        
+        "this_week" runs to the end of Sunday. Every bucket is a range query
+        on the due-date index (see ProjectStorage.list_due), at most limit
+        items, soonest first. tasks=False leaves out task due dates.
+        """
+        today = self.today()
+        tomorrow = today + timedelta(days=1)
+        week_end = today + timedelta(days=7 - today.weekday())
+        bounds = [None, today.isoformat(), tomorrow.isoformat(), week_end.isoformat(), None]
+        shared = self._shared_by_owner()
+        agenda = {}
+        with tracing.span("storage.list_due"):
+            for i, bucket in enumerate(AGENDA_BUCKETS):
+                start, end = bounds[i], bounds[i + 1]
+                items = self.storage.list_due(start, end, limit=limit, tasks=tasks)
+                for owner, names in shared.items():
+                    for item in self.workspaces.storage(owner).list_due(start, end, names, limit, tasks):
+                        items.append(dict(item, project=qualified_name(owner, item["project"])))
+                if shared:
+                    items.sort(key=lambda item: (item["due_date"], item["project"]))
+                agenda[bucket] = items[:limit]
+        return agenda
+
+def open_search_result(project_name):
+    st.session_state.selected_project = project_name
 
 def init_session_state():
     if "categories" not in st.session_state:
@@ -88,12 +255,20 @@ def init_session_state():
         ]
     if "show_manage_page" not in st.session_state:
         st.session_state.show_manage_page = False
+    if "show_agenda_page" not in st.session_state:
+        st.session_state.show_agenda_page = False
 
+@st.cache_resource
+def get_user_auth():
+    # One user store per server process, shared by all sessions
+    return UserAuth()
+
+@tracing.traced("render.login_page")
 def show_login_page():
     st.title("FocusBoard")
     st.subheader("Your personal productivity hub")
     
-    auth = UserAuth()
+    auth = get_user_auth()
     
     tab1, tab2 = st.tabs(["Login", "Register"])
     
@@ -108,6 +283,9 @@ def show_login_page():
                 if success:
                     st.session_state.logged_in = True
                     st.session_state.username = username
+                    # Keep the token in the URL so reloads and new tabs resume the session
+                    st.session_state.session_token = auth.issue_session(username)
+                    st.query_params["session"] = st.session_state.session_token
                     st.success(message)
                     st.rerun()
                 else:
@@ -130,116 +308,471 @@ def show_login_page():
                     else:
                         st.error(message)
 
+def due_text(days_until_due):
+    return (f"**{days_until_due} days** until due" if days_until_due > 0
+            else "**Due today!**" if days_until_due == 0
+            else f"**{abs(days_until_due)} days overdue**")
+
+AGENDA_LIMIT = 50
+
+def open_agenda_item(project_name):
+    st.session_state.selected_project = project_name
+    st.session_state.show_agenda_page = False
+
+@tracing.traced("render.agenda_page")
+def show_agenda_page(dashboard):
+    st.title("Agenda")
+    tasks = st.toggle("Include task due dates", value=True, key="agenda_tasks")
+    st.caption(f"{dashboard.today():%A, %d %B %Y}" + (f" · {dashboard.timezone}" if dashboard.timezone else ""))
+    
+    # One more than shown, to tell whether a bucket was cut off
+    agenda = dashboard.agenda(tasks, AGENDA_LIMIT + 1)
+    for bucket, label in AGENDA_BUCKETS.items():
+        items = agenda[bucket]
+        st.subheader(f"{label} ({len(items) if len(items) <= AGENDA_LIMIT else f'{AGENDA_LIMIT}+'})")
+        if not items:
+            st.caption("Nothing due")
+        for i, item in enumerate(items[:AGENDA_LIMIT]):
+            col_item, col_due = st.columns([4, 1])
+            with col_item:
+                icon = "📁" if item["kind"] == "project" else "☑️"
+                st.button(f"{icon} {item['title']}", key=f"agenda_{bucket}_{i}",
+                          on_click=open_agenda_item, args=(item["project"],))
+                if item["kind"] == "task":
+                    st.caption(item["project"])
+            with col_due:
+                st.markdown(due_text(dashboard.calculate_days_until_due(item["due_date"])))
+                st.caption(item["due_date"])
+
 # Add this new function to handle the manage projects page
+@tracing.traced("render.manage_page")
 def show_manage_projects_page(dashboard):
     st.title("Manage Projects")
     
-    projects = dashboard.get_projects()
-    if not projects:
+    if st.toggle("Archived projects", key="manage_archived"):
+        show_archived_projects(dashboard)
+        return
+    
+    sort_labels = {"due_date": "Due date", "completion": "Completion", "category": "Category", "name": "Name"}
+    col_sort, col_category, col_size = st.columns([2, 2, 1])
+    with col_sort:
+        sort = st.selectbox("Sort by", list(sort_labels), format_func=sort_labels.get, key="manage_sort")
+    with col_category:
+        category = st.selectbox("Category", ["All"] + st.session_state.categories, key="manage_category")
+    with col_size:
+        page_size = st.selectbox("Per page", [10, 25, 50], key="manage_page_size")
+    
+    # Only the projects on the current page are fetched, sorted by the storage backend
+    page = st.session_state.get("manage_page", 0)
+    total, summaries = dashboard.list_project_summaries(
+        None if category == "All" else category, sort, page * page_size, page_size)
+    if not total:
         st.info("No projects found.")
         return
+    page_count = (total + page_size - 1) // page_size
+    if page >= page_count:
+        st.session_state.manage_page = page_count - 1
+        st.rerun()
         
     # Create a card-like display for each project
-    for project in projects:
-        project_data = dashboard.load_project(project)
-        if not project_data:
-            continue
-            
-        with st.expander(f"📁 {project}", expanded=True):
+    for summary in summaries:
+        project = summary["name"]
+        total_tasks = summary.get('total_tasks', 0)
+        completed_tasks = summary.get('completed_tasks', 0)
+        total_docs = summary.get('total_documents', 0)
+        days_until_due = dashboard.calculate_days_until_due(summary.get('due_date'))
+        
+        with st.container(border=True):
             col1, col2, col3 = st.columns([2, 2, 1])
             
             with col1:
-                st.markdown(f"**Category:** {project_data.get('category', 'N/A')}")
-                st.markdown(f"**Created:** {project_data.get('created_date', 'N/A')}")
-                
-                # Due date editor
-                current_due = datetime.strptime(project_data['due_date'], "%Y-%m-%d") if project_data.get('due_date') else None
-                new_due_date = st.date_input(
-                    "Due Date",
-                    value=current_due,
-                    min_value=datetime.now().date() if not current_due else None,
-                    key=f"due_date_{project}"
-                )
-                
-                if new_due_date and (not current_due or new_due_date.strftime("%Y-%m-%d") != project_data['due_date']):
-                    project_data['due_date'] = new_due_date.strftime("%Y-%m-%d")
-                    dashboard.save_project(project, project_data)
-                    st.success("Due date updated!")
+                st.markdown(f"**📁 {project}**")
+                st.caption(f"{summary.get('category') or 'N/A'} · Created {summary.get('created_date') or 'N/A'}"
+                           + (f" · Shared by {summary['owner']}" if summary.get("owner") else ""))
             
             with col2:
                 # Project statistics
-                total_tasks = len(project_data.get('todos', []))
-                completed_tasks = len([t for t in project_data.get('todos', []) if t.get('completed')])
-                total_docs = len(project_data.get('documents', []))
-                
-                st.markdown(f"**Tasks:** {completed_tasks}/{total_tasks} completed")
-                st.markdown(f"**Documents:** {total_docs}")
+                st.markdown(f"**Tasks:** {completed_tasks}/{total_tasks} completed · **Documents:** {total_docs}")
                 
                 # Days until due
-                if project_data.get('due_date'):
-                    days_until_due = dashboard.calculate_days_until_due(project_data['due_date'])
-                    if days_until_due is not None:
-                        due_text = (f"**{days_until_due} days** until due" if days_until_due > 0 
-                                  else "**Due today!**" if days_until_due == 0 
-                                  else f"**{abs(days_until_due)} days overdue**")
-                        st.markdown(due_text)
+                if days_until_due is not None:
+                    st.markdown(due_text(days_until_due))
             
             with col3:
-                # Delete project button
-                if st.button("🗑️ Delete Project", key=f"delete_{project}"):
-                    if "confirm_delete" not in st.session_state:
-                        st.session_state.confirm_delete = {}
-                    st.session_state.confirm_delete[project] = True
+                # Editing widgets are only built for cards that are opened
+                editing = st.toggle("Edit", key=f"edit_{project}")
+            
+            if editing:
+                show_project_editor(dashboard, project, summary)
+    
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("← Previous", disabled=page == 0, key="manage_prev"):
+            st.session_state.manage_page = page - 1
+            st.rerun()
+    with col_page:
+        st.caption(f"Page {page + 1} of {page_count} · {total} projects")
+    with col_next:
+        if st.button("Next →", disabled=page >= page_count - 1, key="manage_next"):
+            st.session_state.manage_page = page + 1
+            st.rerun()
+
+def show_project_editor(dashboard, project, summary):
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        # Due date editor
+        current_due = datetime.strptime(summary['due_date'], "%Y-%m-%d") if summary.get('due_date') else None
+        new_due_date = st.date_input(
+            "Due Date",
+            value=current_due,
+            min_value=dashboard.today() if not current_due else None,
+            key=f"due_date_{project}"
+        )
+        
+        if new_due_date and (not current_due or new_due_date.strftime("%Y-%m-%d") != summary['due_date']):
+            # Saved as an operation, so it merges with edits from other sessions
+            project_data = dashboard.load_project(project)
+            if project_data:
+                operation = {"op": "set_fields", "fields": {"due_date": new_due_date.strftime("%Y-%m-%d")}}
+                dashboard.save_project(project, apply_operation(project_data, operation), operation=operation)
+                st.toast("Due date updated!")
+                st.rerun()
+        
+        if dashboard.workspaces is not None and not summary.get("owner"):
+            show_project_sharing(dashboard, project)
+    
+    with col2:
+        if not summary.get("owner") and st.button("📦 Archive Project", key=f"archive_{project}"):
+            manifest = dashboard.archive_project(project)
+            renamed = manifest and manifest["project"] != project
+            st.toast(f"Archived {project}" + (f" as {manifest['project']}" if renamed else ""))
+            st.rerun()
+        
+        # Delete project button; members of a shared project only leave it
+        if st.button("🚪 Leave Project" if summary.get("owner") else "🗑️ Delete Project", key=f"delete_{project}"):
+            if "confirm_delete" not in st.session_state:
+                st.session_state.confirm_delete = {}
+            st.session_state.confirm_delete[project] = True
+            st.rerun()
+        
+        # Show confirmation
+        if st.session_state.get("confirm_delete", {}).get(project):
+            st.warning("Are you sure? This cannot be undone!")
+            col_yes, col_no = st.columns(2)
+            with col_yes:
+                if st.button("Yes, delete", key=f"confirm_{project}"):
+                    try:
+                        # Delete project and all of its attachments
+                        if dashboard.delete_project(project):
+                            st.success("Project deleted successfully!")
+                        else:
+                            st.error("Could not fully delete the project. Some files may be in use.")
+                        
+                        # Clear confirmation state
+                        st.session_state.confirm_delete[project] = False
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Error deleting project: {str(e)}")
+            with col_no:
+                if st.button("Cancel", key=f"cancel_{project}"):
+                    st.session_state.confirm_delete[project] = False
                     st.rerun()
-                
-                # Show confirmation
-                if st.session_state.get("confirm_delete", {}).get(project):
-                    st.warning("Are you sure? This cannot be undone!")
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        if st.button("Yes, delete", key=f"confirm_{project}"):
-                            try:
-                                # Delete project directory and all contents
-                                project_dir = dashboard.data_dir / project
-                                if project_dir.exists():
-                                    # First, try to remove any read-only attributes
-                                    for root, dirs, files in os.walk(str(project_dir)):
-                                        for dir_name in dirs:
-                                            dir_path = Path(root) / dir_name
-                                            try:
-                                                os.chmod(str(dir_path), 0o777)
-                                            except:
-                                                pass
-                                        for file_name in files:
-                                            file_path = Path(root) / file_name
-                                            try:
-                                                os.chmod(str(file_path), 0o777)
-                                            except:
-                                                pass
-                                    
-                                    # Then try to remove the directory
-                                    shutil.rmtree(project_dir, ignore_errors=True)
-                                    
-                                    # Verify if deletion was successful
-                                    if project_dir.exists():
-                                        st.error("Could not fully delete the project. Some files may be in use.")
-                                    else:
-                                        st.success("Project deleted successfully!")
-                                
-                                # Clear confirmation state
-                                st.session_state.confirm_delete[project] = False
-                                st.rerun()
-                            except Exception as e:
-                                st.error(f"Error deleting project: {str(e)}")
-                    with col2:
-                        if st.button("Cancel", key=f"cancel_{project}"):
-                            st.session_state.confirm_delete[project] = False
-                            st.rerun()
 
+ARCHIVE_PAGE_SIZE = 25
+
+@tracing.traced("render.archived_projects")
+def show_archived_projects(dashboard):
+    query = st.text_input("Search archived projects", key="archived_query")
+    # Listed and searched from the archive manifests, no archive is opened for this
+    manifests = dashboard.list_archived(query or None)
+    if not manifests:
+        st.info("No archived projects found.")
+        return
+    
+    for manifest in manifests[:ARCHIVE_PAGE_SIZE]:
+        project = manifest["project"]
+        with st.container(border=True):
+            col1, col2, col3 = st.columns([2, 2, 1])
+            with col1:
+                st.markdown(f"**📦 {project}**")
+                archived_at = datetime.fromtimestamp(manifest["archived_at"]).strftime("%Y-%m-%d")
+                st.caption(f"{manifest.get('category') or 'N/A'} · Archived {archived_at}")
+            with col2:
+                st.markdown(f"**Tasks:** {manifest['completed_tasks']}/{manifest['total_tasks']} completed · "
+                            f"**Documents:** {manifest['total_documents']}")
+                st.caption(f"{manifest['packed_bytes'] / 1024:.0f} KB packed, "
+                           f"{manifest['unpacked_bytes'] / 1024:.0f} KB unpacked")
+            with col3:
+                opened = st.toggle("Open", key=f"open_archived_{project}")
+                if st.button("Restore", key=f"restore_{project}"):
+                    try:
+                        dashboard.restore_project(project)
+                        st.toast(f"Restored {project}")
+                        st.rerun()
+                    except VersionConflict:
+                        st.error(f"An active project named {project} already exists")
+            if opened:
+                show_archived_project(dashboard, project)
+    
+    if len(manifests) > ARCHIVE_PAGE_SIZE:
+        st.caption(f"Showing {ARCHIVE_PAGE_SIZE} of {len(manifests)} archived projects, search to narrow them down")
+
+def show_archived_project(dashboard, project):
+    # Opening reads project.json only; bodies and attachments are extracted per document
+    data = dashboard.load_archived_project(project)
+    if data is None:
+        st.error(f"Could not open the archive of {project}")
+        return
+    col_todos, col_docs = st.columns(2)
+    with col_todos:
+        for todo in data["todos"]:
+            st.markdown(f"{'☑️' if todo.get('completed') else '⬜'} {todo['task']}")
+    with col_docs:
+        for doc in data["documents"]:
+            if st.toggle(f"{doc['title']} ({doc.get('date_created')})", key=f"show_archived_doc_{project}_{doc['id']}"):
+                with st.container(border=True):
+                    st.markdown(dashboard.load_archived_document_body(project, doc))
+                    if doc.get("attachment"):
+                        file_name = attachment_name(doc["attachment"])
+                        st.download_button(
+                            f"Download {file_name}",
+                            dashboard.get_archived_attachment(project, doc["attachment"]),
+                            file_name=file_name,
+                            key=f"download_archived_{project}_{doc['id']}"
+                        )
+
+def show_project_sharing(dashboard, project):
+    members = dashboard.project_members(project)
+    if members:
+        st.caption("Shared with " + ", ".join(members))
+    member = st.text_input("Share with user", key=f"share_with_{project}")
+    col_share, col_unshare = st.columns(2)
+    with col_share:
+        if st.button("Share", key=f"share_{project}", disabled=not member):
+            if member == st.session_state.username or get_user_auth().store.get(member) is None:
+                st.error(f"No other user named {member}")
+            else:
+                dashboard.share_project(project, member)
+                st.toast(f"Shared with {member}")
+                st.rerun()
+    with col_unshare:
+        if st.button("Stop sharing", key=f"unshare_{project}", disabled=member not in members):
+            dashboard.unshare_project(project, member)
+            st.rerun()
+
+TODO_PAGE_SIZE = 25
+
+@tracing.traced("render.todo_list")
+def show_todo_list(dashboard, project_name, project_data):
+    todos = project_data["todos"]
+    page_count = max(1, (len(todos) + TODO_PAGE_SIZE - 1) // TODO_PAGE_SIZE)
+    page = min(st.session_state.get(f"todo_page_{project_name}", 0), page_count - 1)
+    
+    # Long lists are rendered one page at a time
+    for todo in todos[page * TODO_PAGE_SIZE:(page + 1) * TODO_PAGE_SIZE]:
+        col_check, col_task, col_delete = st.columns([0.5, 4, 0.5])
+        with col_check:
+            checked = st.checkbox("", todo["completed"], key=f"todo_{todo['id']}")
+            if checked != todo["completed"]:
+                todo["completed"] = checked
+                dashboard.save_project(project_name, project_data,
+                                       operation={"op": "set_todo", "id": todo["id"], "completed": checked})
+        with col_task:
+            due = (f"<span style='color: gray; font-size: 12px; padding-left: 8px;'>due {todo['due_date']}</span>"
+                   if todo.get("due_date") and not todo["completed"] else "")
+            st.markdown(f"""
+                <div style='display: flex; align-items: center; min-height: 40px; padding-left: 10px;'>
+                    {todo['task']}{due}
+                </div>
+            """, unsafe_allow_html=True)
+        with col_delete:
+            if st.button("×", key=f"delete_todo_{todo['id']}", type="secondary", help="Delete task"):
+                project_data["todos"] = [t for t in todos if t["id"] != todo["id"]]
+                dashboard.save_project(project_name, project_data,
+                                       operation={"op": "remove_todos", "ids": [todo["id"]]})
+                st.rerun()
+    
+    if page_count > 1:
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if st.button("←", disabled=page == 0, key=f"todo_prev_{project_name}"):
+                st.session_state[f"todo_page_{project_name}"] = page - 1
+                st.rerun()
+        with col_page:
+            st.caption(f"Page {page + 1} of {page_count} · {len(todos)} tasks")
+        with col_next:
+            if st.button("→", disabled=page >= page_count - 1, key=f"todo_next_{project_name}"):
+                st.session_state[f"todo_page_{project_name}"] = page + 1
+                st.rerun()
+
+@tracing.traced("render.todo_bulk_editor")
+def show_todo_bulk_editor(dashboard, project_name, project_data):
+    # Edits stay in the browser until the form is submitted, then go out as one write
+    rows = [{"select": False, "done": todo["completed"], "task": todo["task"], "id": todo["id"]}
+            for todo in project_data["todos"]]
+    # Bumped after every save so the editor starts clean instead of replaying old edits
+    version_key = f"todo_editor_version_{project_name}"
+    version = st.session_state.setdefault(version_key, 0)
+    with st.form(f"todo_bulk_form_{project_name}"):
+        edited = st.data_editor(
+            rows,
+            column_config={
+                "select": st.column_config.CheckboxColumn("Select", width="small"),
+                "done": st.column_config.CheckboxColumn("Done", width="small"),
+                "task": st.column_config.TextColumn("Task", disabled=True),
+            },
+            column_order=["select", "done", "task"],
+            hide_index=True,
+            width="stretch",
+            key=f"todo_editor_{project_name}_{version}"
+        )
+        col_save, col_complete, col_delete = st.columns(3)
+        with col_save:
+            save = st.form_submit_button("Save changes")
+        with col_complete:
+            complete = st.form_submit_button("Complete selected")
+        with col_delete:
+            delete = st.form_submit_button("Delete selected")
+    
+    if not (save or complete or delete):
+        return
+    
+    todos_by_id = {todo["id"]: todo for todo in project_data["todos"]}
+    selected = [row["id"] for row in edited if row["select"]]
+    completed = {row["id"]: bool(row["done"]) for row in edited
+                 if row["id"] in todos_by_id and bool(row["done"]) != todos_by_id[row["id"]]["completed"]}
+    if complete:
+        completed.update({todo_id: True for todo_id in selected
+                          if todo_id in todos_by_id and not todos_by_id[todo_id]["completed"]})
+    remove = selected if delete else []
+    if not completed and not remove:
+        st.info("No changes to save")
+        return
+    
+    operation = {"op": "edit_todos", "completed": completed, "remove": remove}
+    dashboard.save_project(project_name, apply_operation(project_data, operation), operation=operation)
+    st.session_state[version_key] = version + 1
+    st.rerun()
+
+def save_video_notes(job_key, document):
+    owner, project_name = split_name(job_key)
+    dashboard = get_dashboard(owner)
+    project_data = dashboard.load_project(project_name)
+    if project_data is None:
+        raise Exception(f"Project {project_name} no longer exists")
+    # Notes for a video that is already in the project are not added twice
+    if any(doc.get("video_id") == document["video_id"] for doc in project_data["documents"]):
+        return
+    project_data["documents"].append(document)
+    dashboard.save_project(project_name, project_data,
+                           operation={"op": "add_document", "document": document})
+
+@st.cache_resource
+def get_video_queue():
+    # One queue and worker pool per server process, shared by all sessions
+    queue = VideoJobQueue(
+        "video_jobs.sqlite3",
+        CaptionFetcher(),
+        MapReduceSummarizer(
+            GeminiModel('gemini-1.5-flash-latest', st.secrets["GOOGLE_API_KEY"]),
+            max_workers=int(os.environ.get("FOCUSBOARD_SUMMARY_WORKERS", "4")),
+            calls_per_minute=int(os.environ.get("FOCUSBOARD_GEMINI_RPM", "15"))
+        ),
+        save_video_notes,
+        max_workers=int(os.environ.get("FOCUSBOARD_VIDEO_WORKERS", "2")),
+        cache=VideoCache("video_cache.sqlite3")
+    )
+    return queue.start()
+
+@st.fragment(run_every=3)
+def show_video_jobs(video_queue, project_name):
+    stage_labels = {
+        "fetching": "🔍 Fetching video information and captions...",
+        "summarizing": "📝 Generating summary...",
+        "saving": "💾 Saving to project documents...",
+    }
+    finished = st.session_state.setdefault("finished_video_jobs", set())
+    
+    for job in video_queue.list_jobs(project_name, limit=5):
+        col_status, col_cancel = st.columns([4, 1])
+        with col_status:
+            if job["status"] == "queued":
+                retry = f" (retrying after: {job['error']})" if job["error"] else ""
+                st.info(f"⏳ Queued: {job['url']}{retry}")
+            elif job["status"] == "running":
+                st.info(stage_labels.get(job["stage"], "Starting video processing..."))
+            elif job["status"] == "done":
+                st.success(f"✨ {job['result']['title']} saved to documents")
+                if job["id"] not in finished:
+                    # Rerun the whole page once so the new document shows up
+                    finished.add(job["id"])
+                    st.rerun(scope="app")
+            elif job["status"] == "failed":
+                st.error(f"Failed to process video after {job['attempts']} attempts: {job['error']}")
+                st.info("If you're seeing an error, try these troubleshooting steps:\n"
+                       "1. Verify the video is publicly accessible\n"
+                       "2. Check if the video has captions available\n"
+                       "3. Check if the video URL is correct")
+            else:
+                st.caption(f"Cancelled: {job['url']}")
+        with col_cancel:
+            if job["status"] in ACTIVE_STATUSES:
+                if st.button("Cancel", key=f"cancel_job_{job['id']}"):
+                    video_queue.cancel(job["id"])
+                    st.rerun(scope="fragment")
+
+@st.cache_resource
+def get_workspaces():
+    # Per-user storages and search indexes stay open for all sessions of this process
+    return create_workspaces()
+
+@st.cache_resource
+def get_auto_archiver():
+    # One background pass per process, off unless a threshold is configured
+    idle_days, complete_days = auto_archive_policy()
+    if idle_days is None and complete_days is None:
+        return None
+    return start_auto_archive(get_workspaces(), idle_days, complete_days,
+                              float(os.environ.get("FOCUSBOARD_ARCHIVE_INTERVAL", "3600")))
+
+def get_dashboard(username, timezone=None):
+    get_auto_archiver()
+    return ProjectDashboard(username=username, workspaces=get_workspaces(), timezone=timezone)
+
+def user_timezone():
+    """The browser's timezone, else FOCUSBOARD_TIMEZONE, else None for the server's local time."""
+    name = st.context.timezone or os.environ.get("FOCUSBOARD_TIMEZONE")
+    try:
+        return ZoneInfo(name) if name else None
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+@st.cache_data
 def get_img_as_base64(file_path):
-    with open(file_path, "rb") as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
+    with tracing.span("render.icon") as span:
+        with open(file_path, "rb") as f:
+            data = f.read()
+        span.add("files_opened")
+        span.add("bytes_read", len(data))
+        return base64.b64encode(data).decode()
+
+def is_admin(username):
+    admins = os.environ.get("FOCUSBOARD_ADMINS", "")
+    return username in {name.strip() for name in admins.split(",") if name.strip()}
+
+def show_profiler_panel():
+    # Slowest spans of this rerun so far, only for admins and only when tracing is on
+    run = tracing.current_run()
+    if run is None or not is_admin(st.session_state.get("username")):
+        return
+    with st.sidebar.expander("Profiler"):
+        st.caption(f"{len(run.spans)} spans in this rerun")
+        st.dataframe([{
+            "span": "  " * s.depth + s.name,
+            "ms": round(s.duration * 1000, 2),
+            "counters": ", ".join(f"{k}={v}" for k, v in s.counters.items()),
+        } for s in run.slowest()], hide_index=True, width="stretch")
 
 def main():
     icon_path = "focus.png"  # Icon file in project directory
@@ -257,16 +790,25 @@ def main():
         st.session_state.logged_in = False
     
     if not st.session_state.logged_in:
-        show_login_page()
-        return
+        token = st.query_params.get("session")
+        username = get_user_auth().resume_session(token) if token else None
+        if username:
+            st.session_state.logged_in = True
+            st.session_state.username = username
+            st.session_state.session_token = token
+        else:
+            show_login_page()
+            return
     
-    dashboard = ProjectDashboard()
+    # Built once per rerun, so every due date on the page is measured from the same day
+    dashboard = get_dashboard(st.session_state.username, user_timezone())
     
     # Sidebar navigation
     with st.sidebar:
-            if st.session_state.get("show_manage_page"):
+            if st.session_state.get("show_manage_page") or st.session_state.get("show_agenda_page"):
                 if st.button("Home", key="home_button"):
                     st.session_state.show_manage_page = False
+                    st.session_state.show_agenda_page = False
                     st.rerun()
             else:
                 st.header("Create a New Project")
@@ -276,7 +818,7 @@ def main():
                 due_date = st.date_input(
                     "Due Date (optional)",
                     value=None,
-                    min_value=datetime.now().date(),
+                    min_value=dashboard.today(),
                     help="Leave empty if no due date"
                 )
                 
@@ -287,18 +829,24 @@ def main():
                 )
                 
                 if st.button("Create Project"):
-                    if new_project:
+                    if "/" in new_project:
+                        # Reserved for shared projects, which show up as "owner/project"
+                        st.error("Project names cannot contain '/'")
+                    elif new_project:
                         project_data = {
                             "name": new_project,
                             "category": category,
-                            "created_date": datetime.now().strftime("%Y-%m-%d"),
+                            "created_date": dashboard.today().isoformat(),
                             "due_date": due_date.strftime("%Y-%m-%d") if due_date else None,
                             "todos": [],
                             "documents": [],
                             "archived": False
                         }
-                        dashboard.save_project(new_project, project_data)
-                        st.success(f"Created project: {new_project}")
+                        try:
+                            dashboard.save_project(new_project, project_data)
+                            st.success(f"Created project: {new_project}")
+                        except VersionConflict:
+                            st.error(f"A project named {new_project} already exists")
                 
                 # Project filtering
                 st.divider()
@@ -308,36 +856,50 @@ def main():
                 if st.button("Manage Projects", key="manage_projects_button"):
                     st.session_state.show_manage_page = True
                     st.rerun()
+                if st.button("📅 Agenda", key="agenda_button"):
+                    st.session_state.show_agenda_page = True
+                    st.rerun()
                 
                 filter_category = st.selectbox(
                     "Filter by Category",
                     ["All"] + st.session_state.categories
                 )
                 
-                projects = dashboard.get_projects()
-                if filter_category != "All":
-                    filtered_projects = []
-                    for project in projects:
-                        data = dashboard.load_project(project)
-                        if data and data.get("category") == filter_category:
-                            filtered_projects.append(project)
-                    projects = filtered_projects
+                projects = dashboard.get_projects(None if filter_category == "All" else filter_category)
                 
                 selected_project = st.selectbox(
                     "Select Project",
-                    projects if projects else ["No projects yet"]
+                    projects if projects else ["No projects yet"],
+                    key="selected_project"
                 )
+                
+                search_query = st.text_input("Search tasks and notes", placeholder="Search all projects")
+                if search_query:
+                    results = dashboard.search(search_query, None if filter_category == "All" else filter_category)
+                    if not results:
+                        st.caption("No matches")
+                    for i, result in enumerate(results):
+                        icon = "☑️" if result["kind"] == "todo" else "📄"
+                        st.button(f"{icon} {result['title']}", key=f"search_result_{i}",
+                                  help=result["snippet"], on_click=open_search_result, args=(result["project"],))
+                        st.caption(result["project"])
 
                 st.markdown("---")
 
             # Logout button at bottom
             if st.button("Logout", key="logout_button"):
+                if st.session_state.get("session_token"):
+                    get_user_auth().end_session(st.session_state.session_token)
+                    st.session_state.session_token = None
+                st.query_params.pop("session", None)
                 st.session_state.logged_in = False
                 st.rerun()
 
     # Main content area
     if st.session_state.get("show_manage_page"):
         show_manage_projects_page(dashboard)
+    elif st.session_state.get("show_agenda_page"):
+        show_agenda_page(dashboard)
     else:
         if selected_project and selected_project != "No projects yet":
             project_data = dashboard.load_project(selected_project)
@@ -349,8 +911,7 @@ def main():
             if project_data.get("due_date"):
                 days_until_due = dashboard.calculate_days_until_due(project_data["due_date"])
                 if days_until_due is not None:
-                    due_text = f"{days_until_due} days until project is due" if days_until_due > 0 else "Project is due today!" if days_until_due == 0 else "Project is overdue"
-                    st.markdown(f"<p style='color: gray; font-size: 14px;'>{due_text}</p>", unsafe_allow_html=True)
+                    st.caption(due_text(days_until_due))
             
             # Main content area - three columns
             col1, col2, col3 = st.columns(3)
@@ -359,41 +920,34 @@ def main():
             with col1:
                 st.header("To-Do List")
                 new_todo = st.text_input("New Task")
+                todo_due = st.date_input("Task Due Date (optional)", value=None, min_value=dashboard.today(),
+                                         key=f"todo_due_{selected_project}")
                 if st.button("Add Task"):
                     if new_todo:
-                        project_data["todos"].append({
-                            "id": str(datetime.now().timestamp()),
+                        todo = {
+                            "id": uuid.uuid4().hex,
                             "task": new_todo,
                             "completed": False,
-                            "date_added": datetime.now().strftime("%Y-%m-%d")
-                        })
-                        dashboard.save_project(selected_project, project_data)
+                            "date_added": dashboard.today().isoformat(),
+                            "due_date": todo_due.isoformat() if todo_due else None
+                        }
+                        project_data["todos"].append(todo)
+                        dashboard.save_project(selected_project, project_data,
+                                               operation={"op": "add_todo", "todo": todo})
                 
                 # Add clear completed tasks button
                 if project_data["todos"]:
                     if st.button("Clear Completed Tasks"):
+                        completed_ids = [todo["id"] for todo in project_data["todos"] if todo["completed"]]
                         project_data["todos"] = [todo for todo in project_data["todos"] if not todo["completed"]]
-                        dashboard.save_project(selected_project, project_data)
+                        dashboard.save_project(selected_project, project_data,
+                                               operation={"op": "remove_todos", "ids": completed_ids})
                         st.rerun()
                 
-                for todo in project_data["todos"]:
-                    col_check, col_task, col_delete = st.columns([0.5, 4, 0.5])
-                    with col_check:
-                        checked = st.checkbox("", todo["completed"], key=f"todo_{todo['id']}")
-                        if checked != todo["completed"]:
-                            todo["completed"] = checked
-                            dashboard.save_project(selected_project, project_data)
-                    with col_task:
-                        st.markdown(f"""
-                            <div style='display: flex; align-items: center; min-height: 40px; padding-left: 10px;'>
-                                {todo['task']}
-                            </div>
-                        """, unsafe_allow_html=True)
-                    with col_delete:
-                        if st.button("×", key=f"delete_todo_{todo['id']}", type="secondary", help="Delete task"):
-                            project_data["todos"].remove(todo)
-                            dashboard.save_project(selected_project, project_data)
-                            st.rerun()
+                if st.toggle("Bulk edit", key=f"bulk_edit_{selected_project}", disabled=not project_data["todos"]):
+                    show_todo_bulk_editor(dashboard, selected_project, project_data)
+                else:
+                    show_todo_list(dashboard, selected_project, project_data)
             
             # Document management in second column
             with col2:
@@ -415,133 +969,64 @@ def main():
                         if uploaded_file:
                             attachment_path = dashboard.save_attachment(selected_project, uploaded_file)
                         
-                        project_data["documents"].append({
+                        document = {
+                            "id": uuid.uuid4().hex,
                             "title": doc_title,
                             "content": doc_content,
-                            "date_created": datetime.now().strftime("%Y-%m-%d"),
+                            "date_created": dashboard.today().isoformat(),
                             "attachment": attachment_path
-                        })
-                        dashboard.save_project(selected_project, project_data)
+                        }
+                        project_data["documents"].append(document)
+                        dashboard.save_project(selected_project, project_data,
+                                               operation={"op": "add_document", "document": document})
                 
                 # Display documents with attachments
                 for i, doc in enumerate(project_data["documents"]):
                     col_doc, col_del = st.columns([4, 1])
                     with col_doc:
-                        with st.expander(f"{doc['title']} ({doc['date_created']})"):
-                            st.markdown(doc["content"])
-                            if doc.get("attachment"):
-                                file_path = doc["attachment"]
-                                file_name = Path(file_path).name
-                                with open(file_path, "rb") as f:
+                        # The body is only read from storage once the document is opened
+                        if st.toggle(f"{doc['title']} ({doc['date_created']})", key=f"show_doc_{doc['id']}"):
+                            with st.container(border=True):
+                                st.markdown(dashboard.load_document_body(selected_project, doc))
+                                if doc.get("attachment"):
+                                    # Attachment files are only opened for documents that are shown
+                                    file_name = attachment_name(doc["attachment"])
                                     st.download_button(
                                         f"Download {file_name}",
-                                        f,
-                                        file_name=file_name
+                                        dashboard.get_attachment(doc["attachment"]),
+                                        file_name=file_name,
+                                        key=f"download_{doc['id']}"
                                     )
                     with col_del:
                         if st.button("×", key=f"delete_doc_{i}", type="secondary", help="Delete document"):
-                            project_data["documents"].pop(i)
-                            dashboard.save_project(selected_project, project_data)
+                            removed = project_data["documents"].pop(i)
+                            # Documents saved before they had IDs fall back to a full save
+                            operation = ({"op": "remove_document", "id": removed["id"], "attachment": removed.get("attachment")}
+                                         if removed.get("id") else None)
+                            try:
+                                dashboard.save_project(selected_project, project_data, operation=operation)
+                            except VersionConflict:
+                                st.toast("The project was changed in another session, please try again")
                             st.rerun()
             
             # YouTube video processor in third column
             with col3:
                 st.header("Video Notes")
-                url = st.text_input("Enter YouTube URL")
-                if url:
-                    try:
-                        # Create a status placeholder for user feedback
-                        status_placeholder = st.empty()
-                        status_placeholder.info("Starting video processing...")
-
-                        max_retries = 3
-                        for attempt in range(max_retries):
-                            try:
-                                ydl_opts = {
-                                    'writesubtitles': True,
-                                    'writeautomaticsub': True,
-                                    'subtitlesformat': 'json3',
-                                    'skip_download': True,
-                                    'quiet': True,
-                                    'no_warnings': True
-                                }
-                                
-                                with YoutubeDL(ydl_opts) as ydl:
-                                    # Get video info and subtitles
-                                    status_placeholder.info("🔍 Fetching video information and captions...")
-                                    info = ydl.extract_info(url, download=False)
-                                    video_title = info.get('title', 'Untitled Video')
-                                    
-                                    # Get automatic captions if available
-                                    status_placeholder.info("🔍 Fetching video captions...")
-                                    
-                                    transcription_text = ""
-                                    if info.get('subtitles'):
-                                        captions = info['subtitles'].get('en', [])
-                                    elif info.get('automatic_captions'):
-                                        captions = info['automatic_captions'].get('en', [])
-                                    
-                                    if captions:
-                                        for caption in captions:
-                                            if caption.get('ext') == 'json3':
-                                                caption_url = caption.get('url')
-                                                if caption_url:
-                                                    import requests
-                                                    response = requests.get(caption_url)
-                                                    if response.status_code == 200:
-                                                        caption_data = response.json()
-                                                        for event in caption_data.get('events', []):
-                                                            if 'segs' in event:
-                                                                for seg in event['segs']:
-                                                                    transcription_text += seg.get('utf8', '') + " "
-                                    
-                                    if not transcription_text.strip():
-                                        raise Exception("Could not extract captions from the video.")
-
-                                    # Generate summary using Gemini
-                                    status_placeholder.info("📝 Generating summary...")
-                                    
-                                    # Configure the model
-                                    model = genai.GenerativeModel('gemini-1.5-flash-latest')
-                                    
-                                    # Generate the summary
-                                    prompt = f"""Please provide a concise summary of the following text:
-                                    
-                                    {transcription_text}
-                                    
-                                    Focus on the main points and key takeaways. If I have not provided any text, please print an error message."""
-                                    
-                                    response = model.generate_content(prompt)
-                                    
-                                    # Save to project documents
-                                    status_placeholder.info("💾 Saving to project documents...")
-                                    project_data["documents"].append({
-                                        "title": f"Video Notes: {video_title}",
-                                        "content": f"""## Video Summary\n\n{response.text}""",
-                                        "date_created": datetime.now().strftime("%Y-%m-%d"),
-                                        "type": "video_notes"
-                                    })
-                                    dashboard.save_project(selected_project, project_data)
-                                    
-                                    status_placeholder.success("✨ Video processed and notes saved successfully!")
-                                    break
-
-                            except Exception as e:
-                                if attempt == max_retries - 1:
-                                    raise Exception(f"Failed to process video after {max_retries} attempts: {str(e)}")
-                                time.sleep(2)
-
-                    except Exception as e:
-                        st.error(f"An error occurred: {str(e)}")
-                        st.info("If you're seeing an error, try these troubleshooting steps:\n"
-                               "1. Verify the video is publicly accessible\n"
-                               "2. Check if the video has captions available\n"
-                               "3. Check if the video URL is correct")
+                video_queue = get_video_queue()
+                
+                # Videos are processed by background workers, the page only polls their status
+                with st.form("video_notes_form", clear_on_submit=True):
+                    url = st.text_input("Enter YouTube URL")
+                    if st.form_submit_button("Generate Notes") and url:
+                        video_queue.submit(dashboard.job_key(selected_project), url)
+                        st.success("Video queued for processing")
+                
+                show_video_jobs(video_queue, dashboard.job_key(selected_project))
                 
                 st.markdown("""
                     Add video notes to your project by:
-                    1. Paste a YouTube URL
-                    2. Wait for processing (This may take a few minutes)
+                    1. Paste a YouTube URL and click Generate Notes
+                    2. Keep working while it is processed in the background
                     3. Notes will be saved in your documents
                 """)
         else:
@@ -556,4 +1041,9 @@ def main():
             """)
 
 if __name__ == "__main__":
-    main()
+    tracing.start_run()
+    try:
+        main()
+        show_profiler_panel()
+    finally:
+        tracing.finish_run()
@@ -0,0 +1,281 @@
+import hashlib
+import itertools
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from urllib.parse import quote
+
+from project_cache import project_cache, copy_json
+from project_catalog import ProjectCatalog
+from project_journal import file_lock
+import tracing
+
+CHUNK_SIZE = 1024 * 1024
+
+# Enough distinct words of a project's tasks and titles to find it again
+MAX_TERMS = 500
+
+_WORDS = re.compile(r"\w+")
+
+
+def terms(text):
+    return _WORDS.findall((text or "").lower())
+
+
+def make_manifest(project_name, data, archived_at, unpacked_bytes, attachments):
+    """Summary of an archived project: the catalog fields plus what search needs."""
+    manifest = ProjectCatalog.make_entry(project_name, data)
+    del manifest["mtime"], manifest["due_tasks"]
+    words = set(terms(project_name)) | set(terms(data.get("category")))
+    for item in data.get("todos", []):
+        words.update(terms(item.get("task")))
+    for item in data.get("documents", []):
+        words.update(terms(item.get("title")))
+    manifest.update({
+        "project": project_name,
+        "archived_at": archived_at,
+        "attachments": attachments,
+        "unpacked_bytes": unpacked_bytes,
+        "terms": sorted(words)[:MAX_TERMS],
+    })
+    return manifest
+
+
+def file_digest(f):
+    sha = hashlib.sha256()
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
+def file_reference(path):
+    # Legacy attachments are plain paths; packed they look like store references
+    with open(path, "rb") as f:
+        digest = file_digest(f)
+    return {"name": Path(path).name, "sha256": digest, "size": os.path.getsize(path)}
+
+
+def is_due(summary, now, idle_days=None, complete_days=None):
+    """Whether a project summary falls under the auto-archive policy.
+
+    Projects are due once untouched for idle_days, or, with all their tasks
+    done, untouched for complete_days. Either threshold may be None.
+    """
+    mtime = summary.get("mtime")
+    if mtime is None:
+        return False
+    idle = (now - mtime) / 86400
+    if idle_days is not None and idle >= idle_days:
+        return True
+    total = summary.get("total_tasks") or 0
+    complete = total > 0 and summary.get("completed_tasks") == total
+    return complete and complete_days is not None and idle >= complete_days
+
+
+class ProjectArchive:
+    """Compressed cold storage for archived projects.
+
+    Each archived project is one zip under archive_dir holding
+    manifest.json, project.json, documents/<id>.md and attachments/<sha256>.
+    The manifests of all archives are also kept in manifests.json, so
+    archived projects are listed and searched without opening a zip.
+    Opening an archived project only reads project.json; document bodies
+    and attachments are extracted when they are asked for.
+    """
+
+    def __init__(self, archive_dir):
+        self.archive_dir = Path(archive_dir)
+        self.index_file = self.archive_dir / "manifests.json"
+        self.lock_file = self.archive_dir / ".lock"
+        self.cache = project_cache
+
+    def path(self, project_name):
+        # Quoted so that any project name is a safe file name
+        return self.archive_dir / (quote(project_name, safe=" -_.") + ".zip")
+
+    def _reserve(self, project_name):
+        """Create an empty archive under a name no other archive has and return the name.
+
+        An earlier archive of the same project name is never replaced; the
+        new one is named "<name> (archived <date>)" instead.
+        """
+        date = time.strftime("%Y-%m-%d")
+        name = project_name
+        for i in itertools.count(2):
+            try:
+                # Exclusive create, so two packs never pick the same name
+                open(self.path(name), "x").close()
+                return name
+            except FileExistsError:
+                name = f"{project_name} (archived {date})" if i == 2 else f"{project_name} (archived {date}, {i})"
+
+    def pack(self, project_name, data, read_body, open_attachment, archive_name=None):
+        """Write a project and everything it references into a new archive.
+
+        read_body(doc_id) returns a document body and open_attachment(attachment)
+        a binary file. The archive is named after the project unless that name
+        is taken (see _reserve); archive_name rewrites an archive packed
+        earlier instead. Returns the manifest, its "project" is the name.
+        """
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        reserved = archive_name is None
+        if reserved:
+            archive_name = self._reserve(project_name)
+        data = copy_json(data)
+        data.pop("version", None)
+        data["archived"] = True
+        if archive_name != project_name:
+            data["name"] = archive_name
+        unpacked = 0
+        packed = set()
+        fd, tmp_path = tempfile.mkstemp(dir=self.archive_dir, prefix=".pack-", suffix=".tmp")
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zf:
+                for doc in data.get("documents", []):
+                    body = doc.pop("content", None)
+                    body = (read_body(doc["id"]) if body is None else body).encode("utf-8")
+                    zf.writestr(f"documents/{doc['id']}.md", body)
+                    unpacked += len(body)
+                    attachment = doc.get("attachment")
+                    if not attachment:
+                        continue
+                    if isinstance(attachment, dict):
+                        reference = attachment
+                    elif os.path.exists(attachment):
+                        reference = doc["attachment"] = file_reference(attachment)
+                    else:
+                        continue
+                    if reference["sha256"] in packed:
+                        continue
+                    with open_attachment(attachment) as src, zf.open(f"attachments/{reference['sha256']}", "w") as dst:
+                        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                    packed.add(reference["sha256"])
+                    unpacked += reference.get("size", 0)
+                project = json.dumps(data).encode("utf-8")
+                unpacked += len(project)
+                zf.writestr("project.json", project)
+                manifest = make_manifest(archive_name, data, time.time(), unpacked, len(packed))
+                zf.writestr("manifest.json", json.dumps(manifest))
+            os.replace(tmp_path, self.path(archive_name))
+        except BaseException:
+            for path in [tmp_path] + ([self.path(archive_name)] if reserved else []):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            raise
+        tracing.count("bytes_written", self.path(archive_name).stat().st_size)
+        return self._update_index(archive_name, manifest)
+
+    def add(self, project_name, zip_path):
+        """Copy an archive packed elsewhere (e.g. by another storage) into this one."""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(zip_path, self.path(project_name))
+        with zipfile.ZipFile(self.path(project_name)) as zf:
+            manifest = json.loads(zf.read("manifest.json"))
+        return self._update_index(project_name, manifest)
+
+    def remove(self, project_name):
+        self.path(project_name).unlink(missing_ok=True)
+        self._update_index(project_name, None)
+
+    def _read_index(self):
+        if not self.archive_dir.exists():
+            return {}
+        try:
+            index = self.cache.load(self.index_file, copy=False)
+        except (OSError, ValueError):
+            index = None
+        return index if index is not None else self.rebuild()
+
+    def _write_index(self, index):
+        fd, tmp_path = tempfile.mkstemp(dir=self.archive_dir, prefix=".manifests-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.index_file)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _update_index(self, project_name, manifest):
+        with file_lock(self.lock_file):
+            index = dict(self._read_index())
+            if manifest is None:
+                index.pop(project_name, None)
+            else:
+                manifest["packed_bytes"] = self.path(project_name).stat().st_size
+                index[project_name] = manifest
+            self._write_index(index)
+        return manifest
+
+    def rebuild(self):
+        """Recreate manifests.json from the manifests inside the archives."""
+        index = {}
+        for path in sorted(self.archive_dir.glob("*.zip")):
+            try:
+                with zipfile.ZipFile(path) as zf:
+                    manifest = json.loads(zf.read("manifest.json"))
+            except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+                continue
+            manifest["packed_bytes"] = path.stat().st_size
+            index[manifest["project"]] = manifest
+        self._write_index(index)
+        return index
+
+    def names(self):
+        return list(self._read_index())
+
+    def manifest(self, project_name):
+        manifest = self._read_index().get(project_name)
+        return dict(manifest) if manifest else None
+
+    def manifests(self, query=None):
+        """Manifests of the archived projects, newest first, only those matching query if given.
+
+        Every word of query must start one of the manifest's terms.
+        """
+        words = terms(query)
+        found = []
+        for manifest in self._read_index().values():
+            if words and not all(any(term.startswith(word) for term in manifest["terms"]) for word in words):
+                continue
+            found.append(dict(manifest))
+        found.sort(key=lambda manifest: manifest["archived_at"], reverse=True)
+        return found
+
+    def _read(self, project_name, member):
+        with zipfile.ZipFile(self.path(project_name)) as zf:
+            content = zf.read(member)
+        tracing.count("files_opened")
+        tracing.count("bytes_read", len(content))
+        return content
+
+    def load(self, project_name):
+        try:
+            return json.loads(self._read(project_name, "project.json"))
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+
+    def read_document(self, project_name, doc_id):
+        try:
+            return self._read(project_name, f"documents/{doc_id}.md").decode("utf-8")
+        except (OSError, KeyError):
+            return ""
+
+    def open_attachment(self, project_name, digest):
+        # The member keeps the zip file open until it is closed itself
+        with zipfile.ZipFile(self.path(project_name)) as zf:
+            return zf.open(f"attachments/{digest}")
+
+    def read_attachment(self, project_name, digest):
+        return self._read(project_name, f"attachments/{digest}")
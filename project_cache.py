@@ -0,0 +1,185 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import tracing
+
+
+def copy_json(value):
+    # Much cheaper than copy.deepcopy for the plain dict/list data we store
+    if isinstance(value, dict):
+        return {k: copy_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [copy_json(v) for v in value]
+    return value
+
+
+class ProjectCache:
+    """Process-wide LRU cache of parsed project files.
+
+    Entries are validated against the file's mtime and size on every lookup,
+    so edits made by other processes are picked up. Callers always receive
+    their own copy of the data, so one session's unsaved edits never leak
+    into another session.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _stamp(path, extra_paths):
+        # (mtime, size) of the main file plus any files it depends on,
+        # e.g. a journal that is replayed on top of it
+        stamp = []
+        for p in [path, *extra_paths]:
+            try:
+                stat = os.stat(p)
+            except FileNotFoundError:
+                if p is path:
+                    return None
+                stamp.append(None)
+                continue
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(stamp)
+
+    @staticmethod
+    def _size(stamp):
+        return sum(s[1] for s in stamp if s is not None)
+
+    @staticmethod
+    def _read_json(path):
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def load(self, path, loader=None, extra_paths=(), copy=True):
+        """Return a copy of the parsed project at path, or None if it does not exist.
+
+        loader(path) parses the file on a miss; it defaults to json.load.
+        With copy=False the cached object itself is returned, for callers
+        that only read it.
+        """
+        key = str(path)
+        stamp = self._stamp(key, [str(p) for p in extra_paths])
+        if stamp is None:
+            self.invalidate(key)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                tracing.count("cache_hits")
+                return copy_json(entry[1]) if copy else entry[1]
+            self.misses += 1
+            tracing.count("cache_misses")
+
+        data = (loader or self._read_json)(key)
+        self._store(key, stamp, data)
+        return copy_json(data) if copy else data
+
+    def put(self, path, data, extra_paths=()):
+        """Store data that was just written to path (write-through after a save)."""
+        key = str(path)
+        stamp = self._stamp(key, [str(p) for p in extra_paths])
+        if stamp is None:
+            self.invalidate(key)
+            return
+        self._store(key, stamp, copy_json(data))
+
+    def stamp(self, path, extra_paths=()):
+        return self._stamp(str(path), [str(p) for p in extra_paths])
+
+    def advance(self, path, before, change, extra_paths=()):
+        """Apply change() to the cached data after an incremental write.
+
+        The entry is only updated if it still matches the stamp taken before
+        the write; otherwise it is dropped and reloaded on the next lookup.
+        """
+        key = str(path)
+        after = self.stamp(key, extra_paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            if after is None or entry[0] != before:
+                self._entries.pop(key)
+                self._bytes -= self._size(entry[0])
+                self.invalidations += 1
+                return
+            change(entry[1])
+            self._entries[key] = (after, entry[1])
+            self._bytes += self._size(after) - self._size(before)
+            self._entries.move_to_end(key)
+
+    def _store(self, key, stamp, data):
+        size = self._size(stamp)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= self._size(old[0])
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (stamp, data)
+            self._bytes += size
+            self._shrink()
+
+    def _shrink(self):
+        while self._bytes > self.max_bytes:
+            _, (old_stamp, _) = self._entries.popitem(last=False)
+            self._bytes -= self._size(old_stamp)
+            self.evictions += 1
+
+    @contextmanager
+    def limited(self, max_bytes):
+        """Hold at most max_bytes while a bulk pass reads every project once."""
+        previous = self.max_bytes
+        with self._lock:
+            self.max_bytes = min(previous, max_bytes)
+            self._shrink()
+        try:
+            yield
+        finally:
+            self.max_bytes = previous
+
+    def invalidate(self, path):
+        key = str(path)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= self._size(entry[0])
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Shared by every ProjectDashboard (and therefore every Streamlit session) in this process
+project_cache = ProjectCache(
+    max_bytes=int(os.environ.get("FOCUSBOARD_PROJECT_CACHE_MB", "64")) * 1024 * 1024
+)
@@ -0,0 +1,323 @@
+import argparse
+import json
+import os
+import tempfile
+import threading
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from pathlib import Path
+
+from project_journal import ProjectJournal, file_lock
+
+# Once the update log grows past this size it is folded into catalog.json
+LOG_COMPACT_BYTES = 256 * 1024
+
+SORT_ORDERS = ("due_date", "completion", "category", "name")
+
+
+def completion(entry):
+    total = entry.get("total_tasks") or 0
+    return entry.get("completed_tasks", 0) / total if total else None
+
+
+def summary_sort_key(sort):
+    """Key function for project summaries; entries without a value sort last.
+
+    Due dates sort soonest first and completion least complete first, so the
+    projects that need attention come up on the first page.
+    """
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"Unknown sort order: {sort}")
+    value = completion if sort == "completion" else lambda entry: entry.get(sort)
+    def key(entry):
+        v = value(entry)
+        return (v is None, v if v is not None else 0, entry.get("name") or "")
+    return key
+
+
+def due_items(project_name, entry):
+    """(due_date, project, kind, id, title) rows of a catalog entry for the due-date index.
+
+    The project's own due date has kind "project" and an empty id, open
+    tasks with a due date have kind "task".
+    """
+    if entry.get("due_date"):
+        yield (entry["due_date"], project_name, "project", "", entry.get("name") or project_name)
+    for due_date, todo_id, task in entry.get("due_tasks", ()):
+        yield (due_date, project_name, "task", todo_id, task)
+
+
+def due_item(row):
+    due_date, project_name, kind, item_id, title = row
+    return {"due_date": due_date, "project": project_name, "kind": kind, "id": item_id, "title": title}
+
+
+class ProjectCatalog:
+    """Persistent index of project metadata stored next to the project folders.
+
+    Listing and filtering read this file instead of parsing every
+    project_info.json. Saves, archives and deletes append one line to
+    catalog.log rather than rewriting the whole catalog, and the whole index
+    can be rebuilt from disk. One instance can be shared by all sessions of
+    a process.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = Path(data_dir)
+        self.catalog_file = self.data_dir / "catalog.json"
+        self.log_file = self.data_dir / "catalog.log"
+        self.lock_file = self.data_dir / ".catalog.lock"
+        self._entries = None
+        self._stamp = None
+        self._log_offset = 0
+        self._file_locked = False
+        self._due = None
+        self._due_entries = None
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def make_entry(project_name, data, mtime=None):
+        todos = data.get("todos", [])
+        # Only open tasks can be due; ISO dates sort chronologically as strings
+        due_tasks = sorted([t["due_date"], str(t.get("id")), t.get("task", "")]
+                           for t in todos if t.get("due_date") and not t.get("completed"))
+        return {
+            "name": data.get("name", project_name),
+            "category": data.get("category"),
+            "created_date": data.get("created_date"),
+            "due_date": data.get("due_date"),
+            "total_tasks": len(todos),
+            "completed_tasks": len([t for t in todos if t.get("completed")]),
+            "total_documents": len(data.get("documents", [])),
+            "due_tasks": due_tasks,
+            "mtime": mtime,
+        }
+
+    @contextmanager
+    def _locked(self):
+        # Other processes append and compact too: loading, appending and compacting happen under one file lock
+        with self._lock:
+            if self._file_locked:
+                yield
+                return
+            self.data_dir.mkdir(parents=True, exist_ok=True)
+            with file_lock(self.lock_file):
+                self._file_locked = True
+                try:
+                    yield
+                finally:
+                    self._file_locked = False
+
+    def _catalog_stamp(self):
+        try:
+            stat = self.catalog_file.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _log_size(self):
+        try:
+            return self.log_file.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _load(self):
+        """Bring the entries up to date with the files and return them.
+
+        Lines appended to the log since the last load are replayed, and the
+        whole catalog is re-read after a compaction. A state only counts as
+        loaded if catalog.json did not change while it was read.
+        """
+        while True:
+            stamp = self._catalog_stamp()
+            if stamp is None:
+                self.rebuild()
+                return self._entries
+            if self._entries is not None and stamp == self._stamp:
+                if self._log_size() == self._log_offset:
+                    return self._entries
+                offset = self._replay_log(self._entries, self._log_offset)
+                if self._catalog_stamp() == stamp and offset >= self._log_offset:
+                    self._log_offset = offset
+                    return self._entries
+                # Compacted in the meantime, read everything again
+                self._stamp = None
+                continue
+            try:
+                with open(self.catalog_file, "r") as f:
+                    entries = json.load(f)
+                offset = self._replay_log(entries)
+            except (OSError, ValueError):
+                entries = None
+            if self._catalog_stamp() != stamp:
+                continue
+            if entries is None:
+                self.rebuild()
+                return self._entries
+            self._entries, self._stamp, self._log_offset = entries, stamp, offset
+            return entries
+
+    def _replay_log(self, entries, offset=0):
+        """Apply the complete log lines after offset to entries, returns the offset after them."""
+        try:
+            with open(self.log_file, "rb") as f:
+                f.seek(offset)
+                content = f.read()
+        except FileNotFoundError:
+            return 0
+        # A line still being written by another process is picked up by the next load
+        end = content.rfind(b"\n") + 1
+        for line in content[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            old = entries.get(record["name"])
+            if record["entry"] is None:
+                entries.pop(record["name"], None)
+            else:
+                entries[record["name"]] = record["entry"]
+            if entries is self._entries:
+                self._reindex_due(record["name"], old, record["entry"])
+        return offset + end
+
+    def _append(self, project_name, entry):
+        # Called under _locked() after _load(), so every earlier line is already in the entries
+        with open(self.log_file, "ab") as f:
+            f.write((json.dumps({"name": project_name, "entry": entry}) + "\n").encode("utf-8"))
+            self._log_offset = f.tell()
+        if self._log_offset > LOG_COMPACT_BYTES:
+            self._save()
+
+    def _save(self):
+        # Write to a temp file and rename so readers never see a torn catalog
+        self.data_dir.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.data_dir, prefix=".catalog-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.catalog_file)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        try:
+            self.log_file.unlink()
+        except FileNotFoundError:
+            pass
+        self._stamp = self._catalog_stamp()
+        self._log_offset = 0
+
+    def entries(self):
+        with self._lock:
+            return dict(self._load())
+
+    def get(self, project_name):
+        with self._lock:
+            return self._load().get(project_name)
+
+    def names(self, category=None):
+        with self._lock:
+            entries = self._load()
+            if category is None:
+                return list(entries)
+            return [name for name, entry in entries.items() if entry.get("category") == category]
+
+    def page(self, category=None, sort="name", offset=0, limit=None):
+        """Return (total, entries) for one page of the sorted, filtered catalog."""
+        with self._lock:
+            entries = [entry for entry in self._load().values()
+                       if category is None or entry.get("category") == category]
+        entries.sort(key=summary_sort_key(sort))
+        end = None if limit is None else offset + limit
+        return len(entries), entries[offset:end]
+
+    def _due_index(self):
+        # Sorted due_items rows, rebuilt only when the entries were reloaded from disk
+        entries = self._load()
+        if self._due is None or self._due_entries is not entries:
+            self._due = sorted(row for name, entry in entries.items() for row in due_items(name, entry))
+            self._due_entries = entries
+        return self._due
+
+    def _reindex_due(self, project_name, old, new):
+        if self._due is None or self._due_entries is not self._entries:
+            return
+        for row in due_items(project_name, old) if old else ():
+            i = bisect_left(self._due, row)
+            if i < len(self._due) and self._due[i] == row:
+                del self._due[i]
+        for row in due_items(project_name, new) if new else ():
+            insort(self._due, row)
+
+    def due(self, start=None, end=None, projects=None, limit=None, tasks=True):
+        """Project and task due dates with start <= due_date < end, soonest first.
+
+        Both bounds are ISO dates and may be None. The range is found by two
+        bisections of the sorted index, so a query costs O(log n + k).
+        projects restricts the result to those project names, tasks=False
+        to project due dates.
+        """
+        with self._lock:
+            due = self._due_index()
+            lo = 0 if start is None else bisect_left(due, (start,))
+            hi = len(due) if end is None else bisect_left(due, (end,))
+            projects = None if projects is None else set(projects)
+            rows = []
+            for row in (due[i] for i in range(lo, hi)):
+                if limit is not None and len(rows) >= limit:
+                    break
+                if (projects is None or row[1] in projects) and (tasks or row[2] == "project"):
+                    rows.append(row)
+        return [due_item(row) for row in rows]
+
+    def update(self, project_name, data, mtime=None):
+        entry = self.make_entry(project_name, data, mtime)
+        with self._locked():
+            entries = self._load()
+            old = entries.get(project_name)
+            entries[project_name] = entry
+            self._reindex_due(project_name, old, entry)
+            self._append(project_name, entry)
+
+    def remove(self, project_name):
+        with self._locked():
+            old = self._load().pop(project_name, None)
+            if old is not None:
+                self._reindex_due(project_name, old, None)
+                self._append(project_name, None)
+
+    def rebuild(self):
+        """Scan project_data/ and recreate the catalog from the project files."""
+        # Under the lock, so no save lands between the scan and the write
+        with self._locked():
+            entries = {}
+            for d in sorted(self.data_dir.iterdir()):
+                if not d.is_dir() or d.name == "archived":
+                    continue
+                # Snapshot plus journal, as load_project sees it
+                journal = ProjectJournal(d)
+                try:
+                    data = journal.load()
+                    mtime = journal.snapshot_file.stat().st_mtime
+                except (OSError, ValueError):
+                    continue
+                if journal.journal_file.exists():
+                    mtime = max(mtime, journal.journal_file.stat().st_mtime)
+                entries[d.name] = self.make_entry(d.name, data, mtime)
+            self._entries = entries
+            self._save()
+        return len(entries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the FocusBoard project catalog")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--data-dir", default="project_data")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        count = ProjectCatalog(args.data_dir).rebuild()
+        print(f"Rebuilt catalog with {count} projects")
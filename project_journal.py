@@ -0,0 +1,235 @@
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import tracing
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Journals larger than this are folded back into project_info.json
+COMPACT_THRESHOLD_BYTES = 64 * 1024
+
+_compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal-compactor")
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _project_lock(project_dir):
+    key = str(Path(project_dir).resolve())
+    with _locks_guard:
+        if key not in _locks:
+            _locks[key] = threading.Lock()
+        return _locks[key]
+
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on path (created if missing) against other processes."""
+    with open(path, "a+b") as f:
+        _lock_file(f)
+        try:
+            yield
+        finally:
+            _unlock_file(f)
+
+
+class VersionConflict(Exception):
+    """A full save was based on an older version of the project than the stored one."""
+
+    def __init__(self, project_name, expected, current):
+        if expected is None:
+            message = f"Project {project_name} already exists"
+        else:
+            message = f"Project {project_name} was changed elsewhere (saved from version {expected}, now {current})"
+        super().__init__(message)
+        self.project_name = project_name
+        self.expected = expected
+        self.current = current
+
+
+# Project fields that set_fields may not touch
+RESERVED_FIELDS = ("todos", "documents", "version")
+
+
+def apply_operation(data, op):
+    """Apply one journaled operation to a project dict in place.
+
+    Every operation is idempotent (todos and documents are addressed by id),
+    so replaying a journal that was already folded into the snapshot is safe.
+    Journaled operations carry the project version they produced.
+    """
+    kind = op["op"]
+    todos = data.setdefault("todos", [])
+    documents = data.setdefault("documents", [])
+
+    if kind == "add_todo":
+        if not any(t.get("id") == op["todo"]["id"] for t in todos):
+            todos.append(op["todo"])
+    elif kind == "set_todo":
+        for todo in todos:
+            if todo.get("id") == op["id"]:
+                todo["completed"] = op["completed"]
+    elif kind == "remove_todos":
+        ids = set(op["ids"])
+        data["todos"] = [t for t in todos if t.get("id") not in ids]
+    elif kind == "edit_todos":
+        # A batch from the bulk editor: completion changes by id, then removals
+        by_id = {t.get("id"): t for t in todos}
+        for todo_id, completed in op.get("completed", {}).items():
+            if todo_id in by_id:
+                by_id[todo_id]["completed"] = completed
+        remove = set(op.get("remove", []))
+        if remove:
+            data["todos"] = [t for t in todos if t.get("id") not in remove]
+    elif kind == "add_document":
+        if not any(d.get("id") == op["document"]["id"] for d in documents):
+            documents.append(op["document"])
+    elif kind == "remove_document":
+        data["documents"] = [d for d in documents if d.get("id") != op["id"]]
+    elif kind == "set_fields":
+        data.update({k: v for k, v in op["fields"].items() if k not in RESERVED_FIELDS})
+    else:
+        raise ValueError(f"Unknown journal operation: {kind}")
+    if "version" in op:
+        data["version"] = op["version"]
+    return data
+
+
+class ProjectJournal:
+    """Append-only log of todo/document operations for one project.
+
+    project_info.json is the snapshot; journal.ndjson holds the operations
+    made since. Loading replays the journal on top of the snapshot, and a
+    background compaction folds it back in once it grows too large.
+
+    Writers (append, write_snapshot) must hold locked(); readers never lock,
+    the snapshot is only ever replaced by an atomic rename.
+    """
+
+    def __init__(self, project_dir):
+        self.project_dir = Path(project_dir)
+        self.snapshot_file = self.project_dir / "project_info.json"
+        self.journal_file = self.project_dir / "journal.ndjson"
+        self.lock_file = self.project_dir / ".lock"
+        self._lock = _project_lock(self.project_dir)
+
+    @contextmanager
+    def locked(self):
+        """Hold the project lock against other threads and other processes.
+
+        Only held around one version check and write, so it is short.
+        """
+        with self._lock:
+            with file_lock(self.lock_file):
+                yield
+
+    def append(self, op):
+        line = json.dumps(op, separators=(",", ":")) + "\n"
+        with open(self.journal_file, "a") as f:
+            f.write(line)
+            tracing.count("files_opened")
+            tracing.count("bytes_written", len(line))
+            f.flush()
+            os.fsync(f.fileno())
+        if self.journal_file.stat().st_size > COMPACT_THRESHOLD_BYTES:
+            self.schedule_compaction()
+
+    def _read_operations(self):
+        try:
+            with open(self.journal_file, "r") as f:
+                lines = f.readlines()
+                tracing.count("files_opened")
+                tracing.count("bytes_read", f.tell())
+        except FileNotFoundError:
+            return []
+        ops = []
+        for line in lines:
+            try:
+                ops.append(json.loads(line))
+            except ValueError:
+                # A torn final line from a crash mid-append is simply dropped
+                continue
+        return ops
+
+    def _read_snapshot(self):
+        with open(self.snapshot_file, "r") as f:
+            data = json.load(f)
+            tracing.count("files_opened")
+            tracing.count("bytes_read", f.tell())
+        data.setdefault("version", 0)
+        return data
+
+    def load(self):
+        while True:
+            data = self._read_snapshot()
+            ops = self._read_operations()
+            if ops and ops[0].get("version", 0) > data["version"] + 1:
+                # Compacted and appended to between the two reads, the snapshot is stale
+                continue
+            for op in ops:
+                # Operations already folded into the snapshot are skipped
+                if op.get("version", data["version"] + 1) > data["version"]:
+                    apply_operation(data, op)
+            return data
+
+    def write_snapshot(self, data):
+        """Replace the snapshot atomically and drop the operations it now contains."""
+        self._write_snapshot(data)
+        self._discard_journal()
+
+    def _write_snapshot(self, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.project_dir, prefix=".project_info-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=4)
+                tracing.count("files_opened")
+                tracing.count("bytes_written", f.tell())
+            os.replace(tmp_path, self.snapshot_file)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _discard_journal(self):
+        try:
+            self.journal_file.unlink()
+        except FileNotFoundError:
+            pass
+
+    def compact(self):
+        if not self.project_dir.exists():
+            return
+        with self.locked():
+            if not self.journal_file.exists() or not self.snapshot_file.exists():
+                return
+            self._write_snapshot(self.load())
+            self._discard_journal()
+
+    def schedule_compaction(self):
+        return _compactor.submit(self.compact)
@@ -0,0 +1,832 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from attachment_store import AttachmentStore
+from project_archive import ProjectArchive
+from project_catalog import ProjectCatalog, SORT_ORDERS, due_item
+from project_cache import project_cache, copy_json
+from project_journal import ProjectJournal, VersionConflict, apply_operation
+import tracing
+
+logger = logging.getLogger("focusboard.storage")
+
+
+class ProjectStorage:
+    """Interface that ProjectDashboard uses to persist projects.
+
+    operation is an optional journal-style change (see project_journal) that
+    backends can apply incrementally instead of rewriting the whole project.
+
+    Loaded projects only carry document headers (title, date, type,
+    attachment, size); bodies are fetched with load_document_body. Documents
+    passed to save_project with a "content" key have that body stored.
+
+    Every project carries a "version" that each save increments. Saves are
+    compare-and-swap against the version data was loaded at: a full save
+    from an older version raises VersionConflict (as does one without a
+    version for a project that already exists), while an operation is
+    merged onto the newer state and data is refreshed to the result.
+
+    namespace is the owner of a per-user workspace (see workspaces.py), None
+    for the unscoped layout.
+
+    Archived projects are packed into a ProjectArchive (self.archive) with
+    their document bodies and attachments, and leave the active storage.
+    """
+
+    namespace = None
+
+    def save_project(self, project_name, data, operation=None):
+        raise NotImplementedError
+
+    def load_project(self, project_name):
+        raise NotImplementedError
+
+    def get_projects(self, category=None):
+        raise NotImplementedError
+
+    def get_project_summary(self, project_name):
+        raise NotImplementedError
+
+    def list_summaries(self, category=None, sort="name", offset=0, limit=None):
+        """Return (total, summaries) for one page of active projects.
+
+        sort is one of project_catalog.SORT_ORDERS. Summaries come from
+        aggregates kept up to date on save, no project is loaded.
+        """
+        raise NotImplementedError
+
+    def list_due(self, start=None, end=None, projects=None, limit=None, tasks=True):
+        """Project and open task due dates with start <= due_date < end, soonest first.
+
+        start and end are ISO dates (either may be None), projects limits
+        the result to those names and tasks=False leaves out task due dates.
+        Each result is a dict with due_date, project, kind ("project" or
+        "task"), id and title. Served from a sorted index kept up to date on
+        save, so a query costs O(log n + k).
+        """
+        raise NotImplementedError
+
+    def archive_project(self, project_name):
+        """Pack a project into the archive and remove it from the active projects.
+
+        Returns the archive manifest, or None if the project does not exist.
+        An earlier archive of the same name is kept and this one gets another
+        name, manifest["project"].
+        """
+        archive_name = None
+        while True:
+            data = self.load_project(project_name)
+            if data is None:
+                return None
+            manifest = self.archive.pack(project_name, data,
+                                         lambda doc_id: self.load_document_body(project_name, doc_id),
+                                         self.attachments.open, archive_name)
+            archive_name = manifest["project"]
+            current = self.load_project(project_name)
+            if current is None or current.get("version") == data.get("version"):
+                break
+            # Saved while it was being packed, pack again so the edit is not lost
+        # The archive holds its own copy of every attachment, so the store's references go
+        self.delete_project(project_name)
+        return manifest
+
+    def restore_project(self, project_name):
+        """Unpack an archived project into the active projects and return it.
+
+        Raises VersionConflict if an active project already has the name.
+        """
+        data = self.archive.load(project_name)
+        if data is None:
+            return None
+        if self.get_project_summary(project_name) is not None:
+            raise VersionConflict(project_name, None, None)
+        for doc in data.get("documents", []):
+            doc["content"] = self.archive.read_document(project_name, doc["id"])
+            attachment = doc.get("attachment")
+            if isinstance(attachment, dict):
+                with self.archive.open_attachment(project_name, attachment["sha256"]) as f:
+                    doc["attachment"] = self.attachments.put(f, attachment["name"], self.attachment_owner(project_name))
+        data["archived"] = False
+        self.save_project(project_name, data)
+        self.archive.remove(project_name)
+        return data
+
+    def delete_project(self, project_name):
+        raise NotImplementedError
+
+    def load_document_body(self, project_name, doc_id, archived=False):
+        raise NotImplementedError
+
+    def get_archived_projects(self):
+        return self.archive.names()
+
+    def list_archived(self, query=None):
+        """Manifests of the archived projects, newest first; see ProjectArchive.manifests."""
+        return self.archive.manifests(query)
+
+    def load_archived_project(self, project_name):
+        # Only project.json is extracted, bodies and attachments stay packed until asked for
+        return self.archive.load(project_name)
+
+    def get_archived_attachment(self, project_name, attachment):
+        if isinstance(attachment, dict):
+            return self.archive.read_attachment(project_name, attachment["sha256"])
+        return self.attachments.read(attachment)
+
+    def _pack_legacy(self, project_name, data, read_body):
+        # Archives from before projects were packed still hold attachment references,
+        # the oldest ones also inline bodies without document ids
+        data.setdefault("todos", [])
+        data.setdefault("documents", [])
+        for doc in data["documents"]:
+            doc.setdefault("id", uuid.uuid4().hex)
+        self.archive.pack(project_name, data, read_body, self.attachments.open)
+        self.attachments.release_owner(self.attachment_owner(project_name))
+
+    def attachment_owner(self, project_name):
+        # The attachment store is shared by all workspaces, equal project names must not collide
+        return f"{self.namespace}/{project_name}" if self.namespace else project_name
+
+    def save_attachment(self, project_name, file):
+        # Streamed into the shared content-addressed store, owned by the project
+        return self.attachments.put(file, file.name, self.attachment_owner(project_name))
+
+    def get_attachment(self, attachment):
+        return self.attachments.read(attachment)
+
+    def _release_attachment(self, project_name, attachment):
+        if isinstance(attachment, dict):
+            self.attachments.release(attachment["sha256"], self.attachment_owner(project_name))
+
+    def snapshot_project(self, project_name):
+        """Load a project with its document bodies, all from one version of it."""
+        while True:
+            data = self.load_project(project_name)
+            if data is None:
+                return None
+            for doc in data["documents"]:
+                doc["content"] = self.load_document_body(project_name, doc["id"])
+            current = self.load_project(project_name)
+            if current is None or current.get("version") == data.get("version"):
+                return data
+            # Saved while the bodies were read, they may not belong to this version
+
+    def export_projects(self, since=None):
+        """Yield (name, mtime, data) for the projects changed after since, with bodies."""
+        _, summaries = self.list_summaries()
+        for summary in summaries:
+            if since is not None and (summary.get("mtime") or 0) <= since:
+                continue
+            data = self.snapshot_project(summary["name"])
+            if data is not None:
+                yield summary["name"], summary.get("mtime"), data
+
+    def import_project(self, project_name, data):
+        """Save an exported project (bodies included), replacing a project of the same name.
+
+        Its attachments must already be in the attachment store. The project
+        ends up holding one reference per document attachment, like one saved
+        document by document; references of the replaced project's
+        attachments that are gone are released once the save went through.
+        The project is not indexed for search, that is up to the caller.
+        """
+        owner = self.attachment_owner(project_name)
+        current = self.load_project(project_name)
+        held = attachment_refs(current) if current else Counter()
+        wanted = attachment_refs(data)
+        added = wanted - held
+        for digest in added.elements():
+            self.attachments.add_ref(digest, owner)
+        data["version"] = current["version"] if current else None
+        try:
+            self.save_project(project_name, data)
+        except BaseException:
+            for digest in added.elements():
+                self.attachments.release(digest, owner)
+            raise
+        for digest in (held - wanted).elements():
+            self.attachments.release(digest, owner)
+
+
+def attachment_refs(data):
+    """Count the attachment store references a project's documents hold."""
+    return Counter(doc["attachment"]["sha256"] for doc in data["documents"]
+                   if isinstance(doc.get("attachment"), dict))
+
+
+def split_document(doc):
+    """Pop a document's content and record its size and hash in the header."""
+    content = (doc.pop("content", None) or "").encode("utf-8")
+    doc["size"] = len(content)
+    doc["content_hash"] = hashlib.sha1(content).hexdigest()
+    return content
+
+
+class FileSystemStorage(ProjectStorage):
+    """One directory per project under project_data/ (the default layout)."""
+
+    def __init__(self, data_dir="project_data", attachments=None, namespace=None):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.attachments = attachments or AttachmentStore()
+        self.namespace = namespace
+        self.catalog = ProjectCatalog(self.data_dir)
+        self.cache = project_cache
+        self.archive = ProjectArchive(self.data_dir / "archived")
+        if self.archive.archive_dir.exists() and not self.archive.index_file.exists():
+            self._pack_archived_dirs()
+
+    def _pack_archived_dirs(self):
+        # archive_project used to move the project directory under archived/
+        for project_dir in sorted(self.archive.archive_dir.iterdir()):
+            if not (project_dir / "project_info.json").exists():
+                continue
+            try:
+                data = ProjectJournal(project_dir).load()
+            except (OSError, ValueError):
+                continue
+            read_body = lambda doc_id: self._read_body(project_dir, doc_id)
+            try:
+                self._pack_legacy(project_dir.name, data, read_body)
+            except Exception:
+                # Left in place, so one broken directory does not keep the storage from opening
+                logger.exception("Could not pack archived project %s", project_dir)
+                continue
+            shutil.rmtree(project_dir, ignore_errors=True)
+        self.archive.rebuild()
+
+    def save_project(self, project_name, data, operation=None):
+        project_dir = self.data_dir / project_name
+        project_dir.mkdir(exist_ok=True)
+        journal = ProjectJournal(project_dir)
+        journal_paths = [journal.journal_file]
+        expected = data.get("version")
+
+        # The version check and the write happen under one short lock, the
+        # write itself is an append or an atomic rename
+        with journal.locked():
+            current = self.cache.load(journal.snapshot_file, lambda _: journal.load(), journal_paths, copy=False)
+            if operation is not None and current is not None:
+                # Incremental mode: only the operation itself is written, the
+                # journal is folded into project_info.json in the background
+                operation = dict(operation, version=current["version"] + 1)
+                if operation["op"] == "add_document":
+                    self._store_body(project_dir, operation["document"])
+                removed = None
+                if operation["op"] == "remove_document":
+                    # A document another session removed already gave up its attachment reference
+                    removed = next((doc for doc in current["documents"] if doc["id"] == operation["id"]), None)
+                before = self.cache.stamp(journal.snapshot_file, journal_paths)
+                journal.append(operation)
+                if expected != current["version"]:
+                    # Others saved since data was loaded, hand back their changes plus this one
+                    tracing.count("merges")
+                    merged = apply_operation(copy_json(current), copy_json(operation))
+                    data.clear()
+                    data.update(merged)
+                data["version"] = operation["version"]
+                self.cache.advance(journal.snapshot_file, before,
+                                   lambda cached: apply_operation(cached, copy_json(operation)), journal_paths)
+                if removed is not None:
+                    self._body_file(project_dir, removed["id"]).unlink(missing_ok=True)
+                    self._release_attachment(project_name, removed.get("attachment"))
+            else:
+                if current is not None and expected != current["version"]:
+                    raise VersionConflict(project_name, expected, current["version"])
+                data["version"] = current["version"] + 1 if current is not None else 1
+
+                for doc in data["documents"]:
+                    self._store_body(project_dir, doc)
+                journal.write_snapshot(data)
+                self.cache.put(journal.snapshot_file, data, journal_paths)
+                self._remove_orphan_bodies(project_dir, data)
+
+            # Keep the catalog in step so listings never need to open project files
+            self.catalog.update(project_name, data, time.time())
+
+    @staticmethod
+    def _body_file(project_dir, doc_id):
+        return project_dir / "documents" / f"{doc_id}.md"
+
+    def _store_body(self, project_dir, doc):
+        # Bodies live in documents/<id>.md and are only rewritten when they change
+        if "content" not in doc:
+            return
+        previous_hash = doc.get("content_hash")
+        content = split_document(doc)
+        body_file = self._body_file(project_dir, doc["id"])
+        if doc["content_hash"] == previous_hash and body_file.exists():
+            return
+        body_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = body_file.with_suffix(".tmp")
+        with open(tmp_file, "wb") as f:
+            f.write(content)
+        tracing.count("files_opened")
+        tracing.count("bytes_written", len(content))
+        os.replace(tmp_file, body_file)
+
+    def _remove_orphan_bodies(self, project_dir, data):
+        documents_dir = project_dir / "documents"
+        if not documents_dir.exists():
+            return
+        keep = {f"{doc['id']}.md" for doc in data["documents"]}
+        for body_file in documents_dir.iterdir():
+            if body_file.name not in keep:
+                body_file.unlink(missing_ok=True)
+
+    def load_document_body(self, project_name, doc_id, archived=False):
+        if archived:
+            return self.archive.read_document(project_name, doc_id)
+        return self._read_body(self.data_dir / project_name, doc_id)
+
+    def _read_body(self, project_dir, doc_id):
+        try:
+            with open(self._body_file(project_dir, doc_id), "r", encoding="utf-8") as f:
+                body = f.read()
+                tracing.count("files_opened")
+                tracing.count("bytes_read", f.tell())
+                return body
+        except FileNotFoundError:
+            return ""
+
+    def delete_project(self, project_name):
+        project_dir = self.data_dir / project_name
+        if project_dir.exists():
+            # First, try to remove any read-only attributes
+            for root, dirs, files in os.walk(str(project_dir)):
+                for name in dirs + files:
+                    try:
+                        os.chmod(str(Path(root) / name), 0o777)
+                    except OSError:
+                        pass
+
+            # Then try to remove the directory
+            shutil.rmtree(project_dir, ignore_errors=True)
+
+        self.attachments.release_owner(self.attachment_owner(project_name))
+        self.catalog.remove(project_name)
+        self.cache.invalidate(project_dir / "project_info.json")
+        return not project_dir.exists()
+
+    def load_project(self, project_name):
+        journal = ProjectJournal(self.data_dir / project_name)
+
+        # Served from the process-wide cache while the snapshot and journal are unchanged
+        try:
+            data = self.cache.load(journal.snapshot_file, lambda _: journal.load(), [journal.journal_file])
+        except (OSError, ValueError):
+            return None
+
+        if data and any("content" in doc for doc in data.get("documents", [])):
+            # Projects from before bodies were split out keep content inline;
+            # move it to body files the first time they are opened
+            for doc in data["documents"]:
+                doc.setdefault("id", uuid.uuid4().hex)
+            data.setdefault("todos", [])
+            self.save_project(project_name, data)
+        return data
+
+    def get_projects(self, category=None):
+        # Listing and category filtering come straight from the catalog
+        return self.catalog.names(category)
+
+    def get_project_summary(self, project_name):
+        return self.catalog.get(project_name)
+
+    def list_summaries(self, category=None, sort="name", offset=0, limit=None):
+        return self.catalog.page(category, sort, offset, limit)
+
+    def list_due(self, start=None, end=None, projects=None, limit=None, tasks=True):
+        return self.catalog.due(start, end, projects, limit, tasks)
+
+    def rebuild_catalog(self):
+        return self.catalog.rebuild()
+
+    def cache_stats(self):
+        return self.cache.stats()
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    name TEXT PRIMARY KEY,
+    category TEXT,
+    created_date TEXT,
+    due_date TEXT,
+    archived INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL,
+    data TEXT NOT NULL,
+    total_tasks INTEGER NOT NULL DEFAULT 0,
+    completed_tasks INTEGER NOT NULL DEFAULT 0,
+    total_documents INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS projects_category ON projects (archived, category);
+CREATE INDEX IF NOT EXISTS projects_due ON projects (archived, due_date);
+
+CREATE TABLE IF NOT EXISTS todos (
+    rowid INTEGER PRIMARY KEY,
+    project TEXT NOT NULL REFERENCES projects (name) ON DELETE CASCADE,
+    id TEXT NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS todos_project ON todos (project, id);
+CREATE INDEX IF NOT EXISTS todos_due ON todos (json_extract(data, '$.due_date'))
+    WHERE completed = 0 AND json_extract(data, '$.due_date') IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS documents (
+    rowid INTEGER PRIMARY KEY,
+    project TEXT NOT NULL REFERENCES projects (name) ON DELETE CASCADE,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    body TEXT
+);
+CREATE INDEX IF NOT EXISTS documents_project ON documents (project, id);
+"""
+
+# Per-project counts are kept current by the database itself, so summaries
+# and sorting by completion never have to count rows
+AGGREGATE_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS todos_insert AFTER INSERT ON todos BEGIN
+    UPDATE projects SET total_tasks = total_tasks + 1, completed_tasks = completed_tasks + NEW.completed
+    WHERE name = NEW.project;
+END;
+CREATE TRIGGER IF NOT EXISTS todos_delete AFTER DELETE ON todos BEGIN
+    UPDATE projects SET total_tasks = total_tasks - 1, completed_tasks = completed_tasks - OLD.completed
+    WHERE name = OLD.project;
+END;
+CREATE TRIGGER IF NOT EXISTS todos_update AFTER UPDATE OF completed ON todos BEGIN
+    UPDATE projects SET completed_tasks = completed_tasks + NEW.completed - OLD.completed
+    WHERE name = NEW.project;
+END;
+CREATE TRIGGER IF NOT EXISTS documents_insert AFTER INSERT ON documents BEGIN
+    UPDATE projects SET total_documents = total_documents + 1 WHERE name = NEW.project;
+END;
+CREATE TRIGGER IF NOT EXISTS documents_delete AFTER DELETE ON documents BEGIN
+    UPDATE projects SET total_documents = total_documents - 1 WHERE name = OLD.project;
+END;
+"""
+
+SUMMARY_ORDER = {
+    "due_date": "due_date IS NULL, due_date, name",
+    "completion": "total_tasks = 0, CAST(completed_tasks AS REAL) / MAX(total_tasks, 1), name",
+    "category": "category IS NULL, category, name",
+    "name": "name",
+}
+
+
+class SQLiteStorage(ProjectStorage):
+    """Projects, todos and documents as indexed rows in one SQLite database.
+
+    The database runs in WAL mode so Streamlit sessions can read while another
+    one writes. Todos and documents keep their full dict in a JSON column,
+    so round-tripping a project never drops fields; document bodies sit in a
+    separate column that load_project never reads.
+    """
+
+    def __init__(self, db_path="project_data.sqlite3", attachments=None, namespace=None):
+        self.db_path = str(db_path)
+        self.attachments = attachments or AttachmentStore()
+        self.namespace = namespace
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            self._split_document_bodies(conn)
+            self._add_aggregates(conn)
+            self._add_version(conn)
+        self.archive = ProjectArchive(Path(self.db_path).with_suffix(".archived"))
+        self._pack_archived_rows()
+
+    @staticmethod
+    def _split_document_bodies(conn):
+        # Databases created before bodies were split out kept content in data
+        columns = [r[1] for r in conn.execute("PRAGMA table_info(documents)")]
+        if "body" not in columns:
+            conn.execute("ALTER TABLE documents ADD COLUMN body TEXT")
+        rows = conn.execute(
+            "SELECT rowid, data FROM documents WHERE json_type(data, '$.content') IS NOT NULL").fetchall()
+        for rowid, doc_data in rows:
+            doc = json.loads(doc_data)
+            body = split_document(doc).decode("utf-8")
+            conn.execute("UPDATE documents SET data = ?, body = ? WHERE rowid = ?", (json.dumps(doc), body, rowid))
+
+    @staticmethod
+    def _add_aggregates(conn):
+        # Databases created before the aggregate columns existed are backfilled once
+        columns = [r[1] for r in conn.execute("PRAGMA table_info(projects)")]
+        if "total_tasks" not in columns:
+            for column in ("total_tasks", "completed_tasks", "total_documents"):
+                conn.execute(f"ALTER TABLE projects ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+            conn.execute(
+                "UPDATE projects SET "
+                "total_tasks = (SELECT COUNT(*) FROM todos t WHERE t.project = projects.name), "
+                "completed_tasks = (SELECT COUNT(*) FROM todos t WHERE t.project = projects.name AND t.completed = 1), "
+                "total_documents = (SELECT COUNT(*) FROM documents d WHERE d.project = projects.name)")
+        conn.executescript(AGGREGATE_TRIGGERS)
+
+    @staticmethod
+    def _add_version(conn):
+        columns = [r[1] for r in conn.execute("PRAGMA table_info(projects)")]
+        if "version" not in columns:
+            conn.execute("ALTER TABLE projects ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    def _pack_archived_rows(self):
+        # archive_project used to only flag the row as archived
+        names = [r[0] for r in self._connect().execute("SELECT name FROM projects WHERE archived = 1")]
+        for name in names:
+            data = self.load_project(name)
+            try:
+                self._pack_legacy(name, data, lambda doc_id: self.load_document_body(name, doc_id))
+            except Exception:
+                logger.exception("Could not pack archived project %s", name)
+                continue
+            with self._connect() as conn:
+                conn.execute("DELETE FROM projects WHERE name = ?", (name,))
+
+    def _connect(self):
+        # One connection per Streamlit script thread; WAL lets them read concurrently
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _project_row(project_name, data):
+        header = {k: v for k, v in data.items() if k not in ("todos", "documents", "version")}
+        return (project_name, data.get("category"), data.get("created_date"), data.get("due_date"),
+                1 if data.get("archived") else 0, time.time(), json.dumps(header))
+
+    def save_project(self, project_name, data, operation=None):
+        conn = self._connect()
+        expected = data.get("version")
+        with conn:
+            # Take the write lock up front so the version check and the write are atomic
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT version FROM projects WHERE name = ?", (project_name,)).fetchone()
+            current = row[0] if row else None
+            if operation is not None and current is not None:
+                if self._apply_operation(conn, project_name, operation) and operation["op"] == "remove_document":
+                    # Only the session that actually deleted the document releases its reference
+                    self._release_attachment(project_name, operation.get("attachment"))
+                conn.execute("UPDATE projects SET updated_at = ?, version = ? WHERE name = ?",
+                             (time.time(), current + 1, project_name))
+            else:
+                if current is not None and expected != current:
+                    raise VersionConflict(project_name, expected, current)
+                self._write_project(conn, project_name, data, 1 if current is None else current + 1)
+
+        if operation is not None and current is not None:
+            if expected != current:
+                # Others saved since data was loaded, hand back their changes plus this one
+                tracing.count("merges")
+                data.clear()
+                data.update(self.load_project(project_name))
+            data["version"] = current + 1
+        else:
+            data["version"] = 1 if current is None else current + 1
+
+    def _write_project(self, conn, project_name, data, version):
+        conn.execute(
+            "INSERT INTO projects (name, category, created_date, due_date, archived, updated_at, data, version) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET category = excluded.category, "
+            "created_date = excluded.created_date, due_date = excluded.due_date, "
+            "archived = excluded.archived, updated_at = excluded.updated_at, data = excluded.data, "
+            "version = excluded.version",
+            self._project_row(project_name, data) + (version,))
+        conn.execute("DELETE FROM todos WHERE project = ?", (project_name,))
+        conn.executemany(
+            "INSERT INTO todos (project, id, completed, data) VALUES (?, ?, ?, ?)",
+            [(project_name, str(t.get("id")), 1 if t.get("completed") else 0, json.dumps(t))
+             for t in data.get("todos", [])])
+        self._save_documents(conn, project_name, data.get("documents", []))
+
+    def _save_documents(self, conn, project_name, documents):
+        # Existing rows keep their body unless the document carries new content
+        existing = {r[0] for r in conn.execute("SELECT id FROM documents WHERE project = ?", (project_name,))}
+        keep = {str(d["id"]) for d in documents}
+        conn.executemany("DELETE FROM documents WHERE project = ? AND id = ?",
+                         [(project_name, doc_id) for doc_id in existing - keep])
+        for doc in documents:
+            doc_id = str(doc["id"])
+            has_body = "content" in doc
+            body = split_document(doc).decode("utf-8") if has_body else None
+            if doc_id not in existing:
+                conn.execute("INSERT INTO documents (project, id, data, body) VALUES (?, ?, ?, ?)",
+                             (project_name, doc_id, json.dumps(doc), body))
+            elif has_body:
+                conn.execute("UPDATE documents SET data = ?, body = ? WHERE project = ? AND id = ?",
+                             (json.dumps(doc), body, project_name, doc_id))
+            else:
+                conn.execute("UPDATE documents SET data = ? WHERE project = ? AND id = ?",
+                             (json.dumps(doc), project_name, doc_id))
+
+    def _apply_operation(self, conn, project_name, op):
+        # Each journal operation maps onto a handful of single-row statements;
+        # a remove_document returns how many documents it deleted
+        kind = op["op"]
+        if kind == "add_todo":
+            todo = op["todo"]
+            conn.execute("INSERT INTO todos (project, id, completed, data) VALUES (?, ?, ?, ?)",
+                         (project_name, todo["id"], 1 if todo.get("completed") else 0, json.dumps(todo)))
+        elif kind == "set_todo":
+            conn.execute(
+                "UPDATE todos SET completed = ?, data = json_set(data, '$.completed', json(?)) "
+                "WHERE project = ? AND id = ?",
+                (1 if op["completed"] else 0, "true" if op["completed"] else "false", project_name, op["id"]))
+        elif kind == "remove_todos":
+            conn.executemany("DELETE FROM todos WHERE project = ? AND id = ?",
+                             [(project_name, todo_id) for todo_id in op["ids"]])
+        elif kind == "edit_todos":
+            conn.executemany(
+                "UPDATE todos SET completed = ?, data = json_set(data, '$.completed', json(?)) "
+                "WHERE project = ? AND id = ?",
+                [(1 if completed else 0, "true" if completed else "false", project_name, todo_id)
+                 for todo_id, completed in op.get("completed", {}).items()])
+            conn.executemany("DELETE FROM todos WHERE project = ? AND id = ?",
+                             [(project_name, todo_id) for todo_id in op.get("remove", [])])
+        elif kind == "add_document":
+            document = op["document"]
+            body = split_document(document).decode("utf-8")
+            conn.execute("INSERT INTO documents (project, id, data, body) VALUES (?, ?, ?, ?)",
+                         (project_name, document["id"], json.dumps(document), body))
+        elif kind == "remove_document":
+            return conn.execute("DELETE FROM documents WHERE project = ? AND id = ?", (project_name, op["id"])).rowcount
+        elif kind == "set_fields":
+            header = json.loads(conn.execute("SELECT data FROM projects WHERE name = ?", (project_name,)).fetchone()[0])
+            row = self._project_row(project_name, apply_operation(header, op))
+            conn.execute("UPDATE projects SET category = ?, created_date = ?, due_date = ?, archived = ?, data = ? "
+                         "WHERE name = ?", row[1:5] + (row[6], project_name))
+        else:
+            raise ValueError(f"Unknown journal operation: {kind}")
+
+    def load_project(self, project_name):
+        conn = self._connect()
+        row = conn.execute("SELECT data, version FROM projects WHERE name = ?", (project_name,)).fetchone()
+        if row is None:
+            return None
+        data = json.loads(row[0])
+        data["version"] = row[1]
+        data["todos"] = [json.loads(r[0]) for r in conn.execute(
+            "SELECT data FROM todos WHERE project = ? ORDER BY rowid", (project_name,))]
+        data["documents"] = [json.loads(r[0]) for r in conn.execute(
+            "SELECT data FROM documents WHERE project = ? ORDER BY rowid", (project_name,))]
+        tracing.count("rows_read", 1 + len(data["todos"]) + len(data["documents"]))
+        return data
+
+    def load_document_body(self, project_name, doc_id, archived=False):
+        if archived:
+            return self.archive.read_document(project_name, doc_id)
+        row = self._connect().execute("SELECT body FROM documents WHERE project = ? AND id = ?",
+                                      (project_name, doc_id)).fetchone()
+        return (row[0] or "") if row else ""
+
+    def get_projects(self, category=None):
+        conn = self._connect()
+        if category is None:
+            rows = conn.execute("SELECT name FROM projects WHERE archived = 0 ORDER BY rowid")
+        else:
+            rows = conn.execute("SELECT name FROM projects WHERE archived = 0 AND category = ? ORDER BY rowid",
+                                (category,))
+        return [r[0] for r in rows]
+
+    SUMMARY_COLUMNS = ("name, category, created_date, due_date, updated_at, "
+                       "total_tasks, completed_tasks, total_documents")
+
+    @staticmethod
+    def _summary(row):
+        return {
+            "name": row[0],
+            "category": row[1],
+            "created_date": row[2],
+            "due_date": row[3],
+            "total_tasks": row[5],
+            "completed_tasks": row[6],
+            "total_documents": row[7],
+            "mtime": row[4],
+        }
+
+    def get_project_summary(self, project_name):
+        row = self._connect().execute(
+            f"SELECT {self.SUMMARY_COLUMNS} FROM projects WHERE name = ?", (project_name,)).fetchone()
+        return self._summary(row) if row else None
+
+    def list_summaries(self, category=None, sort="name", offset=0, limit=None):
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"Unknown sort order: {sort}")
+        where = "archived = 0" if category is None else "archived = 0 AND category = ?"
+        params = () if category is None else (category,)
+        conn = self._connect()
+        total = conn.execute(f"SELECT COUNT(*) FROM projects WHERE {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT {self.SUMMARY_COLUMNS} FROM projects WHERE {where} ORDER BY {SUMMARY_ORDER[sort]} "
+            f"LIMIT ? OFFSET ?", params + (-1 if limit is None else limit, offset))
+        return total, [self._summary(row) for row in rows]
+
+    DUE_QUERIES = (
+        ("due_date", "SELECT due_date, name, 'project', '', COALESCE(json_extract(data, '$.name'), name) "
+                     "FROM projects WHERE archived = 0", "name"),
+        ("json_extract(data, '$.due_date')",
+         "SELECT json_extract(data, '$.due_date'), project, 'task', id, COALESCE(json_extract(data, '$.task'), '') "
+         "FROM todos WHERE completed = 0", "project"),
+    )
+
+    def list_due(self, start=None, end=None, projects=None, limit=None, tasks=True):
+        # Each half is a range scan of an index on the due date (projects_due, todos_due)
+        # that stops after limit rows; only rows sharing a due date are sorted further
+        limit = -1 if limit is None else limit
+        selects, params = [], []
+        for due, select, name in self.DUE_QUERIES[:2 if tasks else 1]:
+            where = [f"{due} IS NOT NULL"]
+            for op, bound in ((">=", start), ("<", end)):
+                if bound is not None:
+                    where.append(f"{due} {op} ?")
+                    params.append(bound)
+            if projects is not None:
+                where.append(f"{name} IN ({', '.join('?' * len(projects))})")
+                params.extend(projects)
+            selects.append(f"SELECT * FROM ({select} AND {' AND '.join(where)} ORDER BY 1, 2, 3, 4 LIMIT ?)")
+            params.append(limit)
+        rows = self._connect().execute(" UNION ALL ".join(selects) + " ORDER BY 1, 2, 3, 4 LIMIT ?", params + [limit])
+        return [due_item(row) for row in rows]
+
+    def delete_project(self, project_name):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM projects WHERE name = ?", (project_name,))
+        self.attachments.release_owner(self.attachment_owner(project_name))
+        return True
+
+
+def copy_projects(source, target):
+    """Copy every project (including archived ones) from one storage into another.
+
+    Both storages must share an attachment store. Archives are copied as
+    they are. Returns the copied names.
+    """
+    attachments = target.attachments
+    copied = []
+    for name in source.get_archived_projects():
+        target.archive.add(name, source.archive.path(name))
+        copied.append(name)
+
+    for name in source.get_projects():
+        data = source.load_project(name)
+        if not data:
+            continue
+        data.setdefault("todos", [])
+        data.setdefault("documents", [])
+        for doc in data["documents"]:
+            if "content" not in doc:
+                doc["content"] = source.load_document_body(name, doc["id"])
+            attachment = doc.get("attachment")
+            if isinstance(attachment, dict):
+                # Both storages share the store, the copy needs its own reference
+                attachments.add_ref(attachment["sha256"], target.attachment_owner(name))
+            elif attachment and Path(attachment).exists():
+                with open(attachment, "rb") as f:
+                    doc["attachment"] = attachments.put(f, Path(attachment).name, target.attachment_owner(name))
+        target.save_project(name, data)
+        copied.append(name)
+    return copied
+
+
+def migrate_to_sqlite(data_dir, db_path, attachments_root="attachment_store"):
+    """Import every project (including archived ones) from a project_data/ tree."""
+    attachments = AttachmentStore(attachments_root)
+    source = FileSystemStorage(data_dir, attachments)
+    source.rebuild_catalog()
+    return len(copy_projects(source, SQLiteStorage(db_path, attachments)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate FocusBoard projects between storage backends")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--data-dir", default="project_data")
+    parser.add_argument("--db", default="project_data.sqlite3")
+    parser.add_argument("--attachment-store", default="attachment_store")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        count = migrate_to_sqlite(args.data_dir, args.db, args.attachment_store)
+        print(f"Migrated {count} projects into {args.db}")
@@ -0,0 +1,188 @@
+import argparse
+import hashlib
+import re
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    rowid INTEGER PRIMARY KEY,
+    project TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    category TEXT,
+    title TEXT,
+    fingerprint TEXT NOT NULL,
+    UNIQUE (project, kind, item_id)
+);
+CREATE INDEX IF NOT EXISTS items_category ON items (category);
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+    title, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+"""
+
+_TERMS = re.compile(r"\w+", re.UNICODE)
+
+
+def fingerprint(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def match_query(query):
+    """Turn user input into an FTS5 query where every word is a prefix term."""
+    terms = _TERMS.findall(query)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+class SearchIndex:
+    """Inverted index (SQLite FTS5) over todos, document titles and bodies of all projects.
+
+    index_project compares a fingerprint per todo and document with what is
+    already indexed and only re-tokenizes entries that changed, so saving a
+    project costs one indexed lookup plus work proportional to the change.
+    Document bodies are only loaded for documents whose content changed.
+    """
+
+    def __init__(self, db_path="search_index.sqlite3"):
+        self.db_path = str(db_path)
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _entries(data):
+        # (kind, item_id, title, fingerprint, body or None if it has to be loaded)
+        for todo in data.get("todos", []):
+            task = todo.get("task", "")
+            yield "todo", str(todo.get("id")), task, fingerprint(task), ""
+        for doc in data.get("documents", []):
+            title = doc.get("title", "")
+            if "content" in doc:
+                body = doc["content"] or ""
+                content_hash = hashlib.sha1(body.encode("utf-8")).hexdigest()
+            else:
+                body = None
+                content_hash = doc.get("content_hash", "")
+            yield "document", str(doc["id"]), title, fingerprint(f"{title}\0{content_hash}"), body
+
+    def index_project(self, project_name, data, load_body):
+        """Bring the entries of one project up to date, returns how many were re-tokenized.
+
+        load_body(doc_id) is called for changed documents that no longer carry
+        their content (see ProjectStorage.load_document_body).
+        """
+        category = data.get("category")
+        conn = self._connect()
+        with conn:
+            indexed = {(kind, item_id): (rowid, fp, cat) for rowid, kind, item_id, fp, cat in conn.execute(
+                "SELECT rowid, kind, item_id, fingerprint, category FROM items WHERE project = ?",
+                (project_name,))}
+            changed = 0
+            for kind, item_id, title, fp, body in self._entries(data):
+                existing = indexed.pop((kind, item_id), None)
+                if existing and existing[1] == fp:
+                    if existing[2] != category:
+                        conn.execute("UPDATE items SET category = ? WHERE rowid = ?", (category, existing[0]))
+                    continue
+                if body is None:
+                    body = load_body(item_id)
+                if existing:
+                    rowid = existing[0]
+                    conn.execute("UPDATE items SET category = ?, title = ?, fingerprint = ? WHERE rowid = ?",
+                                 (category, title, fp, rowid))
+                    conn.execute("DELETE FROM items_fts WHERE rowid = ?", (rowid,))
+                else:
+                    rowid = conn.execute(
+                        "INSERT INTO items (project, kind, item_id, category, title, fingerprint) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (project_name, kind, item_id, category, title, fp)).lastrowid
+                conn.execute("INSERT INTO items_fts (rowid, title, body) VALUES (?, ?, ?)", (rowid, title, body))
+                changed += 1
+            for rowid, _, _ in indexed.values():
+                self._delete(conn, rowid)
+        return changed
+
+    @staticmethod
+    def _delete(conn, rowid):
+        conn.execute("DELETE FROM items WHERE rowid = ?", (rowid,))
+        conn.execute("DELETE FROM items_fts WHERE rowid = ?", (rowid,))
+
+    def remove_project(self, project_name):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM items_fts WHERE rowid IN (SELECT rowid FROM items WHERE project = ?)",
+                         (project_name,))
+            conn.execute("DELETE FROM items WHERE project = ?", (project_name,))
+
+    def search(self, query, category=None, limit=20, projects=None):
+        """Ranked matches for query (every word matched as a prefix), best first.
+
+        projects optionally restricts the matches to the given project names.
+        """
+        fts_query = match_query(query)
+        if not fts_query:
+            return []
+        sql = ("SELECT i.project, i.kind, i.item_id, i.category, i.title, "
+               "snippet(items_fts, -1, '**', '**', '...', 12), bm25(items_fts, 5.0, 1.0) AS score "
+               "FROM items_fts JOIN items i ON i.rowid = items_fts.rowid WHERE items_fts MATCH ?")
+        params = [fts_query]
+        if category is not None:
+            sql += " AND i.category = ?"
+            params.append(category)
+        if projects is not None:
+            sql += f" AND i.project IN ({', '.join('?' * len(projects))})"
+            params += list(projects)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+        return [{
+            "project": row[0],
+            "kind": row[1],
+            "id": row[2],
+            "category": row[3],
+            "title": row[4],
+            "snippet": row[5],
+            "score": -row[6],
+        } for row in self._connect().execute(sql, params)]
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM items")
+            conn.execute("DELETE FROM items_fts")
+
+    def rebuild(self, storage):
+        """Re-index every active project of a ProjectStorage from scratch."""
+        self.clear()
+        count = 0
+        for name in storage.get_projects():
+            data = storage.load_project(name)
+            if data is None:
+                continue
+            self.index_project(name, data, lambda doc_id: storage.load_document_body(name, doc_id))
+            count += 1
+        with self._connect() as conn:
+            conn.execute("INSERT INTO items_fts (items_fts) VALUES ('optimize')")
+        return count
+
+
+if __name__ == "__main__":
+    from workspaces import create_workspaces
+
+    parser = argparse.ArgumentParser(description="Manage the FocusBoard search indexes of the user workspaces")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--owner", help="only rebuild this user's index")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        workspaces = create_workspaces()
+        for username in [args.owner] if args.owner else workspaces.usernames():
+            storage, index = workspaces.open(username)
+            print(f"{username}: indexed {index.rebuild(storage)} projects into {index.db_path}")
@@ -0,0 +1,111 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS revoked (
+    token_id TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def load_secret(path):
+    """Read the signing key from FOCUSBOARD_SESSION_SECRET or a key file, creating it if needed."""
+    secret = os.environ.get("FOCUSBOARD_SESSION_SECRET")
+    if secret:
+        return secret.encode("utf-8")
+    path = Path(path)
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    key = secrets.token_bytes(32)
+    try:
+        # O_EXCL so two processes starting at once agree on one key
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return path.read_bytes()
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class SessionTokens:
+    """Signed, expiring session tokens with a server-side revocation list.
+
+    A token is <username>.<expiry>.<id>.<signature>, signed with HMAC-SHA256,
+    so validating one is a signature check plus a primary key lookup in the
+    revocation table; user records are never read.
+    """
+
+    def __init__(self, db_path="users/sessions.sqlite3", secret=None, ttl=7 * 24 * 3600):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.secret = secret or load_secret(self.db_path.parent / "session_secret")
+        self.ttl = ttl
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _sign(self, payload):
+        return _b64(hmac.new(self.secret, payload.encode("ascii"), hashlib.sha256).digest())
+
+    def issue(self, username):
+        payload = f"{_b64(username.encode('utf-8'))}.{int(time.time() + self.ttl)}.{secrets.token_urlsafe(12)}"
+        return f"{payload}.{self._sign(payload)}"
+
+    def _parse(self, token):
+        # Returns (username, expires_at, token_id) for an authentic token, else None
+        try:
+            user_part, expires, token_id, signature = token.split(".")
+            payload = f"{user_part}.{expires}.{token_id}"
+            # Compared as bytes, compare_digest raises TypeError for non-ASCII str
+            if not hmac.compare_digest(signature.encode("utf-8"), self._sign(payload).encode("ascii")):
+                return None
+            return _unb64(user_part).decode("utf-8"), int(expires), token_id
+        except (AttributeError, ValueError, UnicodeError):
+            return None
+
+    def validate(self, token):
+        """Return the username for a valid, unexpired and unrevoked token, else None."""
+        parsed = self._parse(token)
+        if parsed is None:
+            return None
+        username, expires_at, token_id = parsed
+        if expires_at < time.time():
+            return None
+        revoked = self._connect().execute("SELECT 1 FROM revoked WHERE token_id = ?", (token_id,)).fetchone()
+        return None if revoked else username
+
+    def revoke(self, token):
+        parsed = self._parse(token)
+        if parsed is None:
+            return
+        _, expires_at, token_id = parsed
+        conn = self._connect()
+        conn.execute("INSERT OR IGNORE INTO revoked (token_id, expires_at) VALUES (?, ?)", (token_id, expires_at))
+        # Expired tokens fail validation anyway, no need to remember them
+        conn.execute("DELETE FROM revoked WHERE expires_at < ?", (time.time(),))
@@ -0,0 +1,164 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+# Bump whenever one of the prompts changes so cached summaries are regenerated
+PROMPT_VERSION = 2
+
+SUMMARY_PROMPT = """Please provide a concise summary of the following text:
+
+{transcript}
+
+Focus on the main points and key takeaways. If I have not provided any text, please print an error message."""
+
+CHUNK_PROMPT = """The following is part {index} of {total} of a video transcript ({start} to {end}).
+Summarize this part in a few sentences, focusing on the main points:
+
+{transcript}"""
+
+REDUCE_PROMPT = """Below are summaries of consecutive parts of one video, each labelled with its time range.
+Write a concise overall summary of the video, focusing on the main points and key takeaways:
+
+{summaries}"""
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text, good enough for budgeting
+    return len(text) // 4 + 1
+
+
+def format_timestamp(ms):
+    seconds = int(ms // 1000)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def chunk_segments(segments, max_tokens, overlap_tokens=0):
+    """Split (start_ms, text) segments into chunks of at most max_tokens.
+
+    Each chunk repeats up to overlap_tokens from the end of the previous one,
+    so sentences cut at a boundary are seen in full by one of the chunks.
+    Returns a list of {"start_ms", "end_ms", "text"} dicts.
+    """
+    # Keep the overlap well below the chunk size so every chunk makes progress
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    chunks = []
+    current = []
+    current_tokens = 0
+    for start_ms, text in segments:
+        tokens = estimate_tokens(text)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            # Carry the tail of this chunk over into the next one
+            carried = []
+            carried_tokens = 0
+            for seg in reversed(current):
+                seg_tokens = estimate_tokens(seg[1])
+                if carried_tokens + seg_tokens > overlap_tokens:
+                    break
+                carried.append(seg)
+                carried_tokens += seg_tokens
+            current = carried[::-1]
+            current_tokens = carried_tokens
+        current.append((start_ms, text))
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+
+    return [{
+        "start_ms": chunk[0][0],
+        "end_ms": chunk[-1][0],
+        "text": "".join(text + " " for _, text in chunk),
+    } for chunk in chunks]
+
+
+class RateLimiter:
+    """Spaces calls evenly so no more than calls_per_minute start in any minute."""
+
+    def __init__(self, calls_per_minute):
+        self.interval = 60.0 / calls_per_minute
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class MapReduceSummarizer:
+    """Summarizes long transcripts by summarizing chunks concurrently and then combining them.
+
+    model is any client with generate_content(prompt).text (a Gemini
+    GenerativeModel in the app, a local stub in benchmarks). Transcripts that
+    fit into one chunk are summarized with a single call, as before.
+    """
+
+    def __init__(self, model, max_chunk_tokens=8000, overlap_tokens=200, max_workers=4,
+                 calls_per_minute=None):
+        self.model = model
+        self.max_chunk_tokens = max_chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(calls_per_minute) if calls_per_minute else None
+
+    @property
+    def version(self):
+        # Identifies everything that affects the output, used as part of cache keys
+        model_name = getattr(self.model, "model_name", type(self.model).__name__)
+        return f"{model_name}:{PROMPT_VERSION}:{self.max_chunk_tokens}:{self.overlap_tokens}"
+
+    def _generate(self, prompt):
+        if self.rate_limiter:
+            with tracing.span("gemini.rate_limit_wait"):
+                self.rate_limiter.wait()
+        with tracing.span("gemini.generate_content") as span:
+            span.add("prompt_chars", len(prompt))
+            return self.model.generate_content(prompt).text
+
+    def summarize(self, segments):
+        chunks = chunk_segments(segments, self.max_chunk_tokens, self.overlap_tokens)
+        if not chunks:
+            raise Exception("Could not extract captions from the video.")
+        if len(chunks) == 1:
+            return self._generate(SUMMARY_PROMPT.format(transcript=chunks[0]["text"]))
+
+        def summarize_chunk(item):
+            index, chunk = item
+            return self._generate(CHUNK_PROMPT.format(
+                index=index + 1, total=len(chunks), start=format_timestamp(chunk["start_ms"]),
+                end=format_timestamp(chunk["end_ms"]), transcript=chunk["text"]))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            partials = list(pool.map(summarize_chunk, enumerate(chunks)))
+
+        sections = [(f"{format_timestamp(chunk['start_ms'])} - {format_timestamp(chunk['end_ms'])}", summary)
+                    for chunk, summary in zip(chunks, partials)]
+        overview = self._reduce([f"[{label}]\n{summary}" for label, summary in sections])
+
+        parts = [overview, "", "## Sections"]
+        for label, summary in sections:
+            parts += ["", f"### {label}", "", summary]
+        return "\n".join(parts)
+
+    def _reduce(self, summaries):
+        # Combine in batches that fit the budget until a single call can take them all
+        while True:
+            batches = [[]]
+            tokens = 0
+            for summary in summaries:
+                summary_tokens = estimate_tokens(summary)
+                if batches[-1] and tokens + summary_tokens > self.max_chunk_tokens:
+                    batches.append([])
+                    tokens = 0
+                batches[-1].append(summary)
+                tokens += summary_tokens
+            if len(batches) == 1 or len(batches) == len(summaries):
+                return self._generate(REDUCE_PROMPT.format(summaries="\n\n".join(summaries)))
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                summaries = list(pool.map(
+                    lambda batch: self._generate(REDUCE_PROMPT.format(summaries="\n\n".join(batch))), batches))
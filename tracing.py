@@ -0,0 +1,230 @@
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import tempfile
+import threading
+import time
+
+# Tracing is off unless FOCUSBOARD_TRACE is set; span() is then a shared no-op
+ENABLED = os.environ.get("FOCUSBOARD_TRACE", "").lower() in ("1", "true", "yes", "on")
+LOG_FILE = os.environ.get("FOCUSBOARD_TRACE_LOG", "trace.log")
+METRICS_FILE = os.environ.get("FOCUSBOARD_METRICS_FILE", "metrics.prom")
+METRICS_INTERVAL = 5.0
+
+_local = threading.local()
+
+
+class Span:
+    __slots__ = ("name", "attrs", "counters", "start", "duration", "depth")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.counters = {}
+        self.duration = None
+
+    def add(self, counter, value=1):
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def __enter__(self):
+        stack = _stack()
+        self.depth = len(stack)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        run = getattr(_local, "run", None)
+        if run is not None:
+            run.spans.append(self)
+        else:
+            # Spans on worker threads are not part of a script run, record them on their own
+            tracer.record_spans(self.name, self.duration, [self])
+        return False
+
+    def to_dict(self):
+        record = {"name": self.name, "ms": round(self.duration * 1000, 3), "depth": self.depth}
+        if self.counters:
+            record["counters"] = self.counters
+        if self.attrs:
+            record["attrs"] = self.attrs
+        return record
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def add(self, counter, value=1):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def enable(flag=True):
+    global ENABLED
+    ENABLED = flag
+
+
+def span(name, **attrs):
+    """Time a block: with span("storage.load_project", project=name) as s: ... s.add("bytes_read", n)"""
+    if not ENABLED:
+        return _NOOP
+    return Span(name, attrs)
+
+
+def count(counter, value=1):
+    """Add to a counter of the innermost open span on this thread, if any."""
+    if not ENABLED:
+        return
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1].add(counter, value)
+
+
+def traced(name):
+    """Decorator form of span() for whole functions."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with Span(name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class Run:
+    def __init__(self, name):
+        self.name = name
+        self.spans = []
+        self.start = time.perf_counter()
+
+    def slowest(self, limit=15):
+        return sorted(self.spans, key=lambda s: s.duration, reverse=True)[:limit]
+
+
+def start_run(name="script_run"):
+    """Collect the spans of this thread (one Streamlit script run) until finish_run."""
+    if not ENABLED:
+        return None
+    _local.run = Run(name)
+    _local.stack = []
+    return _local.run
+
+
+def current_run():
+    return getattr(_local, "run", None) if ENABLED else None
+
+
+def finish_run():
+    run = getattr(_local, "run", None)
+    if run is None:
+        return None
+    _local.run = None
+    tracer.record_spans(run.name, time.perf_counter() - run.start, run.spans)
+    return run
+
+
+class Tracer:
+    """Aggregates finished spans into metrics and writes runs to a rotating log.
+
+    The metrics are exported in Prometheus text format to metrics_file, at
+    most every METRICS_INTERVAL seconds, for a node_exporter textfile
+    collector or any scraper that can read a file.
+    """
+
+    def __init__(self, log_file=LOG_FILE, metrics_file=METRICS_FILE, max_bytes=5 * 1024 * 1024, backups=3):
+        self.log_file = log_file
+        self.metrics_file = metrics_file
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._logger = None
+        self._lock = threading.Lock()
+        self._spans = {}
+        self._counters = {}
+        self._last_export = 0.0
+
+    def _log(self):
+        if self._logger is None:
+            logger = logging.getLogger("focusboard.trace")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            handler = logging.handlers.RotatingFileHandler(
+                self.log_file, maxBytes=self.max_bytes, backupCount=self.backups)
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def record_spans(self, run_name, duration, spans):
+        with self._lock:
+            entries = [("run." + run_name, duration, {})] + [(s.name, s.duration, s.counters) for s in spans]
+            for name, seconds, counters in entries:
+                stats = self._spans.setdefault(name, [0, 0.0, 0.0])
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2] = max(stats[2], seconds)
+                for counter, value in counters.items():
+                    self._counters[(name, counter)] = self._counters.get((name, counter), 0) + value
+            export = time.monotonic() - self._last_export >= METRICS_INTERVAL
+            if export:
+                self._last_export = time.monotonic()
+        self._log().info(json.dumps({
+            "ts": time.time(),
+            "run": run_name,
+            "ms": round(duration * 1000, 3),
+            "spans": [s.to_dict() for s in spans],
+        }))
+        if export:
+            self.export_metrics()
+
+    def prometheus_text(self):
+        with self._lock:
+            spans = {name: list(stats) for name, stats in self._spans.items()}
+            counters = dict(self._counters)
+        lines = ["# HELP focusboard_span_seconds Time spent in traced spans.",
+                 "# TYPE focusboard_span_seconds summary"]
+        for name, (calls, total, _) in sorted(spans.items()):
+            lines.append(f'focusboard_span_seconds_count{{span="{name}"}} {calls}')
+            lines.append(f'focusboard_span_seconds_sum{{span="{name}"}} {total:.6f}')
+        lines += ["# HELP focusboard_span_seconds_max Slowest single span since start.",
+                  "# TYPE focusboard_span_seconds_max gauge"]
+        for name, (_, _, longest) in sorted(spans.items()):
+            lines.append(f'focusboard_span_seconds_max{{span="{name}"}} {longest:.6f}')
+        lines += ["# HELP focusboard_span_counter_total Counters recorded on spans (bytes, files, cache hits).",
+                  "# TYPE focusboard_span_counter_total counter"]
+        for (name, counter), value in sorted(counters.items()):
+            lines.append(f'focusboard_span_counter_total{{span="{name}",counter="{counter}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def export_metrics(self):
+        directory = os.path.dirname(os.path.abspath(self.metrics_file))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, self.metrics_file)
+
+
+tracer = Tracer()
@@ -1,46 +1,97 @@
 import streamlit as st
-import json
-from pathlib import Path
 import bcrypt
+import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from datetime import datetime
+from session_tokens import SessionTokens
+from user_store import UserStore
+import tracing
+
+DEFAULT_ROUNDS = int(os.environ.get("FOCUSBOARD_BCRYPT_ROUNDS", "12"))
+DEFAULT_WORKERS = int(os.environ.get("FOCUSBOARD_AUTH_WORKERS", "2"))
+SESSION_TTL = float(os.environ.get("FOCUSBOARD_SESSION_DAYS", "7")) * 24 * 3600
+
+def hash_rounds(hashed):
+    # bcrypt hashes look like $2b$12$<salt+hash>, the middle field is the cost
+    try:
+        return int(hashed.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
 class UserAuth:
-    def __init__(self):
-        self.users_dir = Path("users")
-        self.users_dir.mkdir(exist_ok=True)
-        self.users_file = self.users_dir / "users.json"
-        self._load_users()
-
-    def _load_users(self):
-        if self.users_file.exists():
-            with open(self.users_file, 'r') as f:
-                self.users = json.load(f)
-        else:
-            self.users = {}
-            self._save_users()
-
-    def _save_users(self):
-        with open(self.users_file, 'w') as f:
-            json.dump(self.users, f)
+    """Registers and logs in users, hashing passwords on a small worker pool.
+
+    At most max_workers hashes run at once, so a burst of logins can only
+    occupy that many cores while other sessions keep rendering. Hashes made
+    with a different cost than rounds are upgraded after a successful login.
+    Logged in users get a session token so reloads can resume without bcrypt.
+    """
+
+    def __init__(self, store=None, tokens=None, rounds=DEFAULT_ROUNDS, max_workers=DEFAULT_WORKERS, timeout=30):
+        self.store = store or UserStore()
+        self.tokens = tokens or SessionTokens(ttl=SESSION_TTL)
+        self.rounds = rounds
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+
+    def _run(self, fn, *args):
+        # The span includes time spent queued behind other logins
+        with tracing.span("auth.bcrypt", fn=fn.__name__):
+            future = self._pool.submit(fn, *args)
+            try:
+                return future.result(timeout=self.timeout)
+            except TimeoutError:
+                future.cancel()
+                raise
+
+    def _hash(self, password):
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds)).decode('utf-8')
+
+    def _rehash(self, username, password):
+        self.store.set_password(username, self._hash(password))
 
     def register_user(self, username, password):
-        if username in self.users:
+        # Cheap check first so taken names don't pay for hashing
+        if self.store.get(username) is not None:
             return False, "Username already exists"
         
-        salt = bcrypt.gensalt()
-        hashed_pw = bcrypt.hashpw(password.encode('utf-8'), salt)
+        try:
+            hashed_pw = self._run(self._hash, password)
+        except TimeoutError:
+            return False, "The server is busy, please try again"
         
-        self.users[username] = {
-            'password': hashed_pw.decode('utf-8'),
+        added = self.store.add(username, {
+            'password': hashed_pw,
             'created_at': str(datetime.now())
-        }
-        self._save_users()
+        })
+        if not added:
+            return False, "Username already exists"
         return True, "Registration successful"
 
     def login_user(self, username, password):
-        if username not in self.users:
+        user = self.store.get(username)
+        if user is None:
+            return False, "Invalid username or password"
+        
+        stored_pw = user['password']
+        try:
+            valid = self._run(bcrypt.checkpw, password.encode('utf-8'), stored_pw.encode('utf-8'))
+        except TimeoutError:
+            return False, "The server is busy, please try again"
+        if not valid:
             return False, "Invalid username or password"
         
-        stored_pw = self.users[username]['password'].encode('utf-8')
-        if bcrypt.checkpw(password.encode('utf-8'), stored_pw):
-            return True, "Login successful"
-        return False, "Invalid username or password" 
\ No newline at end of file
+        if hash_rounds(stored_pw) != self.rounds:
+            # Upgrade in the background, the user doesn't wait for it
+            self._pool.submit(self._rehash, username, password)
+        return True, "Login successful"
+
+    def issue_session(self, username):
+        return self.tokens.issue(username)
+
+    def resume_session(self, token):
+        """Return the username for a valid session token, or None."""
+        return self.tokens.validate(token)
+
+    def end_session(self, token):
+        self.tokens.revoke(token)
@@ -0,0 +1,104 @@
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    data TEXT NOT NULL DEFAULT '{}'
+);
+"""
+
+
+class UserStore:
+    """User accounts as rows in a SQLite database (WAL mode).
+
+    Lookups and inserts go through the primary key index, and inserts are
+    single transactions, so concurrent registrations from several sessions
+    or server processes can never overwrite each other. An existing
+    users.json next to the database is imported once on first use.
+    """
+
+    def __init__(self, db_path="users/users.sqlite3", legacy_file=None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+        legacy_file = Path(legacy_file) if legacy_file else self.db_path.parent / "users.json"
+        if legacy_file.exists():
+            self.import_json(legacy_file)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _record(row):
+        record = json.loads(row[2])
+        record.update(password=row[0], created_at=row[1])
+        return record
+
+    def get(self, username):
+        row = self._connect().execute(
+            "SELECT password, created_at, data FROM users WHERE username = ?", (username,)).fetchone()
+        return self._record(row) if row else None
+
+    def add(self, username, record):
+        """Insert a new user, returns False if the username is already taken."""
+        extra = {k: v for k, v in record.items() if k not in ("password", "created_at")}
+        cursor = self._connect().execute(
+            "INSERT OR IGNORE INTO users (username, password, created_at, data) VALUES (?, ?, ?, ?)",
+            (username, record["password"], record["created_at"], json.dumps(extra)))
+        return cursor.rowcount == 1
+
+    def set_password(self, username, password):
+        self._connect().execute("UPDATE users SET password = ? WHERE username = ?", (password, username))
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def usernames(self):
+        return [r[0] for r in self._connect().execute("SELECT username FROM users ORDER BY username")]
+
+    def records(self):
+        """Yield (username, record) for every user, streamed from the database."""
+        for row in self._connect().execute("SELECT username, password, created_at, data FROM users ORDER BY username"):
+            yield row[0], self._record(row[1:])
+
+    def import_json(self, path):
+        """Import a users.json file and rename it so it is only imported once.
+
+        Accounts that already exist in the database are kept as they are, so
+        running this again (or from two processes at once) is harmless.
+        """
+        path = Path(path)
+        try:
+            with open(path, "r") as f:
+                users = json.load(f)
+        except FileNotFoundError:
+            # Another process migrated it first
+            return 0
+        imported = 0
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for username, record in users.items():
+                imported += self.add(username, record)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        try:
+            os.replace(path, path.with_name(path.name + ".migrated"))
+        except FileNotFoundError:
+            pass
+        return imported
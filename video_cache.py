@@ -0,0 +1,145 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlparse, parse_qs
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+"""
+
+
+def canonical_video_id(url):
+    """Reduce the different YouTube URL forms to the bare video ID."""
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or "").lower()
+    if host.endswith("youtu.be"):
+        video_id = parsed.path.lstrip("/").split("/")[0]
+    elif host.endswith("youtube.com") or host.endswith("youtube-nocookie.com"):
+        video_id = parse_qs(parsed.query).get("v", [""])[0]
+        parts = parsed.path.strip("/").split("/")
+        if not video_id and len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+            video_id = parts[1]
+    else:
+        video_id = ""
+    if video_id:
+        return video_id
+    # Not a recognised YouTube URL, fall back to a stable hash of the URL itself
+    return "url-" + hashlib.sha1(url.strip().encode("utf-8")).hexdigest()
+
+
+class VideoCache:
+    """On-disk cache of extracted captions and generated summaries.
+
+    Keys are built from the canonical video ID (plus the summarizer version
+    for summaries). Entries expire after ttl seconds and the least recently
+    used ones are evicted once the cache grows past max_bytes. Concurrent
+    get_or_compute calls for the same key share a single computation.
+    """
+
+    def __init__(self, db_path, ttl=30 * 24 * 3600, max_bytes=256 * 1024 * 1024):
+        self.db_path = str(db_path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def captions_key(video_id):
+        return f"captions:{video_id}"
+
+    @staticmethod
+    def summary_key(video_id, summarizer_version):
+        return f"summary:{video_id}:{summarizer_version}"
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or now - row[1] > self.ttl:
+            if row is not None:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+        conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        encoded = json.dumps(value)
+        now = time.time()
+        conn = self._connect()
+        conn.execute("INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) "
+                     "VALUES (?, ?, ?, ?, ?)", (key, encoded, len(encoded), now, now))
+        self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        if not owner:
+            # Another session is already fetching this, wait for its result
+            self.coalesced += 1
+            return future.result()
+
+        try:
+            value = compute()
+            self.put(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+
+    def stats(self):
+        row = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "entries": row[0],
+            "bytes": row[1],
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,223 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+import tracing
+from video_cache import VideoCache, canonical_video_id
+from video_notes import make_video_document
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    project TEXT NOT NULL,
+    url TEXT NOT NULL,
+    video_id TEXT,
+    status TEXT NOT NULL,
+    stage TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS jobs_project ON jobs (project, created_at);
+"""
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class VideoJobQueue:
+    """Persistent queue of Video Notes jobs processed by a pool of worker threads.
+
+    Jobs live in SQLite so they survive restarts and can be polled from any
+    session. extractor.fetch(url) must return {"title", "segments"} (see
+    captions.CaptionFetcher), summarizer.summarize(segments) the summary text
+    (see summarizer.MapReduceSummarizer), and on_result(project, document) is
+    called with the finished document. Failed attempts are retried with
+    exponential backoff up to max_attempts. With a VideoCache, captions and
+    summaries are reused per video instead of being fetched again.
+    """
+
+    def __init__(self, db_path, extractor, summarizer, on_result, max_workers=2, max_attempts=3,
+                 base_delay=2.0, stale_after=15 * 60, cache=None):
+        self.db_path = str(db_path)
+        self.extractor = extractor
+        self.summarizer = summarizer
+        self.cache = cache
+        self.on_result = on_result
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.stale_after = stale_after
+        self._local = threading.local()
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._workers = []
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        if "video_id" not in [r[1] for r in conn.execute("PRAGMA table_info(jobs)")]:
+            conn.execute("ALTER TABLE jobs ADD COLUMN video_id TEXT")
+        # Jobs whose worker died (e.g. the server was restarted) are picked up again
+        conn.execute("UPDATE jobs SET status = 'queued', stage = NULL WHERE status = 'running' AND updated_at < ?",
+                     (time.time() - self.stale_after,))
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def start(self):
+        for i in range(self.max_workers - len(self._workers)):
+            worker = threading.Thread(target=self._work, name=f"video-job-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def submit(self, project_name, url):
+        video_id = canonical_video_id(url)
+        conn = self._connect()
+        # The same video submitted twice for a project reuses the pending job
+        row = conn.execute(
+            "SELECT id FROM jobs WHERE project = ? AND video_id = ? AND status IN ('queued', 'running')",
+            (project_name, video_id)).fetchone()
+        if row is not None:
+            return row["id"]
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn.execute(
+            "INSERT INTO jobs (id, project, url, video_id, status, created_at, updated_at, next_attempt_at) "
+            "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)", (job_id, project_name, url, video_id, now, now, now))
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def cancel(self, job_id):
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'cancelled', stage = NULL, updated_at = ? "
+            "WHERE id = ? AND status IN ('queued', 'running')", (time.time(), job_id))
+        return cursor.rowcount > 0
+
+    def get(self, job_id):
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._as_dict(row) if row else None
+
+    def list_jobs(self, project_name, limit=10):
+        rows = self._connect().execute(
+            "SELECT * FROM jobs WHERE project = ? ORDER BY created_at DESC LIMIT ?", (project_name, limit))
+        return [self._as_dict(row) for row in rows]
+
+    @staticmethod
+    def _as_dict(row):
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def _claim_next(self):
+        # IMMEDIATE takes the write lock up front, so two workers (or two
+        # server processes) can never claim the same job
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT 1", (now,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? "
+                             "WHERE id = ?", (now, row["id"]))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row["id"]) if row is not None else None
+
+    def _next_due_in(self):
+        row = self._connect().execute("SELECT MIN(next_attempt_at) FROM jobs WHERE status = 'queued'").fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim_next()
+            except sqlite3.Error:
+                job = None
+            if job is None:
+                # Sleep until a job is submitted or the next retry becomes due
+                wait = self._next_due_in()
+                with self._wakeup:
+                    self._wakeup.wait(timeout=min(wait, 5.0) if wait is not None else 5.0)
+                continue
+            tracing.start_run("video_job")
+            try:
+                self._run(job)
+            finally:
+                tracing.finish_run()
+
+    def _set_stage(self, job_id, stage):
+        # Raises JobCancelled once the job was cancelled so the worker stops early
+        cursor = self._connect().execute(
+            "UPDATE jobs SET stage = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+            (stage, time.time(), job_id))
+        if cursor.rowcount == 0:
+            raise JobCancelled()
+
+    def _cached(self, key, compute):
+        if self.cache is None:
+            return compute()
+        return self.cache.get_or_compute(key, compute)
+
+    def _run(self, job):
+        conn = self._connect()
+        video_id = job["video_id"] or canonical_video_id(job["url"])
+        try:
+            self._set_stage(job["id"], "fetching")
+            captions = self._cached(VideoCache.captions_key(video_id), lambda: self.extractor.fetch(job["url"]))
+
+            self._set_stage(job["id"], "summarizing")
+            summary = self._cached(
+                VideoCache.summary_key(video_id, self.summarizer.version),
+                lambda: self.summarizer.summarize(captions["segments"]))
+
+            self._set_stage(job["id"], "saving")
+            document = make_video_document(captions["title"], summary, job["url"], video_id)
+            self.on_result(job["project"], document)
+
+            conn.execute("UPDATE jobs SET status = 'done', stage = NULL, error = NULL, result = ?, updated_at = ? "
+                         "WHERE id = ?", (json.dumps({"document_id": document["id"], "title": document["title"]}),
+                                          time.time(), job["id"]))
+        except JobCancelled:
+            pass
+        except Exception as e:
+            now = time.time()
+            if job["attempts"] >= self.max_attempts:
+                conn.execute("UPDATE jobs SET status = 'failed', stage = NULL, error = ?, updated_at = ? "
+                             "WHERE id = ? AND status = 'running'", (str(e), now, job["id"]))
+            else:
+                delay = self.base_delay * 2 ** (job["attempts"] - 1)
+                conn.execute("UPDATE jobs SET status = 'queued', stage = NULL, error = ?, updated_at = ?, "
+                             "next_attempt_at = ? WHERE id = ? AND status = 'running'",
+                             (str(e), now, now + delay, job["id"]))
@@ -0,0 +1,13 @@
+from datetime import datetime
+import uuid
+
+def make_video_document(video_title, summary, url=None, video_id=None):
+    return {
+        "id": uuid.uuid4().hex,
+        "title": f"Video Notes: {video_title}",
+        "content": f"""## Video Summary\n\n{summary}""",
+        "date_created": datetime.now().strftime("%Y-%m-%d"),
+        "type": "video_notes",
+        "source_url": url,
+        "video_id": video_id
+    }
@@ -0,0 +1,293 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from attachment_store import AttachmentStore
+from project_archive import is_due
+from project_storage import FileSystemStorage, SQLiteStorage, copy_projects
+from search_index import SearchIndex
+from user_store import UserStore
+import tracing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS members (
+    member TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    project TEXT NOT NULL,
+    added_at REAL NOT NULL,
+    PRIMARY KEY (member, owner, project)
+);
+CREATE INDEX IF NOT EXISTS members_project ON members (owner, project);
+"""
+
+
+def qualified_name(owner, project_name):
+    return f"{owner}/{project_name}"
+
+
+def split_name(name):
+    """Split "owner/project" into (owner, project); project names never contain a slash."""
+    owner, _, project_name = name.rpartition("/")
+    return owner, project_name
+
+
+class Workspaces:
+    """Per-user project namespaces in a hashed fan-out tree.
+
+    Each user gets their own storage and search index under
+    <root>/<sha1[:2]>/<sha1[2:]>/ (sha1 of the username), so listing, sorting
+    and searching only ever touch that user's projects. Projects can be
+    shared through membership rows in members.sqlite3; members address them
+    as "owner/project". Open namespaces are kept in an LRU of max_open
+    entries, all of them share one attachment store.
+    """
+
+    def __init__(self, root="workspaces", backend="filesystem", attachments=None, max_open=256):
+        if backend not in ("filesystem", "sqlite"):
+            raise ValueError(f"Unknown storage backend: {backend}")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.backend = backend
+        self.attachments = attachments or AttachmentStore()
+        self.max_open = max_open
+        self._open = OrderedDict()
+        self._open_lock = threading.Lock()
+        self._create_lock = threading.Lock()
+        self.db_path = str(self.root / "members.sqlite3")
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def path(self, username):
+        # Hashing keeps every directory small and makes any username a safe path
+        digest = hashlib.sha1(username.encode("utf-8")).hexdigest()
+        return self.root / digest[:2] / digest[2:]
+
+    def open(self, username):
+        """Return (storage, search_index) of a user's namespace, creating it on first use."""
+        with self._open_lock:
+            entry = self._open.get(username)
+            if entry is not None:
+                self._open.move_to_end(username)
+                return entry
+        # Created once, so two sessions never write through separate catalogs and indexes
+        with self._create_lock:
+            with self._open_lock:
+                entry = self._open.get(username)
+            if entry is None:
+                entry = self._create(username)
+        with self._open_lock:
+            entry = self._open.setdefault(username, entry)
+            self._open.move_to_end(username)
+            while len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+        return entry
+
+    def _create(self, username):
+        path = self.path(username)
+        path.mkdir(parents=True, exist_ok=True)
+        owner_file = path / "owner"
+        if not owner_file.exists():
+            # Lets maintenance scripts map hashed directories back to users
+            owner_file.write_text(username, encoding="utf-8")
+        if self.backend == "sqlite":
+            storage = SQLiteStorage(path / "project_data.sqlite3", self.attachments, namespace=username)
+        else:
+            storage = FileSystemStorage(path / "project_data", self.attachments, namespace=username)
+        index_path = path / "search_index.sqlite3"
+        new_index = not index_path.exists()
+        index = SearchIndex(index_path)
+        if new_index:
+            index.rebuild(storage)
+        return storage, index
+
+    def storage(self, username):
+        return self.open(username)[0]
+
+    def search_index(self, username):
+        return self.open(username)[1]
+
+    def usernames(self):
+        return sorted(p.read_text(encoding="utf-8") for p in self.root.glob("*/*/owner"))
+
+    def share(self, owner, project_name, member):
+        self._connect().execute(
+            "INSERT OR IGNORE INTO members (member, owner, project, added_at) VALUES (?, ?, ?, ?)",
+            (member, owner, project_name, time.time()))
+
+    def unshare(self, owner, project_name, member):
+        self._connect().execute("DELETE FROM members WHERE member = ? AND owner = ? AND project = ?",
+                                (member, owner, project_name))
+
+    def unshare_all(self, owner, project_name):
+        self._connect().execute("DELETE FROM members WHERE owner = ? AND project = ?", (owner, project_name))
+
+    def members(self, owner, project_name):
+        return [r[0] for r in self._connect().execute(
+            "SELECT member FROM members WHERE owner = ? AND project = ? ORDER BY added_at", (owner, project_name))]
+
+    def shared_with(self, member):
+        """(owner, project) pairs shared with member, one indexed range scan."""
+        return self._connect().execute(
+            "SELECT owner, project FROM members WHERE member = ? ORDER BY owner, project", (member,)).fetchall()
+
+    def memberships(self):
+        """Yield every (member, owner, project) row, streamed from the database."""
+        yield from self._connect().execute("SELECT member, owner, project FROM members ORDER BY owner, project")
+
+    def is_member(self, member, owner, project_name):
+        return self._connect().execute(
+            "SELECT 1 FROM members WHERE member = ? AND owner = ? AND project = ?",
+            (member, owner, project_name)).fetchone() is not None
+
+
+def create_workspaces():
+    """Build the workspaces under FOCUSBOARD_WORKSPACES with the FOCUSBOARD_STORAGE backend."""
+    return Workspaces(os.environ.get("FOCUSBOARD_WORKSPACES", "workspaces"),
+                      os.environ.get("FOCUSBOARD_STORAGE", "filesystem"))
+
+
+def auto_archive_policy():
+    """(idle_days, complete_days) from FOCUSBOARD_ARCHIVE_IDLE_DAYS and FOCUSBOARD_ARCHIVE_COMPLETE_DAYS.
+
+    Unset thresholds are None; with both unset nothing is archived automatically.
+    """
+    values = [os.environ.get(name) for name in ("FOCUSBOARD_ARCHIVE_IDLE_DAYS", "FOCUSBOARD_ARCHIVE_COMPLETE_DAYS")]
+    return tuple(float(value) if value else None for value in values)
+
+
+def auto_archive(workspaces, idle_days=None, complete_days=None, now=None):
+    """Archive every project of every workspace that is due under the policy (see project_archive.is_due).
+
+    Returns the number of projects archived.
+    """
+    now = time.time() if now is None else now
+    count = 0
+    with tracing.span("archive.auto_archive") as span:
+        for username in workspaces.usernames():
+            storage, index = workspaces.open(username)
+            _, summaries = storage.list_summaries()
+            for summary in summaries:
+                if not is_due(summary, now, idle_days, complete_days):
+                    continue
+                name = summary["name"]
+                try:
+                    archived = storage.archive_project(name)
+                except Exception:
+                    # Left for the next pass
+                    span.add("errors")
+                    continue
+                if archived:
+                    index.remove_project(name)
+                    workspaces.unshare_all(username, name)
+                    count += 1
+        span.add("projects_archived", count)
+    return count
+
+
+def start_auto_archive(workspaces, idle_days=None, complete_days=None, interval=3600):
+    """Run auto_archive now and then every interval seconds on a daemon thread.
+
+    Returns an Event that stops the thread once set.
+    """
+    stop = threading.Event()
+
+    def run():
+        while True:
+            auto_archive(workspaces, idle_days, complete_days)
+            if stop.wait(interval):
+                return
+
+    threading.Thread(target=run, name="auto-archive", daemon=True).start()
+    return stop
+
+
+def migrate_unscoped(workspaces, source, owner, share_with=()):
+    """Move the projects of an unscoped storage into owner's namespace.
+
+    Active projects are shared with every user in share_with, so they keep
+    seeing what they saw before. The source is read through the storage
+    classes, so legacy projects in it are upgraded to the current layout on
+    the way (inline bodies split out, archived directories packed); its
+    attachment references are released since the copies hold their own.
+    Returns the number of projects moved.
+    """
+    storage, index = workspaces.open(owner)
+    active = source.get_projects()
+    copied = copy_projects(source, storage)
+    for name in active:
+        for member in share_with:
+            if member != owner:
+                workspaces.share(owner, name, member)
+    for name in copied:
+        workspaces.attachments.release_owner(source.attachment_owner(name))
+    index.rebuild(storage)
+    return len(copied)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage FocusBoard per-user workspaces")
+    parser.add_argument("command", choices=["migrate", "share", "reindex", "auto-archive"])
+    parser.add_argument("--owner", help="user that owns the migrated or shared projects")
+    parser.add_argument("--project", help="project to share")
+    parser.add_argument("--member", nargs="*", default=[], help="users to share with")
+    parser.add_argument("--share-with-all", action="store_true",
+                        help="share migrated projects with every registered user")
+    parser.add_argument("--idle-days", type=float, help="archive projects untouched for this many days")
+    parser.add_argument("--complete-days", type=float,
+                        help="archive projects with all tasks done and untouched for this many days")
+    parser.add_argument("--data-dir", default="project_data")
+    parser.add_argument("--db", default=os.environ.get("FOCUSBOARD_SQLITE_PATH", "project_data.sqlite3"))
+    args = parser.parse_args()
+    workspaces = create_workspaces()
+
+    if args.command == "migrate":
+        if not args.owner:
+            parser.error("migrate needs --owner")
+        members = UserStore().usernames() if args.share_with_all else args.member
+        members = [member for member in members if member != args.owner]
+        # The unscoped layout used the same backend, read it from its old location
+        if workspaces.backend == "sqlite":
+            source = SQLiteStorage(args.db, workspaces.attachments)
+            legacy = Path(args.db)
+        else:
+            source = FileSystemStorage(args.data_dir, workspaces.attachments)
+            source.rebuild_catalog()
+            legacy = Path(args.data_dir)
+        count = migrate_unscoped(workspaces, source, args.owner, members)
+        if workspaces.backend == "sqlite":
+            source.close()
+        # Renamed so it is not migrated twice, like users.json
+        legacy.rename(legacy.with_name(legacy.name + ".migrated"))
+        print(f"Moved {count} projects into the workspace of {args.owner}, shared with {len(members)} users")
+    elif args.command == "share":
+        if not (args.owner and args.project and args.member):
+            parser.error("share needs --owner, --project and --member")
+        for member in args.member:
+            workspaces.share(args.owner, args.project, member)
+        print(f"Shared {args.project} with {', '.join(args.member)}")
+    elif args.command == "reindex":
+        users = [args.owner] if args.owner else workspaces.usernames()
+        for username in users:
+            storage, index = workspaces.open(username)
+            print(f"{username}: indexed {index.rebuild(storage)} projects")
+    elif args.command == "auto-archive":
+        # Defaults to the same policy the app runs in the background
+        idle_days, complete_days = auto_archive_policy()
+        idle_days = args.idle_days if args.idle_days is not None else idle_days
+        complete_days = args.complete_days if args.complete_days is not None else complete_days
+        if idle_days is None and complete_days is None:
+            parser.error("auto-archive needs --idle-days or --complete-days")
+        print(f"Archived {auto_archive(workspaces, idle_days, complete_days)} projects")